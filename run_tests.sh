@@ -11,7 +11,7 @@ set -xe
 # Top-level test directory
 TESTS=tests
 # Test directories
-TEST_DIRECTORIES=(cli config_manager dependency_graph executor)
+TEST_DIRECTORIES=(cli config_manager dependency_graph executor import_time input_staging output_finalizer priority_policy resource_broker resource_usage results_store slurm task_log version_info)
 
 cd "$TESTS" || exit 1
 for test_dir in "${TEST_DIRECTORIES[@]}"; do
@@ -14,7 +14,6 @@ setup(
         "bcbio-gff>=0.6.6",
         "biopython>=1.76",
         "plumbum>=1.6.6",
-        "networkx>=2.8.8",
         "pyyaml>=5.3.1",
         "art>=5.1",
         "pylint==2.6.0",
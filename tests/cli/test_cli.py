@@ -6,6 +6,7 @@ from typing import Dict, List
 
 from yapim import Executor, InputLoader, ExtensionLoader
 from yapim.utils.package_management.directory_cleaner import DirectoryCleaner
+from yapim.utils.package_management.history_report import HistoryReport
 from yapim.utils.path_manager import PathManager
 
 
@@ -82,6 +83,30 @@ class TestCLI(unittest.TestCase):
         DirectoryCleaner(out_dir).clean(top_pipeline_dir, ["Align"])
         TestCLI.confirm_deleted_steps(out_dir, ids_to_delete)
 
+    def test_history(self):
+        # Generate output
+        out_dir = TestCLI.file.joinpath("history-out")
+        Executor(
+            ExtensionLoader(  # Input loader
+                Path("../data").resolve(),
+                out_dir,
+            ),
+            TestCLI.file.joinpath("fasta").joinpath("fasta-config.yaml"),  # Config file path
+            out_dir,  # Base output dir path
+            Path("fasta/tasks"),  # Relative path to pipeline directory
+            display_status_messages=False
+        ).run()
+        report = HistoryReport(out_dir)
+        (pipeline_name, history), = report.history()
+        self.assertEqual("tasks", pipeline_name)
+        self.assertEqual({"Align", "Summarize"}, {record.task for record in history})
+        summary = report.summary(["Align"]).splitlines()
+        self.assertEqual("tasks", summary[0])
+        self.assertTrue(summary[1].startswith("task"))
+        self.assertEqual(["Align"], [line.split()[0] for line in summary[2:]])
+        records = report.records().splitlines()
+        self.assertEqual(len(history), len(records) - 2)
+
 
 if __name__ == '__main__':
     unittest.main()
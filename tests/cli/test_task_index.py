@@ -0,0 +1,68 @@
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from yapim.utils.dependency_graph import DependencyGraph
+from yapim.utils.package_management.package_generator import PackageGenerator
+from yapim.utils.package_management.package_loader import PackageLoader
+from yapim.utils.package_management.task_index import TaskBlueprints
+
+
+class TestTaskIndex(unittest.TestCase):
+    file = Path(os.path.dirname(__file__)).resolve()
+    modules = ("write", "merge", "update", "UnMerge", "sed")
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.pipeline_dir = self.tmp_dir.joinpath("simple-pipeline")
+        simple = TestTaskIndex.file.parent.joinpath("executor").joinpath("simple")
+        PackageGenerator(simple.joinpath("sample_tasks1"), [simple.joinpath("sample_dependencies")]) \
+            .create(self.pipeline_dir)
+        TestTaskIndex._unload()
+
+    def tearDown(self):
+        TestTaskIndex._unload()
+        shutil.rmtree(self.tmp_dir)
+
+    @staticmethod
+    def _unload():
+        for module_name in TestTaskIndex.modules:
+            sys.modules.pop(module_name, None)
+
+    def test_index_written(self):
+        with open(self.pipeline_dir.joinpath(PackageLoader.pipeline_file), "rb") as file_ptr:
+            index = pickle.load(file_ptr)[PackageLoader.INDEX]
+        self.assertEqual({"sample_tasks1", "sample_dependencies"}, set(index[PackageLoader.DIRECTORIES].keys()))
+        self.assertEqual("sed", index[PackageLoader.DIRECTORIES]["sample_dependencies"]["classes"]["Sed"])
+
+    def test_dependencies_imported_when_used(self):
+        pipeline_tasks, task_blueprints = PackageLoader(self.pipeline_dir).load_from_package()
+        self.assertIsInstance(task_blueprints, TaskBlueprints)
+        self.assertEqual({"Write", "Merge", "Update", "UnMerge"}, {task.__name__ for task in pipeline_tasks})
+        self.assertIn("Sed", task_blueprints)
+        self.assertNotIn("sed", sys.modules)
+        self.assertEqual("Sed", task_blueprints["Sed"].__name__)
+        self.assertIn("sed", sys.modules)
+
+    def test_changed_directory_searched(self):
+        with open(self.pipeline_dir.joinpath("sample_dependencies").joinpath("sed.py"), "a") as file_ptr:
+            file_ptr.write("\n# Changed\n")
+        _, task_blueprints = PackageLoader(self.pipeline_dir).load_from_package()
+        self.assertIn("sed", sys.modules)
+        self.assertEqual("Sed", task_blueprints["Sed"].__name__)
+
+    def test_graph_loaded_without_import(self):
+        dependency_graph = PackageLoader(self.pipeline_dir).load_graph()
+        for module_name in TestTaskIndex.modules:
+            self.assertNotIn(module_name, sys.modules)
+        self.assertEqual(DependencyGraph(*PackageLoader(self.pipeline_dir).load_from_package())
+                         .get_affected_nodes("Write"), dependency_graph.get_affected_nodes("Write"))
+        self.assertEqual({"Write", "Merge", "Update", "UnMerge"}, dependency_graph.get_affected_nodes("Write"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,11 @@
+import json
+import os
+import shutil
+import tempfile
 import unittest
 
+import yaml
+
 from yapim.utils.config_manager import *
 from yapim.utils.package_management.config_manager_generator import ConfigManagerGenerator
 
@@ -28,6 +34,16 @@ class TestConfigManager(unittest.TestCase):
             TestConfigManager.cfg.get_sbatch_flagged_arguments()
         )
 
+    def test_slurm_batch_defaults(self):
+        self.assertEqual(1, TestConfigManager.cfg.slurm_batch_size)
+        self.assertEqual(30, TestConfigManager.cfg.slurm_batch_wait)
+
+    def test_slurm_batch(self):
+        cfg = ConfigManager(Path(__file__).parent.joinpath("config_files").joinpath("SLURM-config.yaml"))
+        self.assertEqual(50, cfg.slurm_batch_size)
+        self.assertEqual(5, cfg.slurm_batch_wait)
+        self.assertEqual([('--job-name', 'EukMS'), ('--qos', 'unlim')], cfg.get_sbatch_flagged_arguments())
+
     def test_get_outer(self):
         self.assertEqual(
             TestConfigManager.cfg.config["Sample"],
@@ -70,6 +86,60 @@ class TestConfigManager(unittest.TestCase):
             TestConfigManager.cfg.find(("Sample", "Value"), "meow")
         )
 
+    def test_settings_inherit(self):
+        settings = TestConfigManager.cfg.settings(("Sample", "Value"))
+        self.assertEqual(1, settings.threads)
+        self.assertEqual(40, settings.memory)
+        self.assertEqual("4:00:00", settings.time)
+        self.assertEqual(("-x", "12", "-d", "e"), settings.flags)
+        self.assertEqual(str(local.which("cat")), settings.program_path)
+        self.assertEqual(ConfigManager.THREAD_BACKEND, settings.backend)
+        self.assertFalse(settings.skip)
+
+    def test_settings_compiled_once(self):
+        self.assertIs(
+            TestConfigManager.cfg.settings(("Sample", "Value")),
+            TestConfigManager.cfg.settings(("Sample", "Value"))
+        )
+
+    def test_validation_cached(self):
+        tmp_dir = Path(tempfile.mkdtemp())
+        cache_dir = ConfigManager.VALIDATION_CACHE
+        ConfigManager.VALIDATION_CACHE = tmp_dir.joinpath("validated")
+        try:
+            data = tmp_dir.joinpath("reference.fna")
+            data.touch()
+            program = tmp_dir.joinpath("tool")
+            with open(program, "w") as file_ptr:
+                file_ptr.write("#!/bin/bash\n")
+            os.chmod(program, 0o755)
+            config_path = tmp_dir.joinpath("data-config.yaml")
+            with open(Path(__file__).parent.joinpath("config_files").joinpath("valid-config.yaml"), "r") as file_ptr:
+                config = yaml.load(file_ptr, Loader=yaml.FullLoader)
+            config["Sample"][ConfigManager.DATA] = f"{data} {data} db:{data}"
+            config["Sample"]["dependencies"]["Value"][ConfigManager.PROGRAM] = "tool"
+            with open(config_path, "w") as file_ptr:
+                yaml.dump(config, file_ptr)
+            with local.env(PATH=local.env["PATH"] + ":" + str(tmp_dir)):
+                ConfigManager(config_path)
+                # Executables of programs are kept for the same config file and PATH
+                markers = os.listdir(ConfigManager.VALIDATION_CACHE)
+                self.assertEqual(1, len(markers))
+                with open(ConfigManager.VALIDATION_CACHE.joinpath(markers[0])) as file_ptr:
+                    self.assertEqual({"tool": str(program)}, json.load(file_ptr))
+                ConfigManager(config_path)
+                # Paths are checked again on each launch
+                os.remove(data)
+                with self.assertRaises(MissingDataError):
+                    ConfigManager(config_path)
+                data.touch()
+                os.remove(program)
+                with self.assertRaises(InvalidPathError):
+                    ConfigManager(config_path)
+        finally:
+            ConfigManager.VALIDATION_CACHE = cache_dir
+            shutil.rmtree(tmp_dir)
+
     def test_file_generation(self):
         ConfigManagerGenerator("sample_tasks1", ["sample_dependencies"]).write(Path("output-config.yaml").resolve())
         original_fp = open("original-config.yaml", "r")
@@ -0,0 +1,75 @@
+"""Measure time and memory to plan generated pipelines of increasing size
+
+Usage: python benchmark_dependency_graph.py [sizes...]
+"""
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Tuple, Type
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+# pylint: disable=wrong-import-position
+from yapim import Task, DependencyInput
+from yapim.utils.dependency_graph import DependencyGraph
+
+# Tasks in each layer of a generated pipeline
+WIDTH = 10
+# Length of the chain of dependencies that every Task uses
+DEPENDENCY_DEPTH = 5
+
+
+def _task(name: str, requirements: List[str], dependencies: List[str]) -> Type[Task]:
+    """Create Task class with requirements and dependencies"""
+    return type(name, (Task,), {
+        "requires": staticmethod(lambda: list(requirements)),
+        "depends": staticmethod(lambda: [DependencyInput(dependency) for dependency in dependencies]),
+        "run": lambda self: None,
+    })
+
+
+def generate_pipeline(size: int) -> Tuple[List[Type[Task]], Dict[str, Type[Task]]]:
+    """ Generate pipeline of `size` Tasks in layers of WIDTH. Each Task requires two Tasks of the layer before it, and
+    uses a dependency chain that is shared by every Task
+
+    :param size: Number of top-level Tasks
+    :return: Top-level Tasks, and mapping of name to type of all Tasks
+    """
+    dependencies = [_task(f"Dependency{i}", [], [f"Dependency{i + 1}"] if i + 1 < DEPENDENCY_DEPTH else [])
+                    for i in range(DEPENDENCY_DEPTH)]
+    tasks = []
+    for i in range(size):
+        layer, position = divmod(i, WIDTH)
+        requirements = [] if layer == 0 else [f"Task{(layer - 1) * WIDTH + position}",
+                                              f"Task{(layer - 1) * WIDTH + (position + 1) % WIDTH}"]
+        tasks.append(_task(f"Task{i}", requirements, ["Dependency0"]))
+    return tasks, {task.__name__: task for task in tasks + dependencies}
+
+
+def plan(size: int) -> Tuple[float, float]:
+    """ Build and sort graph of generated pipeline
+
+    :param size: Number of top-level Tasks
+    :return: Time in ms and peak memory in MB used to build graph
+    """
+    tasks, task_blueprints = generate_pipeline(size)
+    tracemalloc.start()
+    start = time.perf_counter()
+    DependencyGraph(tasks, task_blueprints)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / (1 << 20)
+
+
+def main(sizes: List[int]):
+    """Print planning time and memory of each pipeline size"""
+    print(f"{'tasks':>8}{'ms':>12}{'ms/task':>12}{'peak MB':>12}")
+    for size in sizes:
+        elapsed, peak = plan(size)
+        print(f"{size:>8}{elapsed:>12.1f}{elapsed / size:>12.4f}{peak:>12.2f}")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [100, 1000, 5000])
@@ -1,6 +1,7 @@
 import unittest
 from typing import Type, Iterable, Dict, Tuple, Union
 
+from tests.dependency_graph.benchmark_dependency_graph import DEPENDENCY_DEPTH, generate_pipeline
 from tests.dependency_graph.class_stubs import *
 from yapim.utils.config_manager import ConfigManager
 from yapim.utils.dependency_graph import DependencyGraph, Node, DependencyGraphGenerationError
@@ -113,6 +114,51 @@ class TestDependencyGraph(unittest.TestCase):
             DependencyGraph(*generate_dg_input([A, B, C, D, E, F])).get_affected_nodes("E", "C")
         )
 
+    def test_downstream(self):
+        dependency_graph = DependencyGraph(*generate_dg_input([A, B, C, D, E, F]))
+        self.assertEqual({"C", "D", "E", "F"}, dependency_graph.downstream("B"))
+        self.assertEqual(frozenset(), dependency_graph.downstream("F"))
+        self.assertEqual(frozenset(), dependency_graph.downstream("G"))
+        self.assertTrue(dependency_graph.reachability.is_downstream("F", "B"))
+        self.assertFalse(dependency_graph.reachability.is_downstream("B", "F"))
+        self.assertFalse(dependency_graph.reachability.is_downstream("D", "C"))
+
+    def test_affected_nodes_diamonds(self):
+        # Each layer of two Tasks requires both Tasks of the layer before it, so the number of paths between the first
+        # and last layers doubles with each layer
+        layers = 60
+        tasks = [generate_task(f"Layer0_{i}", []) for i in range(2)]
+        for layer in range(1, layers):
+            tasks.extend(generate_task(f"Layer{layer}_{i}", [f"Layer{layer - 1}_0", f"Layer{layer - 1}_1"])
+                         for i in range(2))
+        dependency_graph = DependencyGraph(*generate_dg_input(tasks))
+        self.assertEqual({task.__name__ for task in tasks} - {"Layer0_1"},
+                         dependency_graph.get_affected_nodes("Layer0_0"))
+        self.assertEqual({f"Layer{layers - 1}_0"}, dependency_graph.get_affected_nodes(f"Layer{layers - 1}_0"))
+        self.assertEqual(2 * (layers - 2), len(dependency_graph.downstream("Layer1_1")))
+
+    def test_large_pipeline(self):
+        tasks, task_blueprints = generate_pipeline(2000)
+        calls = []
+        shared_dependency = task_blueprints["Dependency0"]
+        depends = shared_dependency.depends
+        shared_dependency.depends = staticmethod(lambda: calls.append(1) or depends())
+        dependency_graph = DependencyGraph(tasks, task_blueprints)
+        self.assertEqual(2000, len(dependency_graph.sorted_graph_identifiers))
+        self.assertEqual([Node("Task1999", f"Dependency{i}") for i in reversed(range(DEPENDENCY_DEPTH))] +
+                         [Node(ConfigManager.ROOT, "Task1999")], dependency_graph.sorted_graph_identifiers[-1])
+        # Dependency subtree that is shared by every Task is expanded once
+        self.assertEqual(1, len(calls))
+
+
+
+def generate_task(name: str, requirements: List[str]) -> TaskType:
+    return type(name, (Task,), {
+        "requires": staticmethod(lambda: requirements),
+        "depends": staticmethod(lambda: []),
+        "run": lambda self: None,
+    })
+
 
 if __name__ == '__main__':
     unittest.main()
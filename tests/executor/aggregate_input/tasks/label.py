@@ -0,0 +1,23 @@
+from typing import List, Union, Type
+
+from yapim import AggregateTask, DependencyInput
+
+
+class Label(AggregateTask):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output = {}
+
+    @staticmethod
+    def requires() -> List[Union[str, Type]]:
+        return ["Start"]
+
+    @staticmethod
+    def depends() -> List[DependencyInput]:
+        return []
+
+    def run(self):
+        pass
+
+    def deaggregate(self) -> dict:
+        return {record_id: {"label": f"label-{record_id}"} for record_id in self.input_ids()}
@@ -0,0 +1,24 @@
+from typing import List, Union, Type
+
+from yapim import Task, DependencyInput
+
+
+class Start(Task):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output = {
+            "result": self.wdir.joinpath("result.txt")
+        }
+
+    @staticmethod
+    def requires() -> List[Union[str, Type]]:
+        return []
+
+    @staticmethod
+    def depends() -> List[DependencyInput]:
+        return []
+
+    def run(self):
+        self.single(
+            self.local["echo"][self.record_id] > str(self.output["result"])
+        )
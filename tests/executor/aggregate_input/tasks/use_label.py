@@ -0,0 +1,22 @@
+from typing import List, Union, Type
+
+from yapim import Task, DependencyInput
+
+
+class UseLabel(Task):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output = {
+            "result": self.input["Echo"]["result"]
+        }
+
+    @staticmethod
+    def requires() -> List[Union[str, Type]]:
+        return ["Label"]
+
+    @staticmethod
+    def depends() -> List[DependencyInput]:
+        return [DependencyInput("Echo", {"Label": {"label": "text"}})]
+
+    def run(self):
+        pass
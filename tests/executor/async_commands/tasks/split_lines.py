@@ -0,0 +1,28 @@
+import asyncio
+from typing import List, Union, Type
+
+from yapim import Task, DependencyInput
+
+
+class SplitLines(Task):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output = {
+            "parts": [self.wdir.joinpath(f"part-{i}.txt") for i in range(50)],
+            "result": self.wdir.joinpath("result.txt")
+        }
+
+    @staticmethod
+    def requires() -> List[Union[str, Type]]:
+        return []
+
+    @staticmethod
+    def depends() -> List[DependencyInput]:
+        return []
+
+    async def run(self):
+        await asyncio.gather(*(
+            self.single_async(self.local["echo"][f"{self.record_id}-{i}"] > str(part))
+            for i, part in enumerate(self.output["parts"])
+        ))
+        await self.parallel_async(self.local["cat"][self.output["parts"]] > str(self.output["result"]))
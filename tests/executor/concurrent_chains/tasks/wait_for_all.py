@@ -0,0 +1,24 @@
+import threading
+from typing import List, Union, Type
+
+from yapim import Task, DependencyInput
+
+# Every record must be running at the same time for the barrier to pass
+ALL_RECORDS = threading.Barrier(80, timeout=30)
+
+
+class WaitForAll(Task):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output = {}
+
+    @staticmethod
+    def requires() -> List[Union[str, Type]]:
+        return []
+
+    @staticmethod
+    def depends() -> List[DependencyInput]:
+        return []
+
+    def run(self):
+        ALL_RECORDS.wait()
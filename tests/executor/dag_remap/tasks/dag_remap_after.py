@@ -0,0 +1,25 @@
+from typing import List, Union, Type
+
+from yapim import Task, DependencyInput
+
+
+class AfterRemap(Task):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output = {
+            "result": self.wdir.joinpath("result.txt")
+        }
+
+    @staticmethod
+    def requires() -> List[Union[str, Type]]:
+        return ["Remap", "Sibling"]
+
+    @staticmethod
+    def depends() -> List[DependencyInput]:
+        return []
+
+    def run(self):
+        assert self.input["Sibling"].get("complete") is True
+        self.single(
+            self.local["cat"][self.input["Sibling"]["result"]] > str(self.output["result"])
+        )
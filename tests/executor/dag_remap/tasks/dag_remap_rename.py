@@ -0,0 +1,26 @@
+import time
+from typing import List, Union, Type
+
+from yapim import AggregateTask, DependencyInput
+
+
+class Remap(AggregateTask):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output = {}
+
+    @staticmethod
+    def requires() -> List[Union[str, Type]]:
+        return ["First"]
+
+    @staticmethod
+    def depends() -> List[DependencyInput]:
+        return []
+
+    def run(self):
+        # Sibling Tasks complete while this AggregateTask is running
+        time.sleep(1)
+
+    def deaggregate(self) -> dict:
+        self.remap()
+        return {record_id: dict(record_data) for record_id, record_data in self.input_items()}
@@ -0,0 +1,27 @@
+from typing import List, Union, Type
+
+from yapim import Task, DependencyInput
+
+
+class Sibling(Task):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output = {
+            "result": self.wdir.joinpath("result.txt")
+        }
+
+    @staticmethod
+    def requires() -> List[Union[str, Type]]:
+        return ["First"]
+
+    @staticmethod
+    def depends() -> List[DependencyInput]:
+        return []
+
+    def run(self):
+        # Complete while Remap is running
+        self.single(self.local["sleep"]["0.5"])
+        self.single(
+            self.local["cat"][self.input["First"]["result"]] > str(self.output["result"])
+        )
+        self.output["complete"] = True
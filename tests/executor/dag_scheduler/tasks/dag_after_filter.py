@@ -0,0 +1,25 @@
+from typing import List, Union, Type
+
+from yapim import Task, DependencyInput
+
+
+class AfterFilter(Task):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output = {
+            "result": self.wdir.joinpath("result.txt")
+        }
+
+    @staticmethod
+    def requires() -> List[Union[str, Type]]:
+        return ["FilterOdd"]
+
+    @staticmethod
+    def depends() -> List[DependencyInput]:
+        return []
+
+    def run(self):
+        assert int(self.record_id) % 2 == 0
+        self.single(
+            self.local["cat"][self.input["First"]["result"]] > str(self.output["result"])
+        )
@@ -0,0 +1,24 @@
+from typing import List, Union, Type
+
+from yapim import AggregateTask, DependencyInput
+
+
+class FilterOdd(AggregateTask):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output = {}
+
+    @staticmethod
+    def requires() -> List[Union[str, Type]]:
+        return ["First"]
+
+    @staticmethod
+    def depends() -> List[DependencyInput]:
+        return []
+
+    def run(self):
+        for record_id in self.input_ids():
+            assert self.has_run("First", record_id)
+
+    def deaggregate(self) -> dict:
+        return self.filter(lambda record_id, record_data: record_data["First"]["value"] % 2 == 0)
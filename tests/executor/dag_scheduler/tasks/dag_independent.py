@@ -0,0 +1,26 @@
+from typing import List, Union, Type
+
+from yapim import Task, DependencyInput
+
+
+class Independent(Task):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output = {
+            "result": self.wdir.joinpath("result.txt")
+        }
+
+    @staticmethod
+    def requires() -> List[Union[str, Type]]:
+        return ["First"]
+
+    @staticmethod
+    def depends() -> List[DependencyInput]:
+        return []
+
+    def run(self):
+        # Complete after FilterOdd has removed odd records
+        self.single(self.local["sleep"]["1"])
+        self.single(
+            self.local["cat"][self.input["First"]["result"]] > str(self.output["result"])
+        )
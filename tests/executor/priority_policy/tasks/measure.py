@@ -0,0 +1,42 @@
+from typing import List, Union, Type
+
+from yapim import Task, DependencyInput
+
+
+class Measure(Task):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output = {
+            "size": self.wdir.joinpath("size.txt")
+        }
+
+    @staticmethod
+    def requires() -> List[Union[str, Type]]:
+        return []
+
+    @staticmethod
+    def depends() -> List[DependencyInput]:
+        return []
+
+    def run(self):
+        self.single(self.local["wc"]["-c", self.input["reads"]] > str(self.output["size"]))
+
+
+class Report(Task):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output = {
+            "report": self.wdir.joinpath("report.txt")
+        }
+
+    @staticmethod
+    def requires() -> List[Union[str, Type]]:
+        return [Measure]
+
+    @staticmethod
+    def depends() -> List[DependencyInput]:
+        return []
+
+    def run(self):
+        with open(self.input["Measure"]["size"]) as size_ptr, open(self.output["report"], "w") as report_ptr:
+            report_ptr.write(size_ptr.read().split()[0])
@@ -0,0 +1,23 @@
+import os
+from typing import List, Union, Type
+
+from yapim import Task, DependencyInput
+
+
+class CheckProcess(Task):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output = {}
+
+    @staticmethod
+    def requires() -> List[Union[str, Type]]:
+        return ["InProcess"]
+
+    @staticmethod
+    def depends() -> List[DependencyInput]:
+        return []
+
+    def run(self):
+        # Output set within the process backend is returned to the pipeline
+        assert self.input["InProcess"]["pid"] != os.getpid()
+        assert os.path.exists(self.input["InProcess"]["result"])
@@ -0,0 +1,25 @@
+import os
+from typing import List, Union, Type
+
+from yapim import Task, DependencyInput
+
+
+class InProcess(Task):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output = {
+            "result": self.wdir.joinpath("result.txt")
+        }
+
+    @staticmethod
+    def requires() -> List[Union[str, Type]]:
+        return []
+
+    @staticmethod
+    def depends() -> List[DependencyInput]:
+        return []
+
+    def run(self):
+        with open(self.output["result"], "w") as file_ptr:
+            file_ptr.write(str(sum(range(100000))))
+        self.output["pid"] = os.getpid()
@@ -0,0 +1,70 @@
+import threading
+from typing import Dict, List, Union, Type
+
+from yapim import Task, DependencyInput
+
+# Both sibling Tasks of a record must be running at the same time for the record's barrier to pass
+_barriers: Dict[str, threading.Barrier] = {}
+_lock = threading.Lock()
+
+
+def wait_for_sibling(record_id: str):
+    with _lock:
+        barrier = _barriers.setdefault(record_id, threading.Barrier(2, timeout=10))
+    barrier.wait()
+
+
+class QualityCheck(Task):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output = {}
+
+    @staticmethod
+    def requires() -> List[Union[str, Type]]:
+        return []
+
+    @staticmethod
+    def depends() -> List[DependencyInput]:
+        return []
+
+    def run(self):
+        wait_for_sibling(self.record_id)
+
+
+class IdentifyProteins(Task):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output = {}
+
+    @staticmethod
+    def requires() -> List[Union[str, Type]]:
+        return []
+
+    @staticmethod
+    def depends() -> List[DependencyInput]:
+        return []
+
+    def run(self):
+        wait_for_sibling(self.record_id)
+
+
+class Annotate(Task):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output = {
+            "result": self.wdir.joinpath("result.txt")
+        }
+
+    @staticmethod
+    def requires() -> List[Union[str, Type]]:
+        return [QualityCheck, IdentifyProteins]
+
+    @staticmethod
+    def depends() -> List[DependencyInput]:
+        return []
+
+    def run(self):
+        # Siblings have both completed
+        with open(self.output["result"], "w") as result_ptr:
+            result_ptr.write(" ".join(sorted(key for key in ("QualityCheck", "IdentifyProteins")
+                                             if key in self.input.keys())))
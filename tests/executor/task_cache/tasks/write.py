@@ -0,0 +1,26 @@
+from typing import List, Union, Type
+
+from yapim import Task, DependencyInput
+
+
+class Write(Task):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output = {
+            "out": self.wdir.joinpath("out.txt")
+        }
+
+    @staticmethod
+    def requires() -> List[Union[str, Type]]:
+        return []
+
+    @staticmethod
+    def depends() -> List[DependencyInput]:
+        return []
+
+    def run(self):
+        with open(self.output["out"], "w") as out_ptr:
+            out_ptr.write(f"{self.record_id} {self.input['value']} {self.config['FLAGS']}\n")
+        # Runs are counted in the pipeline output directory
+        with open(self.wdir.parent.parent.parent.joinpath("runs.txt"), "a") as runs_ptr:
+            runs_ptr.write(f"{self.record_id}\n")
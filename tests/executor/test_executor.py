@@ -1,18 +1,25 @@
 import glob
+import json
 import os
+import pickle
 import shutil
+import time
 import unittest
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from plumbum import CommandNotFound
 
 from yapim import TaskExecutionError
 from yapim.tasks.utils.base_task import BaseTask
+from yapim.tasks.utils.task_log import TaskLog
+from yapim.utils.config_manager import ConfigManager, InvalidProtocolError
 from yapim.utils.dependency_graph import DependencyGraphGenerationError
 from yapim.utils.executor import Executor
 from yapim.utils.extension_loader import ExtensionLoader
 from yapim.utils.input_loader import InputLoader
+from yapim.utils.path_manager import PathManager
+from yapim.utils.results_store import ResultsStore, UsageRecord
 
 
 class ComplexInputType:
@@ -56,6 +63,47 @@ class TestExecutor(unittest.TestCase):
         def storage_directory(self):
             return ""
 
+    class StreamingLoader(InputLoader):
+        """Yields the first record, and the remainder once the first record's Start Task has written its output"""
+        def __init__(self, n: int, first_output: Path):
+            self.n = n
+            self.first_output = first_output
+            self.first_started_early = False
+
+        def load(self) -> Dict[str, Dict]:
+            return dict(self.stream())
+
+        def stream(self) -> Iterator[Tuple[str, Dict]]:
+            yield "0", {}
+            end = time.time() + 30
+            while not self.first_output.exists() and time.time() < end:
+                time.sleep(0.05)
+            self.first_started_early = self.first_output.exists()
+            for i in range(1, self.n):
+                yield str(i), {}
+
+        def storage_directory(self):
+            return ""
+
+    class SizedLoader(InputLoader):
+        """Record i has an input file of (i + 1) KB"""
+        def __init__(self, n: int, directory: Path):
+            self.n = n
+            self.directory = directory
+
+        def load(self) -> Dict[str, Dict]:
+            os.makedirs(self.directory, exist_ok=True)
+            data = {}
+            for i in range(self.n):
+                reads = self.directory.joinpath(f"{i}.fastq")
+                with open(reads, "wb") as reads_ptr:
+                    reads_ptr.write(b"A" * 1024 * (i + 1))
+                data[str(i)] = {"reads": str(reads)}
+            return data
+
+        def storage_directory(self):
+            return ""
+
     class SimpleLoader(Loader):
         def __init__(self, n: int):
             super().__init__(str, n)
@@ -78,6 +126,21 @@ class TestExecutor(unittest.TestCase):
             display_status_messages=False  # Silence status messages
         ).run()
 
+    def test_hardlink_finalize(self):
+        out_dir = TestExecutor.file.joinpath("hardlink-out")
+        Executor(
+            TestExecutor.SimpleLoader(5),
+            TestExecutor.file.joinpath("simple").joinpath("sample-hardlink-config.yaml"),
+            out_dir,
+            Path("simple").joinpath("sample_tasks1"),
+            [Path("simple").joinpath("sample_dependencies")],
+            display_status_messages=False
+        ).run()
+        final_file = out_dir.joinpath(PathManager.RESULTS).joinpath("sample_tasks1").joinpath("Merge") \
+            .joinpath("aggregate-file.Merge.txt")
+        self.assertTrue(os.path.samefile(out_dir.joinpath("wdir").joinpath("Merge").joinpath("aggregate-file.txt"),
+                                         final_file))
+
     def test_complex(self):
         out_dir = TestExecutor.file.joinpath("simple-out")
         if out_dir.exists():
@@ -163,6 +226,11 @@ class TestExecutor(unittest.TestCase):
             "existing_data/first_pipeline",  # Relative path to pipeline directory
             ["existing_data/sample_dependencies"]
         ).run()
+        # Later pipelines read from the results store
+        store = ResultsStore(TestExecutor.file.joinpath("existing_data-out").joinpath(PathManager.RESULTS)
+                             .joinpath("first_pipeline").joinpath("first_pipeline.db"))
+        self.assertEqual(10, len(store.load(["update-result"])))
+        store.close()
 
         Executor(
             TestExecutor.LoaderWithData(10),  # Input loader
@@ -178,6 +246,20 @@ class TestExecutor(unittest.TestCase):
             "existing_data/third_pipeline",  # Relative path to pipeline directory
         ).run()
 
+        # Records of earlier runs are not written to the .pkl file of a later run
+        Executor(
+            TestExecutor.LoaderWithData(5),
+            TestExecutor.file.joinpath("existing_data").joinpath("first_pipeline-config.yaml"),
+            TestExecutor.file.joinpath("existing_data-out"),
+            "existing_data/first_pipeline",
+            ["existing_data/sample_dependencies"]
+        ).run()
+        with open(TestExecutor.file.joinpath("existing_data-out").joinpath(PathManager.RESULTS)
+                  .joinpath("first_pipeline").joinpath("first_pipeline.pkl"), "rb") as pkl_ptr:
+            record_ids = set(pickle.load(pkl_ptr).keys())
+        self.assertTrue({"0", "1", "2", "3", "4"}.issubset(record_ids))
+        self.assertFalse({"5", "6", "7", "8", "9"} & record_ids)
+
     def test_aggregate_dependencies(self):
         Executor(
             TestExecutor.SimpleLoader(1),  # Input loader
@@ -289,6 +371,269 @@ class TestExecutor(unittest.TestCase):
         deferred_removed_from_partially_kept = glob.glob(str(keep_path.joinpath("*.deferred.out")))
         assert len(deferred_removed_from_partially_kept) == 0
 
+    def test_dag_scheduler_simple(self):
+        Executor(
+            TestExecutor.SimpleLoader(10),
+            TestExecutor.file.joinpath("simple").joinpath("sample-dag-config.yaml"),
+            TestExecutor.file.joinpath("simple_dag-out"),
+            Path("simple").joinpath("sample_tasks1"),
+            [Path("simple").joinpath("sample_dependencies")],
+            display_status_messages=False
+        ).run()
+
+    def test_dag_scheduler_filter(self):
+        Executor(
+            TestExecutor.SimpleLoader(10),
+            TestExecutor.file.joinpath("dag_scheduler").joinpath("dag_scheduler-config.yaml"),
+            TestExecutor.file.joinpath("dag_scheduler-out"),
+            "dag_scheduler/tasks",
+            display_status_messages=False
+        ).run()
+        wdir = Path(__file__).parent.joinpath("dag_scheduler-out").joinpath("wdir")
+        assert len(glob.glob(str(wdir.joinpath("*").joinpath("Independent").joinpath("result.txt")))) == 10
+        after_filter = glob.glob(str(wdir.joinpath("*").joinpath("AfterFilter").joinpath("result.txt")))
+        assert sorted(os.path.basename(Path(path).parent.parent) for path in after_filter) == ["0", "2", "4", "6", "8"]
+
+    def test_dag_scheduler_remap(self):
+        Executor(
+            TestExecutor.SimpleLoader(10),
+            TestExecutor.file.joinpath("dag_remap").joinpath("dag_remap-config.yaml"),
+            TestExecutor.file.joinpath("dag_remap-out"),
+            "dag_remap/tasks",
+            display_status_messages=False
+        ).run()
+        wdir = Path(__file__).parent.joinpath("dag_remap-out").joinpath("wdir")
+        assert len(glob.glob(str(wdir.joinpath("*").joinpath("AfterRemap").joinpath("result.txt")))) == 10
+
+    def _check_aggregate_input(self, config_file: str, out_dir: str, loader: Optional[InputLoader] = None):
+        Executor(
+            loader or TestExecutor.SimpleLoader(5),
+            TestExecutor.file.joinpath("aggregate_input").joinpath(config_file),
+            TestExecutor.file.joinpath(out_dir),
+            "aggregate_input/tasks",
+            ["aggregate_input/dependencies"],
+            display_status_messages=False
+        ).run()
+        wdir = Path(__file__).parent.joinpath(out_dir).joinpath("wdir")
+        for record_id in range(5):
+            with open(wdir.joinpath(str(record_id)).joinpath("UseLabel.Echo").joinpath("result.txt")) as file_ptr:
+                self.assertEqual(f"label-{record_id}", file_ptr.read().strip())
+
+    def test_aggregate_dependency_input(self):
+        self._check_aggregate_input("aggregate_input-config.yaml", "aggregate_input-out")
+
+    def test_dag_scheduler_aggregate_dependency_input(self):
+        self._check_aggregate_input("aggregate_input-dag-config.yaml", "aggregate_input_dag-out")
+
+    def _check_streamed_input(self, config_file: str, out_dir: str):
+        if TestExecutor.file.joinpath(out_dir).exists():
+            shutil.rmtree(TestExecutor.file.joinpath(out_dir))
+        loader = TestExecutor.StreamingLoader(
+            5, TestExecutor.file.joinpath(out_dir).joinpath("wdir").joinpath("0").joinpath("Start")
+            .joinpath("result.txt"))
+        # AggregateTask output is checked for every record
+        self._check_aggregate_input(config_file, out_dir, loader)
+        # First record's Tasks run before the rest of the input is loaded
+        self.assertTrue(loader.first_started_early)
+
+    def test_streamed_input(self):
+        self._check_streamed_input("aggregate_input-config.yaml", "streamed_input-out")
+
+    def test_dag_scheduler_streamed_input(self):
+        self._check_streamed_input("aggregate_input-dag-config.yaml", "streamed_input_dag-out")
+
+    def test_chains_limited_by_resources(self):
+        # More than 64 chains are in flight when resources allow
+        Executor(
+            TestExecutor.SimpleLoader(80),
+            TestExecutor.file.joinpath("concurrent_chains").joinpath("concurrent_chains-config.yaml"),
+            TestExecutor.file.joinpath("concurrent_chains-out"),
+            "concurrent_chains/tasks",
+            display_status_messages=False
+        ).run()
+
+    def test_sibling_tasks_concurrent(self):
+        # Tasks of a record that do not require each other run at the same time
+        Executor(
+            TestExecutor.SimpleLoader(3),
+            TestExecutor.file.joinpath("sibling_tasks").joinpath("sibling_tasks-config.yaml"),
+            TestExecutor.file.joinpath("sibling_tasks-out"),
+            "sibling_tasks/tasks",
+            display_status_messages=False
+        ).run()
+        for i in range(3):
+            with open(TestExecutor.file.joinpath("sibling_tasks-out/wdir").joinpath(str(i)).joinpath("Annotate")
+                      .joinpath("result.txt")) as result_ptr:
+                self.assertEqual("IdentifyProteins QualityCheck", result_ptr.read())
+
+    def _run_prioritized(self, config_file: str, out_dir: str) -> Path:
+        out_dir = TestExecutor.file.joinpath(out_dir)
+        if out_dir.exists():
+            shutil.rmtree(out_dir)
+        Executor(
+            TestExecutor.SizedLoader(5, out_dir.joinpath("input")),
+            TestExecutor.file.joinpath("priority_policy").joinpath(config_file),
+            out_dir,
+            "priority_policy/tasks",
+            display_status_messages=False
+        ).run()
+        # Runtimes of each Task are stored along with the size of each record's input
+        store = ResultsStore(out_dir.joinpath(PathManager.RESULTS).joinpath("tasks").joinpath("tasks.db"))
+        runtimes = store.runtimes()
+        store.close()
+        self.assertEqual({"Measure", "Report"}, set(runtimes.keys()))
+        self.assertEqual((5, 1024 * 15), (runtimes["Measure"][0], runtimes["Measure"][2]))
+        return out_dir.joinpath("wdir")
+
+    def test_lpt_priority(self):
+        wdir = self._run_prioritized("priority_policy-config.yaml", "priority_policy-out")
+        started = {}
+        for i in range(5):
+            with open(wdir.joinpath(str(i)).joinpath("Measure").joinpath(TaskLog.RECORDS)) as records_ptr:
+                started[str(i)] = json.loads(records_ptr.readline())["time"]
+        # Records with the largest input are started first
+        self.assertEqual(["4", "3", "2", "1", "0"], sorted(started.keys(), key=started.get))
+
+    def test_dag_scheduler_critical_path_priority(self):
+        wdir = self._run_prioritized("priority_policy-dag-config.yaml", "priority_policy_dag-out")
+        for i in range(5):
+            with open(wdir.joinpath(str(i)).joinpath("Report").joinpath("report.txt")) as report_ptr:
+                self.assertEqual(str(1024 * (i + 1)), report_ptr.read())
+
+    def test_resource_sizing(self):
+        out_dir = TestExecutor.file.joinpath("resource_sizing-out")
+        if out_dir.exists():
+            shutil.rmtree(out_dir)
+        store_path = out_dir.joinpath(PathManager.RESULTS).joinpath("tasks").joinpath("tasks.db")
+
+        def run() -> List[UsageRecord]:
+            Executor(
+                TestExecutor.SizedLoader(3, out_dir.joinpath("input")),
+                TestExecutor.file.joinpath("priority_policy").joinpath("resource_sizing-config.yaml"),
+                out_dir,
+                "priority_policy/tasks",
+                display_status_messages=False
+            ).run()
+            # Tasks are run again
+            shutil.rmtree(out_dir.joinpath(PathManager.WDIR))
+            store = ResultsStore(store_path)
+            history = [record for record in store.usage_history() if record.task == "Measure"]
+            store.close()
+            return history
+
+        history = run()
+        self.assertEqual(3, len(history))
+        # Measure requests every thread, so its commands run one at a time and are measured
+        self.assertTrue(all(record.cpu_seconds is not None for record in history))
+        self.assertEqual([4, 4, 4], [record.threads for record in history])
+        # Second run requested the threads that the first run used, rather than the 4 threads in the config file
+        self.assertEqual([1, 1, 1], [record.threads for record in run()])
+
+    def test_process_backend(self):
+        out_dir = TestExecutor.file.joinpath("process_backend-out")
+        if out_dir.exists():
+            shutil.rmtree(out_dir)
+        # CheckProcess runs again on the second run, when InProcess is resumed as complete
+        for _ in range(2):
+            Executor(
+                TestExecutor.SimpleLoader(5),
+                TestExecutor.file.joinpath("process_backend").joinpath("process_backend-config.yaml"),
+                out_dir,
+                "process_backend/tasks",
+                display_status_messages=False
+            ).run()
+
+    def test_async_commands(self):
+        Executor(
+            TestExecutor.SimpleLoader(5),
+            TestExecutor.file.joinpath("async_commands").joinpath("async_commands-config.yaml"),
+            TestExecutor.file.joinpath("async_commands-out"),
+            "async_commands/tasks",
+            display_status_messages=False
+        ).run()
+        for i in range(5):
+            result = TestExecutor.file.joinpath("async_commands-out/wdir").joinpath(str(i)).joinpath("SplitLines") \
+                .joinpath("result.txt")
+            with open(result) as result_ptr:
+                self.assertEqual([f"{i}-{j}" for j in range(50)], result_ptr.read().splitlines())
+            # Each concurrent command is logged once, between the Task's start and completion
+            with open(result.parent.joinpath(TaskLog.RECORDS)) as records_ptr:
+                events = [json.loads(line)["event"] for line in records_ptr]
+            self.assertEqual(TaskLog.START, events[0])
+            self.assertEqual(TaskLog.COMPLETE, events[-1])
+            self.assertEqual(51, events.count(TaskLog.COMMAND))
+            self.assertEqual(51, events.count(TaskLog.OUTPUT))
+
+    def test_completion_manifest(self):
+        out_dir = TestExecutor.file.joinpath("completion_manifest-out")
+
+        def run(completion_check: str):
+            Executor(
+                TestExecutor.SimpleLoader(5),
+                TestExecutor.file.joinpath("async_commands").joinpath(f"{completion_check}-config.yaml"),
+                out_dir,
+                "async_commands/tasks",
+                display_status_messages=False
+            ).run()
+
+        result = out_dir.joinpath("wdir").joinpath("0").joinpath("SplitLines").joinpath("result.txt")
+        run("manifest")
+        os.remove(result)
+        # Manifest is trusted
+        run("manifest")
+        self.assertFalse(result.exists())
+        # Files are checked against manifest
+        run("verify")
+        self.assertTrue(result.exists())
+
+    def test_task_cache(self):
+        out_dir = TestExecutor.file.joinpath("task_cache-out")
+
+        def run(config: str, run_dir: str) -> int:
+            Executor(
+                TestExecutor.LoaderWithData(5),
+                TestExecutor.file.joinpath("task_cache").joinpath(f"{config}-config.yaml"),
+                out_dir.joinpath(run_dir),
+                "task_cache/tasks",
+                display_status_messages=False
+            ).run()
+            runs = out_dir.joinpath(run_dir).joinpath("runs.txt")
+            if not runs.exists():
+                return 0
+            with open(runs) as runs_ptr:
+                return len(runs_ptr.readlines())
+
+        self.assertEqual(5, run("task_cache", "first"))
+        # Output is restored from the cache
+        self.assertEqual(0, run("task_cache", "second"))
+        with open(out_dir.joinpath("second").joinpath("wdir").joinpath("1").joinpath("Write")
+                  .joinpath("out.txt")) as out_ptr:
+            self.assertEqual("1 B -a\n", out_ptr.read())
+        # Changed configuration is not a cache hit
+        self.assertEqual(5, run("changed_flags", "third"))
+        # Output of an earlier run with other FLAGS is replaced in the same output directory, here from the cache
+        self.assertEqual(5, run("changed_flags", "first"))
+        with open(out_dir.joinpath("first").joinpath("wdir").joinpath("1").joinpath("Write")
+                  .joinpath("out.txt")) as out_ptr:
+            self.assertEqual("1 B -b\n", out_ptr.read())
+        self.assertEqual(5, run("task_cache", "first"))
+        with open(out_dir.joinpath("first").joinpath("wdir").joinpath("1").joinpath("Write")
+                  .joinpath("out.txt")) as out_ptr:
+            self.assertEqual("1 B -a\n", out_ptr.read())
+        # Output that matches its recorded key is complete
+        self.assertEqual(5, run("changed_flags", "third"))
+        # Out of date output is run again if it is not in the cache
+        shutil.rmtree(out_dir.joinpath("cache"))
+        self.assertEqual(5, run("changed_flags", "second"))
+
+    def test_invalid_backend(self):
+        with self.assertRaises(InvalidProtocolError):
+            ConfigManager(TestExecutor.file.joinpath("process_backend").joinpath("bad_backend-config.yaml"))
+
+    def test_invalid_scheduler(self):
+        with self.assertRaises(InvalidProtocolError):
+            ConfigManager(TestExecutor.file.joinpath("dag_scheduler").joinpath("bad_scheduler-config.yaml"))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,59 @@
+"""Measure import time of YAPIM entry points with `python -X importtime`
+
+Usage: python benchmark_import_time.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+REPO = Path(__file__).resolve().parents[2]
+# Name of entry point, and arguments to python
+ENTRY_POINTS: Dict[str, List[str]] = {
+    "import yapim": ["-c", "import yapim"],
+    "from yapim import Task": ["-c", "from yapim import Task"],
+    "from yapim import Executor": ["-c", "from yapim import Executor"],
+    "yapim --help": [str(REPO.joinpath("yapim").joinpath("yapim")), "--help"],
+}
+# Dependencies that only the pipeline runner needs
+HEAVY_MODULES = ("Bio", "networkx", "art", "yaml")
+
+
+def import_time(arguments: List[str]) -> Tuple[float, List[str]]:
+    """ Run python with -X importtime
+
+    :param arguments: Arguments to python
+    :return: Total import time in ms, and names of imported modules
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([str(REPO), env.get("PYTHONPATH", "")])
+    stderr = subprocess.run([sys.executable, "-X", "importtime", *arguments], env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, check=True, universal_newlines=True).stderr
+    total = 0
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_time, _, module = line.split("|")
+        total += int(self_time.split(":")[-1])
+        modules.append(module.strip())
+    return total / 1000, modules
+
+
+def main(runs: int):
+    """Print median import time and heavy dependencies imported by each entry point"""
+    print(f"{'entry point':<28}{'median ms':>10}  heavy dependencies")
+    for name, arguments in ENTRY_POINTS.items():
+        times = []
+        modules: List[str] = []
+        for _ in range(runs):
+            total, modules = import_time(arguments)
+            times.append(total)
+        heavy = sorted({module for module in modules if module.split(".")[0] in HEAVY_MODULES and "." not in module})
+        print(f"{name:<28}{statistics.median(times):>10.1f}  {', '.join(heavy) or '-'}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,27 @@
+import unittest
+
+from .benchmark_import_time import ENTRY_POINTS, HEAVY_MODULES, import_time
+
+
+class TestImportTime(unittest.TestCase):
+    @staticmethod
+    def heavy_imports(entry_point: str):
+        _, modules = import_time(ENTRY_POINTS[entry_point])
+        return {module for module in modules if module in HEAVY_MODULES}
+
+    def test_task_import(self):
+        self.assertEqual(set(), TestImportTime.heavy_imports("from yapim import Task"))
+
+    def test_package_import(self):
+        self.assertEqual(set(), TestImportTime.heavy_imports("import yapim"))
+
+    def test_executor_import(self):
+        # The pipeline runner does not load the config parser, sequences or banner fonts until it runs
+        self.assertEqual(set(), TestImportTime.heavy_imports("from yapim import Executor"))
+
+    def test_help(self):
+        self.assertNotIn("Bio", TestImportTime.heavy_imports("yapim --help"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from yapim import ExtensionLoader
+from yapim.utils import input_staging
+from yapim.utils.path_manager import PathManager
+
+
+class TestInputStaging(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, name: str, contents: bytes) -> str:
+        path = str(self.tmp_dir.joinpath(name))
+        with (gzip.open(path, "wb") if name.endswith(".gz") else open(path, "wb")) as file_ptr:
+            file_ptr.write(contents)
+        return path
+
+    def read(self, name: str) -> bytes:
+        with open(self.tmp_dir.joinpath(name), "rb") as file_ptr:
+            return file_ptr.read()
+
+    def test_unchanged_fasta_linked(self):
+        file = self.write("genome.fna", b">contig_1\nACGT\nACGT\n>contig_2\nTTTT\n")
+        new_file = str(self.tmp_dir.joinpath("staged.fna"))
+        input_staging.stage(file, new_file, input_staging.FASTA, link_unchanged=True)
+        self.assertTrue(os.path.samefile(file, new_file))
+
+    def test_unchanged_fasta_copied(self):
+        file = self.write("genome.fna", b">contig_1\nACGT\n")
+        input_staging.stage(file, str(self.tmp_dir.joinpath("staged.fna")), input_staging.FASTA)
+        self.assertFalse(os.path.samefile(file, self.tmp_dir.joinpath("staged.fna")))
+        self.assertEqual(b">contig_1\nACGT\n", self.read("staged.fna"))
+
+    def test_fasta_descriptions_removed(self):
+        file = self.write("genome.fna", b">contig_1 first contig\nACGT\nACGT\n>contig_2\tsecond\nTTTT\n")
+        input_staging.stage(file, str(self.tmp_dir.joinpath("staged.fna")), input_staging.FASTA)
+        self.assertEqual(b">contig_1\nACGT\nACGT\n>contig_2\nTTTT\n", self.read("staged.fna"))
+        self.assertFalse(self.tmp_dir.joinpath("staged.fna.tmp").exists())
+
+    def test_gzip_fastq(self):
+        file = self.write("reads_1.fastq.gz",
+                          b"@read_1 length=4\nACGT\n+read_1 length=4\nIIII\n@read_2\nTTTT\n+\nIIII\n")
+        input_staging.stage(file, str(self.tmp_dir.joinpath("staged.fastq")), input_staging.FASTQ)
+        self.assertEqual(b"@read_1\nACGT\n+\nIIII\n@read_2\nTTTT\n+\nIIII\n", self.read("staged.fastq"))
+
+    def test_gzip_text(self):
+        file = self.write("genes.gff3.gz", b"##gff-version 3\n")
+        input_staging.stage(file, str(self.tmp_dir.joinpath("staged.gff3")), input_staging.TEXT)
+        self.assertEqual(b"##gff-version 3\n", self.read("staged.gff3"))
+
+    def test_extension_loader(self):
+        input_dir = self.tmp_dir.joinpath("raw")
+        os.makedirs(input_dir)
+        self.write("raw/genome.fna.gz", b">contig_1 first contig\nACGT\n")
+        self.write("raw/genome.gff3", b"##gff-version 3\n")
+        data = ExtensionLoader(input_dir, self.tmp_dir).load()
+        storage_dir = self.tmp_dir.joinpath(PathManager.STORAGE_DIR)
+        self.assertEqual({"genome": {"fasta": str(storage_dir.joinpath("genome.fna")),
+                                     "gff3": str(storage_dir.joinpath("genome.gff3"))}}, data)
+        self.assertEqual(b">contig_1\nACGT\n", self.read(f"{PathManager.STORAGE_DIR}/genome.fna"))
+        # Input files are copied unless the loader links them
+        self.assertFalse(os.path.samefile(input_dir.joinpath("genome.gff3"), storage_dir.joinpath("genome.gff3")))
+        shutil.rmtree(storage_dir)
+        ExtensionLoader(input_dir, self.tmp_dir, link_input=True).load()
+        self.assertTrue(os.path.samefile(input_dir.joinpath("genome.gff3"), storage_dir.joinpath("genome.gff3")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import errno
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from yapim.tasks.utils.output_finalizer import OutputFinalizer
+from yapim.utils.config_manager import ConfigManager
+
+
+class TestOutputFinalizer(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.file = str(self.tmp_dir.joinpath("output.txt"))
+        with open(self.file, "w") as file_ptr:
+            file_ptr.write("output\n")
+        self.final_file = str(self.tmp_dir.joinpath("output.Task.txt"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def finalize(self, strategy: str):
+        finalizer = OutputFinalizer(strategy)
+        finalizer.finalize(self.file, self.final_file)
+        finalizer.close()
+        with open(self.final_file) as file_ptr:
+            self.assertEqual("output\n", file_ptr.read())
+        self.assertFalse(os.path.exists(self.final_file + ".tmp"))
+
+    def test_copy(self):
+        self.finalize(ConfigManager.COPY_FINALIZE)
+        self.assertFalse(os.path.samefile(self.file, self.final_file))
+
+    def test_hardlink(self):
+        self.finalize(ConfigManager.HARDLINK_FINALIZE)
+        self.assertTrue(os.path.samefile(self.file, self.final_file))
+        self.assertFalse(os.path.islink(self.final_file))
+
+    def test_reflink(self):
+        # Falls back to a copy on filesystems without copy-on-write support
+        self.finalize(ConfigManager.REFLINK_FINALIZE)
+        self.assertFalse(os.path.samefile(self.file, self.final_file))
+
+    def test_symlink(self):
+        self.finalize(ConfigManager.SYMLINK_FINALIZE)
+        self.assertEqual(self.file, os.readlink(self.final_file))
+
+    def test_move(self):
+        self.finalize(ConfigManager.MOVE_FINALIZE)
+        self.assertFalse(os.path.islink(self.final_file))
+        # Task output is still readable from its working directory
+        self.assertEqual(self.final_file, os.readlink(self.file))
+        # Finalizing again, as when a pipeline is rerun, leaves output in place
+        self.finalize(ConfigManager.MOVE_FINALIZE)
+        self.assertFalse(os.path.islink(self.final_file))
+
+    def test_fallback_copy(self):
+        with mock.patch("os.link", side_effect=OSError(errno.EXDEV, "Invalid cross-device link")):
+            self.finalize(ConfigManager.HARDLINK_FINALIZE)
+        self.assertFalse(os.path.samefile(self.file, self.final_file))
+
+    def test_on_complete(self):
+        finalized = []
+        finalizer = OutputFinalizer(ConfigManager.COPY_FINALIZE)
+        finalizer.finalize(self.file, self.final_file, lambda: finalized.append(os.path.exists(self.final_file)))
+        finalizer.close()
+        # Called once the copy is in place
+        self.assertEqual([True], finalized)
+        finalizer = OutputFinalizer(ConfigManager.HARDLINK_FINALIZE)
+        finalizer.finalize(self.file, self.final_file, lambda: finalized.append(True))
+        finalizer.close()
+        self.assertEqual([True, True], finalized)
+
+    def test_copy_error(self):
+        finalizer = OutputFinalizer(ConfigManager.COPY_FINALIZE)
+        finalizer.finalize(str(self.tmp_dir.joinpath("missing.txt")), self.final_file)
+        with self.assertRaises(FileNotFoundError):
+            finalizer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from tests.dependency_graph.class_stubs import A, B, C, D
+from yapim.tasks.utils.task_result import TaskResult
+from yapim.utils.dependency_graph import DependencyGraph
+from yapim.utils.priority_policy import PriorityPolicy, input_size
+
+
+def graph() -> DependencyGraph:
+    # A -> B -> C, and B -> D
+    return DependencyGraph([A, B, C, D], {task.__name__: task for task in (A, B, C, D)})
+
+
+class TestPriorityPolicy(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name: str, size: int) -> str:
+        path = self.directory.joinpath(name)
+        with open(path, "wb") as file_ptr:
+            file_ptr.write(b"A" * size)
+        return str(path)
+
+    def test_input_size(self):
+        data = {"reads": self.write("reads.fastq", 100), "value": "not a file", "missing": Path("missing.txt"),
+                "A": TaskResult("1", "A", {"out": self.write("out.txt", 10)})}
+        self.assertEqual(100, input_size(data))
+        # Input of each record of an AggregateTask
+        self.assertEqual(200, input_size({"1": data, "2": {"fasta": Path(self.write("genome.fna", 100))}}))
+
+    def test_fifo(self):
+        policy = PriorityPolicy(PriorityPolicy.FIFO, graph(), {"A": (1, 10.0, 100)})
+        policy.add_record("1", {"reads": self.write("reads.fastq", 100)})
+        self.assertEqual(0.0, policy.priority("1", ["A", "B"]))
+
+    def test_lpt_scaled_by_input_size(self):
+        policy = PriorityPolicy(PriorityPolicy.LPT, graph(), {"A": (2, 10.0, 200), "B": (1, 4.0, 0)})
+        policy.add_record("small", {"reads": self.write("small.fastq", 50)})
+        policy.add_record("large", {"reads": self.write("large.fastq", 300)})
+        # A takes 0.05s per byte, and B has no stored input size so its mean runtime is used
+        self.assertAlmostEqual(2.5 + 4.0, policy.priority("small", ["A", "B"]))
+        self.assertAlmostEqual(15.0 + 4.0, policy.priority("large", ["A", "B"]))
+
+    def test_without_runtimes(self):
+        policy = PriorityPolicy(PriorityPolicy.LPT, graph(), {})
+        policy.add_record("small", {"reads": self.write("small.fastq", 50)})
+        policy.add_record("large", {"reads": self.write("large.fastq", 300)})
+        # Records are compared by the size of their input
+        self.assertLess(policy.priority("small", ["A"]), policy.priority("large", ["A"]))
+        self.assertEqual(1.0, policy.priority("unmeasured", ["A"]))
+
+    def test_critical_path(self):
+        policy = PriorityPolicy(PriorityPolicy.CRITICAL_PATH, graph(),
+                                {"A": (1, 1.0, 0), "B": (1, 2.0, 0), "C": (1, 5.0, 0), "D": (1, 3.0, 0)})
+        # Longest path from each Task through the Tasks that require it
+        self.assertEqual(5.0, policy.priority("1", ["C"]))
+        self.assertEqual(3.0, policy.priority("1", ["D"]))
+        self.assertEqual(7.0, policy.priority("1", ["B"]))
+        self.assertEqual(8.0, policy.priority("1", ["A"]))
+        self.assertEqual(8.0, policy.priority("1", ["A", "D"]))
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            PriorityPolicy("shortest", graph(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
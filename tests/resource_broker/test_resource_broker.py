@@ -0,0 +1,126 @@
+import threading
+import time
+import unittest
+
+from yapim.tasks.utils.resource_broker import ResourceBroker
+
+
+class TestResourceBroker(unittest.TestCase):
+    class Request:
+        """Acquire resources on a separate thread"""
+        def __init__(self, broker: ResourceBroker, name: str, threads: int, memory: int):
+            self.granted = threading.Event()
+
+            def _acquire():
+                broker.acquire(name, threads, memory)
+                self.granted.set()
+
+            self.thread = threading.Thread(target=_acquire, daemon=True)
+            self.thread.start()
+
+        def wait(self):
+            assert self.granted.wait(10)
+            self.thread.join()
+
+    @staticmethod
+    def wait_for_queue(broker: ResourceBroker, n: int):
+        # Only used to wait for requesting threads to reach the broker
+        while broker.waiting < n:
+            time.sleep(0.001)
+
+    @staticmethod
+    def request(broker: ResourceBroker, name: str, threads: int, memory: int) -> "TestResourceBroker.Request":
+        request = TestResourceBroker.Request(broker, name, threads, memory)
+        TestResourceBroker.wait_for_queue(broker, 1)
+        return request
+
+    def test_immediate(self):
+        broker = ResourceBroker(4, 10)
+        broker.acquire("A", 2, 5)
+        broker.acquire("B", 2, 5)
+        self.assertEqual((4, 10), (broker.threads_in_use, broker.memory_in_use))
+        broker.release(2, 5)
+        broker.release(2, 5)
+        self.assertEqual((0, 0), (broker.threads_in_use, broker.memory_in_use))
+
+    def test_fifo(self):
+        broker = ResourceBroker(4, 10)
+        broker.acquire("Holder", 4, 1)
+        large = TestResourceBroker.request(broker, "Large", 4, 1)
+        small = TestResourceBroker.Request(broker, "Small", 1, 1)
+        TestResourceBroker.wait_for_queue(broker, 2)
+        broker.release(1, 0)
+        # Large request is first in line and blocks the small request
+        self.assertEqual(2, broker.waiting)
+        self.assertEqual(3, broker.threads_in_use)
+        broker.release(3, 1)
+        large.wait()
+        self.assertEqual(1, broker.waiting)
+        self.assertFalse(small.granted.is_set())
+        broker.release(4, 1)
+        small.wait()
+        self.assertEqual((0, 1, 1), (broker.waiting, broker.threads_in_use, broker.memory_in_use))
+
+    def test_best_fit(self):
+        broker = ResourceBroker(4, 10, ResourceBroker.BEST_FIT)
+        broker.acquire("Holder", 4, 1)
+        large = TestResourceBroker.request(broker, "Large", 4, 1)
+        small = TestResourceBroker.Request(broker, "Small", 1, 1)
+        TestResourceBroker.wait_for_queue(broker, 2)
+        medium = TestResourceBroker.Request(broker, "Medium", 2, 1)
+        TestResourceBroker.wait_for_queue(broker, 3)
+        broker.release(2, 0)
+        # Medium request is the largest that fits
+        medium.wait()
+        self.assertEqual(2, broker.waiting)
+        self.assertEqual(4, broker.threads_in_use)
+        self.assertFalse(small.granted.is_set())
+        broker.release(1, 0)
+        small.wait()
+        self.assertEqual(1, broker.waiting)
+        broker.release(1, 1)
+        broker.release(1, 1)
+        broker.release(2, 1)
+        large.wait()
+        self.assertEqual((0, 4, 1), (broker.waiting, broker.threads_in_use, broker.memory_in_use))
+
+    def test_best_fit_reserves_for_starved_request(self):
+        broker = ResourceBroker(4, 10, ResourceBroker.BEST_FIT, max_bypass=3)
+        broker.acquire("Holder", 2, 1)
+        large = TestResourceBroker.request(broker, "Large", 4, 1)
+        # Small requests keep arriving and fit in the free resources
+        for _ in range(3):
+            broker.acquire("Small", 1, 1)
+            broker.release(1, 1)
+        self.assertFalse(large.granted.is_set())
+        small = TestResourceBroker.Request(broker, "Small", 1, 1)
+        TestResourceBroker.wait_for_queue(broker, 2)
+        # Large request has reserved resources, so the small request waits
+        self.assertEqual(2, broker.threads_in_use)
+        broker.release(2, 1)
+        large.wait()
+        self.assertEqual(1, broker.waiting)
+        self.assertFalse(small.granted.is_set())
+        broker.release(4, 1)
+        small.wait()
+        self.assertEqual(0, broker.waiting)
+
+    def test_metrics(self):
+        broker = ResourceBroker(1, 1)
+        broker.acquire("A", 1, 1)
+        request = TestResourceBroker.request(broker, "B", 1, 1)
+        broker.release(1, 1)
+        request.wait()
+        metrics = broker.metrics()
+        self.assertEqual(1, metrics["A"].count)
+        self.assertEqual(1, metrics["B"].count)
+        self.assertGreater(metrics["B"].maximum, 0.0)
+        self.assertEqual(metrics["B"].maximum, metrics["B"].mean)
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            ResourceBroker(1, 1, "unknown")
+
+
+if __name__ == '__main__':
+    unittest.main()
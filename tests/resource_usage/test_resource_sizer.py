@@ -0,0 +1,64 @@
+import unittest
+
+from yapim.tasks.utils.resource_sizer import ResourceSizer, SizedResources
+from yapim.utils.config_manager import TaskSettings
+from yapim.utils.results_store import UsageRecord
+
+_GB = 1 << 30
+
+
+def settings(threads: int = 8, memory: int = 16, time=None) -> TaskSettings:
+    return TaskSettings(
+        section={}, resolved={}, threads=threads, memory=memory, time=time, nodes=None, tasks=None, backend="thread",
+        skip=False, cache=False, program=None, program_path=None, flags=(), slurm_header=None
+    )
+
+
+class TestResourceSizer(unittest.TestCase):
+    def setUp(self):
+        self.sizer = ResourceSizer([
+            UsageRecord("1", "Task", 100.0, 1000, 150.0, 2 * _GB, 8),
+            UsageRecord("2", "Task", 50.0, 500, 100.0, _GB, 8),
+            # Not measured
+            UsageRecord("1", "Other", 10.0, 1000, None, None, 4),
+        ])
+
+    def test_size(self):
+        # Up to 2 cores and 2GB, with headroom
+        self.assertEqual(SizedResources(3, 3, None), self.sizer.size("Task", settings(), 1000))
+        # Larger input scales memory
+        self.assertEqual(SizedResources(3, 5, None), self.sizer.size("Task", settings(), 2000))
+
+    def test_config_limits(self):
+        # Requests are never larger than the config file
+        self.assertEqual(SizedResources(1, 2, "00:30:00"), self.sizer.size("Task", settings(1, 2, "00:30:00"), 10000))
+        # Tasks without measured CPU time and memory request their configured threads and memory
+        self.assertEqual(SizedResources(4, 8, "00:01:00"), self.sizer.size("Other", settings(4, 8, "1:00:00"), 1000))
+        self.assertEqual(SizedResources(8, 16, None), self.sizer.size("New", settings(), 1000))
+
+    def test_unmeasured_memory(self):
+        sizer = ResourceSizer([
+            UsageRecord("1", "Task", 100.0, 1000, 100.0, 2 * _GB, 8),
+            UsageRecord("2", "Task", 100.0, 1000, 100.0, None, 8),
+        ])
+        # A run whose peak memory was not measured may have used more
+        self.assertEqual(SizedResources(2, 16, None), sizer.size("Task", settings(), 1000))
+
+    def test_time(self):
+        # Longest runtime with headroom, rounded up to minutes
+        self.assertEqual("00:04:00", self.sizer.size("Task", settings(time="1-00:00:00"), 1000).time)
+        self.assertEqual("00:07:00", self.sizer.size("Task", settings(time="1-00:00:00"), 2000).time)
+
+    def test_summary(self):
+        other, task = self.sizer.summary()
+        self.assertEqual(("Other", 1, 10.0, None, None, None), (other.task, other.runs, other.max_seconds,
+                                                                other.mean_cores, other.mean_utilization,
+                                                                other.max_peak_memory))
+        self.assertEqual(("Task", 2, 75.0, 100.0, 1.75, 2 * _GB),
+                         (task.task, task.runs, task.mean_seconds, task.max_seconds, task.mean_cores,
+                          task.max_peak_memory))
+        self.assertAlmostEqual(1.75 / 8, task.mean_utilization)
+
+
+if __name__ == '__main__':
+    unittest.main()
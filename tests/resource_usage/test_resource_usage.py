@@ -0,0 +1,74 @@
+import pickle
+import sys
+import threading
+import time
+import unittest
+
+from plumbum import local, ProcessExecutionError
+
+from yapim.tasks.utils.resource_usage import ResourceUsage, run_command
+
+
+class TestResourceUsage(unittest.TestCase):
+    def test_run_command(self):
+        usage = ResourceUsage()
+        self.assertEqual("out\n", run_command(local["echo"]["out"], usage))
+        self.assertTrue(usage.measured)
+        self.assertIsNotNone(usage.cpu_seconds)
+        # Command used less memory than this process
+        self.assertIsNone(usage.peak_memory)
+
+    def test_peak_memory(self):
+        usage = ResourceUsage()
+        run_command(local[sys.executable]["-c", "data = bytearray(256 << 20); data[::4096] = b'A' * len(data[::4096])"],
+                    usage)
+        self.assertGreaterEqual(usage.peak_memory, 256 << 20)
+        self.assertGreater(usage.cpu_seconds, 0)
+
+    def test_error(self):
+        usage = ResourceUsage()
+        with self.assertRaises(ProcessExecutionError) as err:
+            run_command(local[sys.executable]["-c", "import sys; sys.stderr.write('bad'); sys.exit(3)"], usage)
+        self.assertEqual(3, err.exception.retcode)
+        self.assertEqual("bad", err.exception.stderr)
+        self.assertTrue(usage.measured)
+
+    def test_pipeline(self):
+        usage = ResourceUsage()
+        self.assertEqual("1\n", run_command(local["echo"]["out"] | local["wc"]["-l"], usage).lstrip())
+        self.assertIsNotNone(usage.cpu_seconds)
+
+    def test_overlapping_commands(self):
+        usage, other_usage = ResourceUsage(), ResourceUsage()
+        sleep = local[sys.executable]["-c", "import time; time.sleep(0.5)"]
+        thread = threading.Thread(target=run_command, args=(sleep, other_usage))
+        thread.start()
+        time.sleep(0.1)
+        run_command(local["echo"]["out"], usage)
+        thread.join()
+        # Commands of different Tasks that ran at the same time are not measured
+        self.assertEqual((None, None), (usage.cpu_seconds, usage.peak_memory))
+        self.assertEqual((None, None), (other_usage.cpu_seconds, other_usage.peak_memory))
+        # Commands of the same Task are measured together
+        usage = ResourceUsage()
+        threads = [threading.Thread(target=run_command, args=(sleep, usage)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertIsNotNone(usage.cpu_seconds)
+
+    def test_pickle(self):
+        usage = ResourceUsage()
+        usage.add(1.5, 1024)
+        usage.add(0.5, 512)
+        usage = pickle.loads(pickle.dumps(usage))
+        usage.add(1.0, 0)
+        self.assertEqual((3.0, 1024, True), (usage.cpu_seconds, usage.peak_memory, usage.measured))
+        # Usage of a Task is not known once that of any of its commands is not
+        usage.add(1.0, None)
+        self.assertEqual((4.0, None), (usage.cpu_seconds, usage.peak_memory))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import pickle
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from yapim.utils.config_manager import ImproperInputSection
+from yapim.utils.existing_input_loader import ExistingInputLoader
+from yapim.utils.results_store import ResultsStore
+
+
+class TestExistingInputLoader(unittest.TestCase):
+    output = {"1": {"fasta": "1.fna", "count": 1}, "2": {"fasta": "2.fna"}, "3": {}}
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.directory.joinpath("upstream").mkdir()
+        self.results_base_dir = str(self.directory.joinpath("downstream"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_store(self):
+        store = ResultsStore(self.directory.joinpath("upstream").joinpath("upstream.db"))
+        store.add_records(TestExistingInputLoader.output.keys())
+        for record_id, record_output in TestExistingInputLoader.output.items():
+            store.put(record_id, record_output)
+        store.close()
+
+    def write_pkl(self):
+        with open(self.directory.joinpath("upstream").joinpath("upstream.pkl"), "wb") as file_ptr:
+            pickle.dump(TestExistingInputLoader.output, file_ptr)
+
+    def populate(self, requested_input):
+        return ExistingInputLoader({"root": "all", "upstream": requested_input}, self.results_base_dir).populate()
+
+    def check_loaded(self):
+        self.assertEqual(TestExistingInputLoader.output, self.populate("all"))
+        self.assertEqual({"1": {"count": 1}}, self.populate("count"))
+        self.assertEqual({"1": {"input": "1.fna"}, "2": {"input": "2.fna"}}, self.populate({"input": "fasta"}))
+        self.assertEqual(
+            {"1": {"count": 1, "input": "1.fna"}, "2": {"input": "2.fna"}},
+            self.populate(["count", {"input": "fasta"}])
+        )
+        with self.assertRaises(ImproperInputSection):
+            self.populate("missing")
+
+    def test_results_store(self):
+        self.write_store()
+        self.check_loaded()
+
+    def test_pkl(self):
+        self.write_pkl()
+        self.check_loaded()
+
+    def test_missing_pipeline(self):
+        with self.assertRaises(ImproperInputSection):
+            self.populate("all")
+
+
+if __name__ == '__main__':
+    unittest.main()
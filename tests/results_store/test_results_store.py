@@ -0,0 +1,93 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from yapim.utils.results_store import ResultsStore, UsageRecord
+
+
+class TestResultsStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.path = self.directory.joinpath("pipeline.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_put_and_load(self):
+        store = ResultsStore(self.path)
+        store.add_records(["1", "2", "3"])
+        store.put("1", {"file": Path("/tmp/1.txt"), "count": 1})
+        store.put("2", {"file": Path("/tmp/2.txt")})
+        self.assertEqual(
+            {"1": {"file": Path("/tmp/1.txt"), "count": 1}, "2": {"file": Path("/tmp/2.txt")}, "3": {}},
+            store.load()
+        )
+        store.close()
+
+    def test_load_keys(self):
+        store = ResultsStore(self.path)
+        store.add_records(["1", "2"])
+        store.put("1", {"file": "a", "count": 1})
+        store.put("2", {"count": 2})
+        self.assertEqual({"1": {"file": "a"}}, store.load(["file"]))
+        self.assertEqual({"1": {"count": 1}, "2": {"count": 2}}, store.load(["count"]))
+        store.close()
+
+    def test_persists_between_runs(self):
+        store = ResultsStore(self.path)
+        store.put("1", {"file": "a", "count": 1})
+        store.close()
+        # Re-run replaces values for the same keys and keeps earlier output
+        store = ResultsStore(self.path)
+        store.put("1", {"count": 2})
+        self.assertEqual({"1": {"file": "a", "count": 2}}, store.load())
+        store.close()
+
+    def test_start_run(self):
+        store = ResultsStore(self.path)
+        store.put("1", {"file": "a"})
+        store.put("2", {"file": "b"})
+        store.close()
+        # Records of earlier runs are not loaded unless they are added again
+        store = ResultsStore(self.path)
+        store.start_run()
+        store.add_records(["2", "3"])
+        self.assertEqual({"2": {"file": "b"}, "3": {}}, store.load())
+        self.assertEqual({"2": {"file": "b"}}, store.load(["file"]))
+        self.assertEqual({"2": "b"}, store.load_key("file"))
+        store.close()
+
+    def test_task_output(self):
+        store = ResultsStore(self.path)
+        store.record_task_output("1", "Task", {"pid": 1, "count": 2})
+        # A re-run replaces the output of a Task on a record
+        store.record_task_output("1", "Task", {"pid": 3})
+        self.assertEqual({"pid": 3}, store.task_output("1", "Task"))
+        self.assertEqual({}, store.task_output("2", "Task"))
+        store.close()
+
+    def test_runtimes(self):
+        store = ResultsStore(self.path)
+        store.record_runtime("1", "Task", 2.0, 100)
+        store.record_runtime("2", "Task", 3.0, 200)
+        store.record_runtime("1", "Other.Dependency", 1.0, 100)
+        store.close()
+        # A re-run replaces the runtime of a Task on a record
+        store = ResultsStore(self.path)
+        store.record_runtime("1", "Task", 4.0, 100)
+        self.assertEqual({"Task": (2, 7.0, 300), "Other.Dependency": (1, 1.0, 100)}, store.runtimes())
+        store.close()
+
+    def test_usage_history(self):
+        store = ResultsStore(self.path)
+        store.record_runtime("1", "Task", 2.0, 100, (3.5, 1024), 2)
+        store.record_runtime("2", "Task", 3.0, 200)
+        self.assertEqual(
+            [UsageRecord("1", "Task", 2.0, 100, 3.5, 1024, 2), UsageRecord("2", "Task", 3.0, 200, None, None, None)],
+            store.usage_history()
+        )
+        store.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from plumbum import local
+
+from yapim.tasks.utils.slurm_batcher import SLURMBatcher
+
+
+class TestSLURMBatcher(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        # Stand-in for sbatch that records each submitted script
+        sbatch = self.directory.joinpath("sbatch")
+        with open(sbatch, "w") as file_ptr:
+            file_ptr.write("#!/bin/bash\n")
+            file_ptr.write(f"echo \"$1\" >> {self.directory.joinpath('submitted.txt')}\n")
+            file_ptr.write("echo \"Submitted batch job 42\"\n")
+        os.chmod(sbatch, 0o755)
+        self.env = local.env(PATH=f"{self.directory}:{local.env['PATH']}")
+        self.env.__enter__()
+
+    def tearDown(self):
+        self.env.__exit__(None, None, None)
+        shutil.rmtree(self.directory)
+
+    def script(self, i: int, time: str = "1:00:00") -> str:
+        path = self.directory.joinpath(f"script-{i}.sh")
+        with open(path, "w") as file_ptr:
+            file_ptr.write(f"#!/bin/bash\n\n#SBATCH --time={time}\n\necho {i}\n")
+        return str(path)
+
+    def submitted(self):
+        with open(self.directory.joinpath("submitted.txt")) as file_ptr:
+            return file_ptr.read().splitlines()
+
+    def submit_all(self, batcher: SLURMBatcher, keys_and_scripts):
+        job_ids = [None] * len(keys_and_scripts)
+
+        def _submit(i, key, script):
+            job_ids[i] = batcher.submit(key, script)
+
+        threads = [threading.Thread(target=_submit, args=(i, *key_and_script))
+                   for i, key_and_script in enumerate(keys_and_scripts)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        return job_ids
+
+    def test_full_batch(self):
+        batcher = SLURMBatcher(4, 60)
+        scripts = [self.script(i) for i in range(4)]
+        job_ids = self.submit_all(batcher, [("Task", script) for script in scripts])
+        self.assertEqual(["42_0", "42_1", "42_2", "42_3"], sorted(job_ids))
+        submitted = self.submitted()
+        self.assertEqual(1, len(submitted))
+        with open(submitted[0]) as file_ptr:
+            array_script = file_ptr.read()
+        self.assertIn("#SBATCH --time=1:00:00\n", array_script)
+        self.assertIn("#SBATCH --array=0-3\n", array_script)
+        for script in scripts:
+            self.assertIn(script, array_script)
+
+    def test_partial_batch(self):
+        batcher = SLURMBatcher(100, 0.1)
+        job_ids = self.submit_all(batcher, [("Task", self.script(i)) for i in range(3)])
+        self.assertEqual(3, len([job_id for job_id in job_ids if job_id is not None]))
+        self.assertTrue(all(job_id.startswith("42_") for job_id in job_ids))
+
+    def test_batches_split_by_key(self):
+        batcher = SLURMBatcher(2, 60)
+        job_ids = self.submit_all(batcher, [("Task", self.script(0)), ("Other", self.script(1, "2:00:00")),
+                                            ("Task", self.script(2)), ("Other", self.script(3, "2:00:00"))])
+        self.assertEqual(["42_0", "42_0", "42_1", "42_1"], sorted(job_ids))
+        self.assertEqual(2, len(self.submitted()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from plumbum import local
+
+from yapim.tasks.utils.slurm_status import SlurmMonitor, SlurmJob, format_slurm_time, parse_slurm_time
+
+
+class TestSlurmMonitor(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        # Stand-ins for squeue and sacct that print the contents of queue.txt and sacct.txt
+        for program, output in (("squeue", "queue.txt"), ("sacct", "sacct.txt")):
+            path = self.directory.joinpath(program)
+            with open(path, "w") as file_ptr:
+                file_ptr.write(f"#!/bin/bash\ncat {self.directory.joinpath(output)}\n")
+            os.chmod(path, 0o755)
+        self.set_queue("")
+        self.set_accounting("")
+        self.env = local.env(PATH=f"{self.directory}:{local.env['PATH']}")
+        self.env.__enter__()
+
+    def tearDown(self):
+        self.env.__exit__(None, None, None)
+        shutil.rmtree(self.directory)
+
+    def set_queue(self, contents: str):
+        with open(self.directory.joinpath("queue.txt"), "w") as file_ptr:
+            file_ptr.write(contents)
+
+    def set_accounting(self, contents: str):
+        with open(self.directory.joinpath("sacct.txt"), "w") as file_ptr:
+            file_ptr.write(contents)
+
+    def test_parse_queue(self):
+        self.assertEqual(
+            {"1234": "RUNNING", "42_3": "PENDING"},
+            SlurmMonitor.parse_queue("1234 RUNNING\n42_3 PENDING\n\n")
+        )
+
+    def test_parse_accounting(self):
+        self.assertEqual(
+            {"1": ("COMPLETED", 0, 0), "2_0": ("FAILED", 1, 0), "3": ("CANCELLED", 0, 15), "4": ("TIMEOUT", None, None),
+             "5": ("OUT_OF_MEMORY", 0, 125)},
+            SlurmMonitor.parse_accounting(
+                "1|COMPLETED|0:0\n2_0|FAILED|1:0\n3|CANCELLED by 1000|0:15\n4|TIMEOUT|\n5|OUT_OF_MEMORY|0:125\n"
+            )
+        )
+
+    def test_job_errors(self):
+        monitor = SlurmMonitor("uid", min_interval=0.01, max_interval=0.05)
+        self.set_accounting("1|COMPLETED|0:0\n2|CANCELLED by 1000|0:15\n3|OUT_OF_MEMORY|0:125\n4|NODE_FAIL|0:0\n"
+                            "5|PREEMPTED|0:0\n6|FAILED|1:0\n7|COMPLETED|0:9\n")
+        self.assertIsNone(monitor.wait("1").error())
+        for job_id in ("2", "3", "4", "5", "6", "7"):
+            job = monitor.wait(job_id)
+            self.assertTrue(job.accounted)
+            self.assertIsNotNone(job.error(), job_id)
+        # Job that is not found in job accounting after it has left the queue
+        self.assertIn("not found in job accounting", monitor.wait("8").error())
+
+    def test_accounting_not_available(self):
+        with open(self.directory.joinpath("sacct"), "w") as file_ptr:
+            file_ptr.write("#!/bin/bash\nexit 1\n")
+        monitor = SlurmMonitor("uid", min_interval=0.01, max_interval=0.05)
+        job = monitor.wait("1")
+        # Job cannot be checked
+        self.assertFalse(job.accounted)
+        self.assertIsNone(job.error())
+
+    def test_parse_usage(self):
+        self.assertEqual(
+            {"1": (90.5, 3 * (1 << 20)), "2_0": (3600.0, None), "3": (None, 2048 * 1024)},
+            SlurmMonitor.parse_usage(
+                "1|COMPLETED|0:0|01:30.500|\n1.batch|COMPLETED|0:0|01:00|3M\n1.0|COMPLETED|0:0|00:30.500|1024K\n"
+                "2_0|FAILED|1:0|01:00:00|\n3|COMPLETED|0:0||\n3.batch|COMPLETED|0:0||2048\n"
+            )
+        )
+
+    def test_slurm_time(self):
+        self.assertEqual(90.0, parse_slurm_time("1:30"))
+        self.assertEqual(5400.0, parse_slurm_time("90"))
+        self.assertEqual(3723.0, parse_slurm_time("01:02:03"))
+        self.assertEqual(93600.0, parse_slurm_time("1-2"))
+        self.assertEqual(93660.0, parse_slurm_time("1-02:01"))
+        self.assertIsNone(parse_slurm_time("UNLIMITED"))
+        self.assertEqual("00:01:00", format_slurm_time(1))
+        self.assertEqual("02:01:00", format_slurm_time(7201))
+        self.assertEqual("1-00:00:00", format_slurm_time(86400))
+
+    def test_wait(self):
+        monitor = SlurmMonitor("uid", min_interval=0.01, max_interval=0.05)
+        self.set_queue("123 RUNNING\n1234 RUNNING\n")
+        job = monitor.watch("123")
+        other = monitor.watch("1234")
+        self.assertFalse(job.complete.wait(0.2))
+        # Job id that prefixes another job's id has left the queue
+        self.set_accounting("123|FAILED|2:0\n")
+        self.set_queue("1234 RUNNING\n")
+        self.assertTrue(job.complete.wait(10))
+        self.assertEqual(("FAILED", 2), (job.state, job.exit_code))
+        self.assertFalse(other.complete.is_set())
+        self.set_accounting("1234|TIMEOUT|0:0\n")
+        self.set_queue("")
+        self.assertIs(other, monitor.wait("1234"))
+        self.assertEqual(SlurmJob.TIMEOUT, other.state)
+
+    def test_wait_for_accounting(self):
+        monitor = SlurmMonitor("uid", min_interval=0.01, max_interval=0.05)
+        self.set_accounting("7|RUNNING|0:0\n")
+        job = monitor.watch("7")
+        # Job has left the queue but has not reached its final state
+        self.assertFalse(job.complete.wait(0.2))
+        self.set_accounting("7|COMPLETED|0:0|00:10|\n7.batch|COMPLETED|0:0|00:10|2M\n")
+        self.assertTrue(job.complete.wait(10))
+        self.assertEqual(("COMPLETED", 0), (job.state, job.exit_code))
+        self.assertEqual((10.0, 2 * (1 << 20)), (job.cpu_seconds, job.peak_memory))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from yapim.tasks.utils.task_log import TaskLog
+
+
+class TestTaskLog(unittest.TestCase):
+    def setUp(self):
+        self.wdir = Path(tempfile.mkdtemp())
+        self.task_log = TaskLog(self.wdir, "record", "Task")
+
+    def tearDown(self):
+        shutil.rmtree(self.wdir)
+
+    def read(self, name: str) -> str:
+        with open(self.wdir.joinpath(name)) as file_ptr:
+            return file_ptr.read()
+
+    def records(self):
+        return [json.loads(line) for line in self.read(TaskLog.RECORDS).splitlines()]
+
+    def test_command_output(self):
+        self.task_log.command("echo a")
+        self.task_log.output("echo a", "a")
+        self.task_log.command("true")
+        self.task_log.output("true", None)
+        self.task_log.close()
+        self.assertEqual("echo a\na\n\ntrue\n\n", self.read(TaskLog.LOG))
+        self.assertEqual([(TaskLog.COMMAND, "echo a"), (TaskLog.OUTPUT, "echo a"), (TaskLog.COMMAND, "true"),
+                          (TaskLog.OUTPUT, "true")],
+                         [(record["event"], record["command"]) for record in self.records()])
+        self.assertEqual({"record", }, {record["record_id"] for record in self.records()})
+        self.assertEqual("a", self.records()[1]["output"])
+
+    def test_output_flushed(self):
+        # Output is readable before the log is closed
+        self.task_log.command("echo a")
+        self.task_log.output("echo a", "a")
+        self.assertEqual("echo a\na\n\n", self.read(TaskLog.LOG))
+        self.task_log.close()
+
+    def test_slurm_log(self):
+        slurm_log_file = str(self.wdir.joinpath("slurm-1.out"))
+        with open(slurm_log_file, "w") as file_ptr:
+            file_ptr.write("job output\n")
+        self.task_log.output("sbatch", None, slurm_log_file)
+        self.task_log.close()
+        self.assertEqual("------BEGIN SLURM LOG OUTPUT SECTION------\njob output\n"
+                         "------END SLURM LOG OUTPUT SECTION------\n\n", self.read(TaskLog.LOG))
+
+    def test_events_only(self):
+        # Human-readable log is only written for Tasks that run commands
+        self.task_log.event(TaskLog.START)
+        self.task_log.event(TaskLog.COMPLETE, seconds=1.0)
+        self.task_log.close()
+        self.assertFalse(self.wdir.joinpath(TaskLog.LOG).exists())
+        self.assertEqual([TaskLog.START, TaskLog.COMPLETE], [record["event"] for record in self.records()])
+        self.assertEqual(1.0, self.records()[1]["seconds"])
+
+    def test_reopened(self):
+        self.task_log.command("first")
+        self.task_log.close()
+        self.task_log.command("second")
+        self.task_log.close()
+        self.assertEqual("first\nsecond\n", self.read(TaskLog.LOG))
+
+
+if __name__ == '__main__':
+    unittest.main()
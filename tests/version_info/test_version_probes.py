@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from plumbum import local
+
+from yapim.tasks.utils.version_info import VersionProbes
+
+
+class TestVersionProbes(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.calls = self.directory.joinpath("calls.txt")
+        self.program = self.directory.joinpath("program")
+        self.write_program("1.0")
+        VersionProbes._responses = {}
+        VersionProbes._path = None
+
+    def tearDown(self):
+        VersionProbes._responses = {}
+        VersionProbes._path = None
+        shutil.rmtree(self.directory)
+
+    def write_program(self, version: str):
+        with open(self.program, "w") as file_ptr:
+            file_ptr.write(f"#!/bin/bash\necho call >> {self.calls}\necho \"program v{version}\"\n")
+        os.chmod(self.program, 0o755)
+
+    def call_count(self) -> int:
+        if not self.calls.exists():
+            return 0
+        with open(self.calls) as file_ptr:
+            return len(file_ptr.readlines())
+
+    def test_probe_once(self):
+        for _ in range(3):
+            self.assertIn("v1.0", VersionProbes.probe(local[str(self.program)], "--version"))
+        self.assertEqual(1, self.call_count())
+
+    def test_upgraded_program(self):
+        VersionProbes.probe(local[str(self.program)], "--version")
+        self.write_program("2.00")
+        self.assertIn("v2.00", VersionProbes.probe(local[str(self.program)], "--version"))
+        self.assertEqual(2, self.call_count())
+
+    def test_failed_probe(self):
+        with open(self.program, "w") as file_ptr:
+            file_ptr.write("#!/bin/bash\nexit 1\n")
+        self.assertIsNone(VersionProbes.probe(local[str(self.program)], "--version"))
+
+    def test_persisted(self):
+        probes_file = self.directory.joinpath("probes.json")
+        VersionProbes.load(probes_file)
+        VersionProbes.probe(local[str(self.program)], "--version")
+        # Next run of pipeline reads output from file
+        VersionProbes._responses = {}
+        VersionProbes.load(probes_file)
+        self.assertIn("v1.0", VersionProbes.probe(local[str(self.program)], "--version"))
+        self.assertEqual(1, self.call_count())
+
+
+if __name__ == '__main__':
+    unittest.main()
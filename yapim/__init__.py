@@ -1,13 +1,51 @@
 """Yet Another PIpeline Manager"""
-from yapim.tasks.aggregate_task import AggregateTask
-from yapim.tasks.task import Task
-from yapim.tasks.task import TaskExecutionError
-from yapim.tasks.task import TaskSetupError
-from yapim.tasks.utils.clean import clean
-from yapim.tasks.utils.dependency_input import DependencyInput
-from yapim.tasks.utils.result import Result
-from yapim.tasks.utils.version_info import VersionInfo
-from yapim.utils.executor import Executor
-from yapim.utils.extension_loader import ExtensionLoader
-from yapim.utils.helpers import touch, prefix
-from yapim.utils.input_loader import InputLoader
+import importlib
+from typing import TYPE_CHECKING
+
+# Public names, by the module that defines them. Modules are imported when a name is first used, so that importing a
+# Task (e.g. in a process backend worker) does not import the pipeline runner and its dependencies
+_EXPORTS = {
+    "AggregateTask": "yapim.tasks.aggregate_task",
+    "Task": "yapim.tasks.task",
+    "TaskExecutionError": "yapim.tasks.task",
+    "TaskSetupError": "yapim.tasks.task",
+    "clean": "yapim.tasks.utils.clean",
+    "DependencyInput": "yapim.tasks.utils.dependency_input",
+    "Result": "yapim.tasks.utils.result",
+    "VersionInfo": "yapim.tasks.utils.version_info",
+    "Executor": "yapim.utils.executor",
+    "ExtensionLoader": "yapim.utils.extension_loader",
+    "touch": "yapim.utils.helpers",
+    "prefix": "yapim.utils.helpers",
+    "InputLoader": "yapim.utils.input_loader",
+}
+
+__all__ = list(_EXPORTS.keys())
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS.keys():
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    # Later lookups do not call __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals().keys()) | set(__all__))
+
+
+if TYPE_CHECKING:  # pragma: no cover
+    from yapim.tasks.aggregate_task import AggregateTask
+    from yapim.tasks.task import Task
+    from yapim.tasks.task import TaskExecutionError
+    from yapim.tasks.task import TaskSetupError
+    from yapim.tasks.utils.clean import clean
+    from yapim.tasks.utils.dependency_input import DependencyInput
+    from yapim.tasks.utils.result import Result
+    from yapim.tasks.utils.version_info import VersionInfo
+    from yapim.utils.executor import Executor
+    from yapim.utils.extension_loader import ExtensionLoader
+    from yapim.utils.helpers import touch, prefix
+    from yapim.utils.input_loader import InputLoader
@@ -1,7 +1,9 @@
 """Task provides the primary API methods with which users will interact."""
+import asyncio
+import inspect
 import logging
 import os
-import threading
+import sys
 import time
 import traceback
 from abc import ABC
@@ -9,15 +11,19 @@ from pathlib import Path
 from typing import Tuple, List, Union, Optional
 
 # pylint: disable=no-member
-from plumbum import local, colors, ProcessExecutionError
+from plumbum import local, colors
 from plumbum.machines import LocalMachine, LocalCommand
 
 from yapim.tasks.utils.base_task import BaseTask
+from yapim.tasks.utils.command_loop import CommandLoop
 from yapim.tasks.utils.input_dict import InputDict
+from yapim.tasks.utils.resource_sizer import SizedResources
+from yapim.tasks.utils.resource_usage import ResourceUsage, run_command
 from yapim.tasks.utils.slurm_caller import SLURMCaller
+from yapim.tasks.utils.task_log import TaskLog
 from yapim.tasks.utils.task_result import TaskResult
-from yapim.tasks.utils.version_info import VersionInfo
-from yapim.utils.config_manager import ConfigManager, MissingDataError, MissingProgramSection
+from yapim.tasks.utils.version_info import VersionInfo, VersionProbes
+from yapim.utils.config_manager import ConfigManager, MissingDataError, MissingProgramSection, TaskSettings
 
 
 class TaskSetupError(AttributeError):
@@ -56,8 +62,6 @@ class Task(BaseTask, ABC):
     run()
 
     """
-    print_lock = threading.Lock()
-
     def __init__(self,
                  record_id: str,
                  task_scope: str,
@@ -77,14 +81,18 @@ class Task(BaseTask, ABC):
         self.output = {}
         self.wdir: Path = Path(wdir).resolve()
         self.config_manager = config_manager
-        is_skip = self.config_manager.find(self.full_name, ConfigManager.SKIP)
-        if is_skip is not None and str(is_skip).lower() == "true":
-            self.is_skip = True
-        else:
-            self.is_skip = False
+        self.is_skip = self.settings.skip
         self.is_complete = False
         self.display_messages = display_messages
         self._versions = self.get_versions()
+        # Limits commands launched by async Tasks to the Task's thread count. Created on the command loop
+        self._command_slots: Optional[asyncio.Semaphore] = None
+        # Created when the Task first writes to its log
+        self._task_log: Optional[TaskLog] = None
+        # CPU time and peak memory of the commands that this Task runs
+        self.resource_usage = ResourceUsage()
+        # Resources requested for this Task by the pipeline's ResourceSizing, if not the values in the config file
+        self.sized_resources: Optional[SizedResources] = None
 
     @property
     def record_id(self) -> str:
@@ -114,18 +122,15 @@ class Task(BaseTask, ABC):
             return None
         out_versions = []
         for version in versions:
-            try:
-                if isinstance(version, VersionInfo):
-                    if version.config_param is None:
-                        response = self.program[version.calling_parameter]()
-                    else:
-                        response = self.local[self.config[version.config_param]][version.calling_parameter]()
-                    if version.version in response:
-                        out_versions.append(version.version)
-                else:
-                    raise AttributeError("Versions must be of type VersionInfo")
-            except ProcessExecutionError:
-                continue
+            if not isinstance(version, VersionInfo):
+                raise AttributeError("Versions must be of type VersionInfo")
+            if version.config_param is None:
+                program = self.program
+            else:
+                program = self.local[self.config[version.config_param]]
+            response = VersionProbes.probe(program, version.calling_parameter)
+            if response is not None and version.version in response:
+                out_versions.append(version.version)
         if len(out_versions) != 0:
             return out_versions
         raise TaskExecutionError(
@@ -142,26 +147,55 @@ class Task(BaseTask, ABC):
         """Get location in which this Task's input is stored"""
         return self.config_manager.storage_directory
 
+    @property
+    def settings(self) -> TaskSettings:
+        """Settings of this Task or dependency, with settings inherited from its parent section applied"""
+        return self.config_manager.settings(self.full_name)
+
     @property
     def threads(self) -> str:
-        """ Number of threads when running task (as set in config file)
+        """ Number of threads when running task (as set in config file, or as sized from earlier runs)
 
         :return: Str of number of threads
         """
-        return self.config_manager.find(self.full_name, ConfigManager.THREADS)
+        if self.sized_resources is not None:
+            return str(self.sized_resources.threads)
+        return self.settings.threads
 
     @property
     def memory(self) -> str:
-        """ Amount of memory to use when running task (as set in config file)
+        """ Amount of memory to use when running task (as set in config file, or as sized from earlier runs)
 
         :return: Str amount of memory
         """
-        return self.config_manager.find(self.full_name, ConfigManager.MEMORY)
+        if self.sized_resources is not None:
+            return str(self.sized_resources.memory)
+        return self.settings.memory
+
+    @property
+    def time_limit(self) -> Optional[str]:
+        """ Time limit of SLURM jobs launched by task (as set in config file, or as sized from earlier runs)
+
+        :return: Str SLURM time limit
+        """
+        if self.sized_resources is not None:
+            return self.sized_resources.time
+        return self.settings.time
+
+    @property
+    def backend(self) -> str:
+        """ Backend used to run this Task (as set in config file). Tasks run in a thread of the pipeline process unless
+        the backend is set to `process`, in which case Tasks run in a separate Python process so that Python code in
+        run() is not limited by the GIL
+
+        :return: Str name of backend
+        """
+        return self.settings.backend
 
     @property
     def config(self) -> dict:
         """Get section of configuration file corresponding to this Task or dependency"""
-        return self.config_manager.get(self.full_name)
+        return self.settings.section
 
     @property
     def added_flags(self) -> List[str]:
@@ -187,7 +221,7 @@ class Task(BaseTask, ABC):
         """
         Run was launched on SLURM
         """
-        return bool(self.config_manager.config[ConfigManager.SLURM][ConfigManager.USE_CLUSTER])
+        return self.config_manager.use_cluster
 
     def _create_slurm_command(self,
                               cmds: Union[LocalCommand, List[LocalCommand]],
@@ -199,10 +233,10 @@ class Task(BaseTask, ABC):
         :return: SLURM-wrapped command to run script via plumbum interface
         """
         # Confirm valid SLURM section
-        parent_info: dict = self.config_manager.parent_info(self.full_name)
-        if ConfigManager.MEMORY not in self.config.keys() and ConfigManager.MEMORY not in parent_info.keys():
+        settings = self.settings
+        if ConfigManager.MEMORY not in settings.resolved.keys():
             raise MissingDataError("SLURM section not properly formatted within %s" % str(self.full_name))
-        if ConfigManager.TIME not in self.config.keys() and ConfigManager.TIME not in parent_info.keys():
+        if ConfigManager.TIME not in settings.resolved.keys():
             raise MissingDataError("SLURM section not properly formatted within %s" % str(self.full_name))
         # Generate command to launch SLURM job
         return SLURMCaller(cmds, self, time_override, threads_override)
@@ -231,32 +265,35 @@ class Task(BaseTask, ABC):
         if not self.is_complete:
             task_name = (self.task_scope() + " " if self.task_scope() != ConfigManager.ROOT else "") + \
                         (self.name if self.task_scope() == ConfigManager.ROOT else f"(using {self.name})")
-            with Task.print_lock:
-                if self.display_messages:
-                    print(colors.green & colors.bold | "\nRunning:\n  %s" % task_name)
-                _str = "In progress:  {}".format(str(self.record_id))
-                logging.info(_str)
-                if self.display_messages:
-                    print(colors.blue & colors.bold | _str)
+            _str = "In progress:  {}".format(str(self.record_id))
+            logging.info(_str)
+            if self.display_messages:
+                Task._display(colors.green & colors.bold | "\nRunning:\n  %s" % task_name,
+                              colors.blue & colors.bold | _str)
             # pylint: disable=fixme
             # TODO: Add internal metadata manager to allow designation of callbacks that store given data
             #  Using this class, track completion times.
+            self.task_log.event(TaskLog.START)
             start_time = time.time()
-            self.try_run()
-            end_time = time.time()
-            with Task.print_lock:
-                _str = "Is complete:  record_id:{}  task:{}  ({:.3f}{})".format(str(self.record_id), task_name,
-                                                                                *Task._parse_time(
-                                                                                    end_time - start_time))
-                logging.info(_str)
-                if self.display_messages:
-                    print(colors.blue & colors.bold | _str)
-
-        for key, output in self.output.items():
-            if key != "final":
-                if (isinstance(output, Path) and not output.exists()) or \
-                        (isinstance(output, str) and not os.path.exists(output)):
-                    raise super().TaskCompletionError(self.name, key, Path(output))
+            try:
+                self.try_run()
+                end_time = time.time()
+                self.task_log.event(TaskLog.COMPLETE, seconds=round(end_time - start_time, 3))
+            finally:
+                # Task's output may include its log
+                self.task_log.close()
+            _str = "Is complete:  record_id:{}  task:{}  ({:.3f}{})".format(str(self.record_id), task_name,
+                                                                            *Task._parse_time(end_time - start_time))
+            logging.info(_str)
+            if self.display_messages:
+                Task._display(colors.blue & colors.bold | _str)
+
+            # Output of a Task that was complete before it was run has already been checked
+            for key, output in self.output.items():
+                if key != "final":
+                    if (isinstance(output, Path) and not output.exists()) or \
+                            (isinstance(output, str) and not os.path.exists(output)):
+                        raise super().TaskCompletionError(self.name, key, Path(output))
         return TaskResult(self.record_id, self.name, self.output)
 
     @property
@@ -271,10 +308,32 @@ class Task(BaseTask, ABC):
 
         Alias for self.local[self.config_manager.find(self.full_name, ConfigManager.PROGRAM)]
         """
-        program = self.config_manager.find(self.full_name, ConfigManager.PROGRAM)
-        if program is None:
+        settings = self.settings
+        if settings.program is None:
             raise MissingProgramSection(f"Program key not set in config section for {self.full_name}")
-        return self.local[program]
+        # Path is resolved once per config section, rather than searched for on each use
+        return self.local[settings.program if settings.program_path is None else settings.program_path]
+
+    @property
+    def task_log(self) -> TaskLog:
+        """Log of the commands that this Task runs, and their output, in its working directory"""
+        if self._task_log is None:
+            self._task_log = TaskLog(self.wdir, self.record_id, self.name)
+        return self._task_log
+
+    @staticmethod
+    def _display(*lines: str):
+        """Print lines with a single write, so that messages of Tasks running on other threads are not interleaved"""
+        sys.stdout.write("".join(f"{line}\n" for line in lines))
+        sys.stdout.flush()
+
+    def __getstate__(self):
+        # Semaphore is bound to the command loop of the process that created it, and log files are not shared between
+        # processes
+        state = self.__dict__.copy()
+        state["_command_slots"] = None
+        state["_task_log"] = None
+        return state
 
     def __str__(self):  # pragma: no cover
         return f"<Task name: {self.name}, scope: {self.task_scope()}, input_id: {str(self.record_id)}, " \
@@ -284,13 +343,17 @@ class Task(BaseTask, ABC):
         return self.__str__()
 
     def try_run(self):
-        """Run the task!"""
+        """Run the task! Tasks that define `async def run(self)` are run on the shared command loop"""
         try:
-            self.run()
+            # pylint: disable=assignment-from-no-return
+            awaitable = self.run()
+            if inspect.isawaitable(awaitable):
+                CommandLoop.run(awaitable)
         # pylint: disable=broad-except
         except BaseException as err:
             logging.info(err)
             logging.info(traceback.print_exc())
+            self.task_log.event(TaskLog.ERROR, error=str(err))
             with open(os.path.join(self.wdir, "task.err"), "a") as w_out:
                 w_out.write(str(err) + "\n")
                 w_out.write(traceback.format_exc() + "\n")
@@ -354,25 +417,53 @@ class Task(BaseTask, ABC):
         if self.is_slurm:
             cmd = self._create_slurm_command(cmd, time_override=time_override, threads_override=threads_override)
         # Run command directly
-        logging.info(str(cmd))
-        if self.display_messages:
-            print("  " + str(cmd))
-        with open(os.path.join(self.wdir, "task.log"), "a") as task_log:
-            task_log.write(str(cmd) + "\n")
-        out = cmd()
-        # Store log info in any was generated
-        if out is not None:
-            with open(os.path.join(self.wdir, "task.log"), "a") as task_log:
-                task_log.write(str(out) + "\n")
-        if isinstance(cmd, SLURMCaller) and os.path.exists(cmd.slurm_log_file):
-            with open(os.path.join(self.wdir, "task.log"), "a") as task_log:
-                task_log.write("------BEGIN SLURM LOG OUTPUT SECTION------\n")
-                task_log.write("".join(open(cmd.slurm_log_file, "r").readlines()))
-                task_log.write("------END SLURM LOG OUTPUT SECTION------\n")
-        with open(os.path.join(self.wdir, "task.log"), "a") as task_log:
-            task_log.write("\n")
+        self._log_command(cmd)
+        out = cmd() if self.is_slurm else run_command(cmd, self.resource_usage)
+        self._log_output(cmd, out)
+        return out
+
+    async def parallel_async(self, cmd: LocalCommand, time_override: Optional[str] = None,
+                             threads_override: Optional[str] = None):
+        """ Launch a command that uses multiple threads from within `async def run(self)`, without blocking a thread
+        while it runs. Commands may be awaited concurrently, such as with asyncio.gather(), and at most `threads` of
+        this Task's commands run at once. SLURM jobs are submitted as with parallel()
+
+        Example:
+        await asyncio.gather(*(self.single_async(self.local["prodigal"]["-i", contig]) for contig in contigs))
+        """
+        if self._command_slots is None:
+            self._command_slots = asyncio.Semaphore(int(self.threads))
+        async with self._command_slots:
+            if self.is_slurm:
+                cmd = self._create_slurm_command(cmd, time_override=time_override, threads_override=threads_override)
+                self._log_command(cmd)
+                out = await asyncio.get_running_loop().run_in_executor(None, cmd)
+            else:
+                self._log_command(cmd)
+                out = await CommandLoop.run_command(str(cmd))
+            self._log_output(cmd, out)
         return out
 
+    async def single_async(self, cmd: LocalCommand, time_override: Optional[str] = None):
+        """ Launch a command that uses a single thread from within `async def run(self)`
+
+        Example:
+        await self.single_async(self.local["pwd"])
+        """
+        return await self.parallel_async(cmd, time_override=time_override, threads_override="1")
+
+    def _log_command(self, cmd: Union[LocalCommand, SLURMCaller]):
+        """Write command to pipeline log and task log, and display if requested"""
+        cmd_str = str(cmd)
+        logging.info(cmd_str)
+        if self.display_messages:
+            Task._display("  " + cmd_str)
+        self.task_log.command(cmd_str)
+
+    def _log_output(self, cmd: Union[LocalCommand, SLURMCaller], out):
+        """Write command output and any SLURM log to task log"""
+        self.task_log.output(str(cmd), out, cmd.slurm_log_file if isinstance(cmd, SLURMCaller) else None)
+
     def single(self, cmd: LocalCommand, time_override: Optional[str] = None):
         """ Launch a command that uses a single thread.
 
@@ -1,29 +1,50 @@
 """Group together Tasks to create longer Task chains whose completion is independent of other Task chains"""
 
+import inspect
+import logging
 import os
+import resource
 import threading
+import time
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 from shutil import copy
-from typing import List, Type, Optional, Dict, Union
+from typing import List, Type, Optional, Dict, Union, Set, Tuple
 
 from yapim import Task, AggregateTask
 from yapim.tasks.task import TaskSetupError, TaskExecutionError
+from yapim.tasks.utils.output_finalizer import OutputFinalizer
+from yapim.tasks.utils.resource_broker import ResourceBroker
+from yapim.tasks.utils.resource_sizer import ResourceSizer, SizedResources
+from yapim.tasks.utils.resource_usage import max_rss
+from yapim.tasks.utils.task_cache import TaskCache
 from yapim.tasks.utils.task_result import TaskResult
 from yapim.utils.config_manager import ConfigManager
 from yapim.utils.dependency_graph import Node
 from yapim.utils.path_manager import PathManager
+from yapim.utils.priority_policy import input_size
+from yapim.utils.results_store import ResultsStore
 
 
 class TaskChainDistributor(dict):
     """Run Tasks based on available resources. Populate and track output as completed. Update input to a Task
     prior running."""
-    awaiting_resources: threading.Condition = threading.Condition()
     update_lock: threading.Lock = threading.Lock()
 
     results: dict
-    output_data_to_pickle: dict
-    current_threads_in_use_count: int
-    current_gb_memory_in_use_count: int
+    # Final output of each record, written as Tasks complete
+    results_store: Optional[ResultsStore] = None
+    resource_broker: Optional[ResourceBroker] = None
+    # Output of Tasks that request caching, shared between pipeline runs
+    task_cache: Optional[TaskCache] = None
+    # Runs Tasks whose backend is set to `process`
+    process_pool: Optional[ProcessPoolExecutor] = None
+    # Populates final output to the results directory. Output is copied as the Task completes if not set
+    output_finalizer: Optional[OutputFinalizer] = None
+    # Sizes the resources requested by each Task from earlier runs. Tasks request the values in the config file if not
+    # set
+    resource_sizer: Optional[ResourceSizer] = None
 
     maximum_threads: Optional[int] = None
     maximum_gb_memory: Optional[int] = None
@@ -46,16 +67,20 @@ class TaskChainDistributor(dict):
         self.config_manager = config_manager
         self.path_manager = path_manager
         self.results_dir = results_base_dir
-        self.output_data_to_pickle = {key: {} for key in input_data.keys()}
         self.display_status_messages = display_status_messages
+        # Input provided to this chain's AggregateTask, and the record ids that it kept
+        self.aggregate_input: Optional[dict] = None
+        self.tracked_record_ids: Optional[Set[str]] = None
+        # (threads, memory) granted to this chain before it started running
+        self._held_resources: Optional[Tuple[int, int]] = None
+        self._held_lock = threading.Lock()
+        # Size of this chain's input files, measured when its first Task runs
+        self._input_size: Optional[int] = None
 
     @staticmethod
     def initialize_class():
         """Create empty dictionaries for tracking"""
         TaskChainDistributor.results = {}
-        TaskChainDistributor.output_data_to_pickle = {}
-        TaskChainDistributor.current_threads_in_use_count = 0
-        TaskChainDistributor.current_gb_memory_in_use_count = 0
 
     @staticmethod
     def set_allocations(config_manager: ConfigManager):
@@ -63,22 +88,83 @@ class TaskChainDistributor(dict):
         global_options = config_manager.config[ConfigManager.GLOBAL]
         TaskChainDistributor.maximum_threads = int(global_options[ConfigManager.MAX_THREADS])
         TaskChainDistributor.maximum_gb_memory = int(global_options[ConfigManager.MAX_MEMORY])
+        TaskChainDistributor.resource_broker = ResourceBroker(TaskChainDistributor.maximum_threads,
+                                                              TaskChainDistributor.maximum_gb_memory,
+                                                              config_manager.allocation_policy)
+
+    def acquire_first_resources(self):
+        """Block until the resource broker grants the first Task in this chain its resources. The allocation is held
+        by the chain and used when the Task runs"""
+        if len(self.task_identifiers) == 0:
+            return
+        first_task = self.task_identifiers[0][0].get()
+        threads, memory = self._projected_resources(first_task)
+        TaskChainDistributor.resource_broker.acquire(TaskChainDistributor._broker_name(first_task), threads, memory)
+        self._held_resources = (threads, memory)
+
+    def release_held_resources(self):
+        """Return an allocation that was granted to this chain but not used by any of its Tasks"""
+        with self._held_lock:
+            held_resources, self._held_resources = self._held_resources, None
+        if held_resources is not None:
+            TaskChainDistributor.resource_broker.release(*held_resources)
 
     def run(self):
-        """Run each task in a task chain"""
+        """Run each task list in a task chain. Task lists run as soon as the lists they require have completed, so
+        lists that do not require each other run concurrently, each waiting on the resource broker for its threads and
+        memory. If a list fails, no further lists are started, and the first error is raised once running lists have
+        completed"""
+        if len(self.task_identifiers) == 1:
+            self._run_task_list(self.task_identifiers[0])
+            return
+        requirements = self._list_requirements()
+        unmet = [len(list_requirements) for list_requirements in requirements]
+        dependents: List[List[int]] = [[] for _ in self.task_identifiers]
+        for i, list_requirements in enumerate(requirements):
+            for requirement in list_requirements:
+                dependents[requirement].append(i)
+        err: Optional[BaseException] = None
+        with ThreadPoolExecutor(max(len(self.task_identifiers), 1)) as executor:
+            running = {executor.submit(self._run_task_list, self.task_identifiers[i]): i
+                       for i, count in enumerate(unmet) if count == 0}
+            while len(running) > 0:
+                done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = running.pop(future)
+                    if future.exception() is not None:
+                        err = err or future.exception()
+                        continue
+                    for dependent in dependents[i]:
+                        unmet[dependent] -= 1
+                        if unmet[dependent] == 0 and err is None:
+                            running[executor.submit(self._run_task_list, self.task_identifiers[dependent])] = dependent
+        if err is not None:
+            raise err
+
+    def _list_requirements(self) -> List[Set[int]]:
+        """Positions of the task lists in this chain that each task list requires"""
+        positions = {task_ids[-1].name: i for i, task_ids in enumerate(self.task_identifiers)}
+        out = []
         for task_ids in self.task_identifiers:
-            if len(task_ids) == 1:
-                # Single task with no dependencies
-                self._run_task(self._create_task(task_ids[0]))
+            names = {requirement.__name__ if inspect.isclass(requirement) else requirement
+                     for requirement in (self.task_blueprints[task_ids[-1].name].requires() or [])}
+            out.append({positions[name] for name in names if name in positions})
+        return out
+
+    def _run_task_list(self, task_ids: List[Node]):
+        """Run a top-level Task, after the dependencies that it lists"""
+        if len(task_ids) == 1:
+            # Single task with no dependencies
+            self._run_task(self._create_task(task_ids[0]))
+        else:
+            # Task with list of dependencies to complete first
+            tasks = [self._create_task(task_id, task_ids[-1]) for task_id in task_ids[:-1]]
+            tasks.append(self._create_task(task_ids[-1]))
+            if tasks[-1].condition():
+                for task in tasks:
+                    self._run_task(task)
             else:
-                # Task with list of dependencies to complete first
-                tasks = [self._create_task(task_id, task_ids[-1]) for task_id in task_ids[:-1]]
-                tasks.append(self._create_task(task_ids[-1]))
-                if tasks[-1].condition():
-                    for task in tasks:
-                        self._run_task(task)
-                else:
-                    self._run_task(tasks[-1])
+                self._run_task(tasks[-1])
 
     @staticmethod
     def _is_aggregate(task: Type[Task]):
@@ -91,11 +177,12 @@ class TaskChainDistributor(dict):
         task_blueprint = self.task_blueprints[task_identifier.name]
         if TaskChainDistributor._is_aggregate(task_blueprint):
             self.path_manager.add_dirs(wdir)
+            self.aggregate_input = TaskChainDistributor._snapshot_results()
             task = task_blueprint(
                 wdir,
                 task_identifier.scope,
                 self.config_manager,
-                TaskChainDistributor.results,
+                self.aggregate_input,
                 self.path_manager.get_dir(wdir),
                 self.display_status_messages
             )
@@ -103,8 +190,7 @@ class TaskChainDistributor(dict):
             updated_data = {}
             if top_level_node is not None:
                 try:
-                    updated_data = self._update_distributed_input(self.record_id,
-                                                                  self.task_blueprints[top_level_node.name])
+                    updated_data = self._update_distributed_input(self.task_blueprints[top_level_node.name])
                 except KeyError as err:
                     raise TaskExecutionError(f"Unable to load dependency data {err} for {task_identifier.get()} "
                                              f"on record {self.record_id}") from err
@@ -124,60 +210,214 @@ class TaskChainDistributor(dict):
     def _run_task(self, task: Task):
         """Run Task/AggregateTask. Wait for available resources prior to launching. Finalize output to output
         directories and provide updated input values prior to launching a Task"""
-        task.set_is_complete()
+        in_manifest = self._set_is_complete(task)
+        cache_key, store_in_cache = TaskChainDistributor._restore_from_cache(task)
+        # Output in the manifest may have been removed as out of date
+        in_manifest = in_manifest and task.is_complete
 
         # pylint: disable=fixme
         # TODO: Handle SLURM when multiple nodes may have been listed
-        projected_memory = int(self.config_manager.find(task.full_name, ConfigManager.MEMORY))
-        projected_threads = int(self.config_manager.find(task.full_name, ConfigManager.THREADS))
-        with TaskChainDistributor.awaiting_resources:
-            with TaskChainDistributor.update_lock:
-                total_memory = projected_memory + TaskChainDistributor.current_gb_memory_in_use_count
-                total_threads = projected_threads + TaskChainDistributor.current_threads_in_use_count
-            while total_threads > TaskChainDistributor.maximum_threads or \
-                    total_memory > TaskChainDistributor.maximum_gb_memory:
-                TaskChainDistributor.awaiting_resources.wait()
-                with TaskChainDistributor.update_lock:
-                    total_memory = projected_memory + TaskChainDistributor.current_gb_memory_in_use_count
-                    total_threads = projected_threads + TaskChainDistributor.current_threads_in_use_count
-            with TaskChainDistributor.update_lock:
-                TaskChainDistributor.current_threads_in_use_count = total_threads
-                TaskChainDistributor.current_gb_memory_in_use_count = total_memory
+        projected_threads, projected_memory = self._projected_resources(task.full_name)
+        # The first Task of the chain to run uses the chain's allocation if it requested the same resources
+        with self._held_lock:
+            held_resources, self._held_resources = self._held_resources, None
+        if held_resources != (projected_threads, projected_memory):
+            if held_resources is not None:
+                TaskChainDistributor.resource_broker.release(*held_resources)
+            TaskChainDistributor.resource_broker.acquire(TaskChainDistributor._broker_name(task.full_name),
+                                                         projected_threads, projected_memory)
+        if TaskChainDistributor.resource_sizer is not None:
+            task.sized_resources = self._sized_resources(task.full_name)
+        try:
+            runs = not task.is_complete
+            start = time.monotonic()
+            if task.backend == ConfigManager.PROCESS_BACKEND and TaskChainDistributor.process_pool is not None:
+                task, result = TaskChainDistributor._run_in_process_pool(task)
+            else:
+                result = task.run_task()
+            if runs and not task.is_skip:
+                self._record_runtime(task, time.monotonic() - start)
+            self._finalize_output(task, result)
+            if not in_manifest and not task.is_skip:
+                TaskChainDistributor._record_outputs(task)
+            if cache_key is not None and not task.is_skip:
+                if store_in_cache:
+                    TaskChainDistributor.task_cache.store(cache_key, task)
+                TaskChainDistributor.results_store.record_cache_key(task.record_id, os.path.basename(task.wdir),
+                                                                    cache_key)
+        finally:
+            TaskChainDistributor.resource_broker.release(projected_threads, projected_memory)
+
+    @staticmethod
+    def _run_in_process_pool(task: Task) -> Tuple[Task, TaskResult]:
+        """ Run Task in the process pool. Output that the Task sets in its run() method is stored, and is restored to
+        the Task once it is complete, so that resumed pipelines provide it to the Tasks that require it
+
+        :return: Task as returned from the process pool, and its result
+        """
+        work_name = os.path.basename(task.wdir)
+        if task.is_complete:
+            task.output.update(TaskChainDistributor.results_store.task_output(task.record_id, work_name))
+            return task, task.run_task()
+        initial_output = dict(task.output)
+        task, result = TaskChainDistributor.process_pool.submit(_run_task_in_process, task).result()
+        if not task.is_skip:
+            TaskChainDistributor.results_store.record_task_output(
+                task.record_id, work_name, {key: value for key, value in task.output.items()
+                                            if key not in initial_output or initial_output[key] != value})
+        return task, result
+
+    def _set_is_complete(self, task: Task) -> bool:
+        """ Set whether Task completed in an earlier run. Unless CompletionCheck is `stat`, a Task whose output paths
+        are all in the manifest is complete, without checking its files. With `verify`, the size and modification time
+        of each file must also match the manifest. Otherwise, Task checks its own output
+
+        :return: True if Task was found to be complete from the manifest
+        """
+        completion_check = self.config_manager.completion_check
+        if completion_check != ConfigManager.STAT_COMPLETION:
+            paths = TaskChainDistributor._output_paths(task)
+            if len(paths) > 0:
+                recorded = TaskChainDistributor.results_store.recorded_outputs(paths)
+                if len(recorded) == len(paths) and (completion_check == ConfigManager.MANIFEST_COMPLETION or all(
+                        TaskChainDistributor._stat_output(path) == recorded[path] for path in paths)):
+                    task.is_complete = True
+                    return True
+        task.set_is_complete()
+        return False
+
+    @staticmethod
+    def _restore_from_cache(task: Task) -> Tuple[Optional[str], bool]:
+        """ Check the output of a Task that requests caching against the cache key recorded when the Task last ran on
+        its record. Output from a run with a different key, such as with other FLAGS or another program version, is
+        removed. Output of a Task that is not complete is then restored from the shared cache
 
+        :return: Task's cache key, or None if Task is not cached, and whether to store Task's output once it runs
+        """
+        if TaskChainDistributor.task_cache is None or task.is_skip or isinstance(task, AggregateTask) or \
+                not TaskCache.is_cached(task):
+            return None, False
+        cache_key = TaskChainDistributor.task_cache.key(task)
+        if task.is_complete:
+            if TaskChainDistributor.results_store.cache_key(task.record_id, os.path.basename(task.wdir)) == cache_key:
+                return cache_key, False
+            logging.info("Output is out of date:  record_id:%s  task:%s", task.record_id, task.name)
+            TaskCache.invalidate(task)
+            task.is_complete = False
+        if TaskChainDistributor.task_cache.restore(cache_key, task):
+            logging.info("Restored from cache:  record_id:%s  task:%s", task.record_id, task.name)
+            task.is_complete = True
+            return cache_key, False
+        return cache_key, True
+
+    def _record_runtime(self, task: Task, seconds: float):
+        """Store the runtime and resource usage of a Task that ran, from which later runs estimate the work remaining on
+        each record and size each Task's resources"""
+        usage = task.resource_usage
+        TaskChainDistributor.results_store.record_runtime(
+            task.record_id, os.path.basename(task.wdir), seconds, self._record_input_size(),
+            (usage.cpu_seconds, usage.peak_memory) if usage.measured else None, int(task.threads))
+
+    def _record_input_size(self) -> int:
+        """Size of this chain's input files, measured when first needed"""
+        if self._input_size is None:
+            self._input_size = input_size(self)
+        return self._input_size
+
+    @staticmethod
+    def _record_outputs(task: Task):
+        """Add output paths of a completed Task to manifest"""
+        outputs = {}
+        for path in TaskChainDistributor._output_paths(task):
+            stat = TaskChainDistributor._stat_output(path)
+            if stat is not None:
+                outputs[path] = stat
+        if len(outputs) > 0:
+            TaskChainDistributor.results_store.record_outputs(task.record_id, os.path.basename(task.wdir), outputs)
+
+    @staticmethod
+    def _output_paths(task: Task) -> Set[str]:
+        """Absolute paths of Task's output, which are Path or string values as in Task.set_is_complete()"""
+        return {os.path.abspath(output) for output in task.output.values() if isinstance(output, (Path, str))}
+
+    @staticmethod
+    def _stat_output(path: str) -> Optional[Tuple[int, float]]:
+        """Size and modification time of path, or None if it does not exist"""
         try:
-            self._finalize_output(task, task.run_task())
-            TaskChainDistributor._release_resources(projected_threads, projected_memory)
-        except BaseException as err:
-            TaskChainDistributor._release_resources(projected_threads, projected_memory)
-            raise err
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime
+
+    def _projected_resources(self, task_name: Tuple[str, str]) -> Tuple[int, int]:
+        """Threads and memory requested by a Task"""
+        if TaskChainDistributor.resource_sizer is not None:
+            sized_resources = self._sized_resources(task_name)
+            return sized_resources.threads, sized_resources.memory
+        settings = self.config_manager.settings(task_name)
+        return int(settings.threads), int(settings.memory)
+
+    def _sized_resources(self, task_name: Tuple[str, str]) -> SizedResources:
+        """Resources requested by a Task on this chain's input, as sized from earlier runs"""
+        return TaskChainDistributor.resource_sizer.size(TaskChainDistributor._broker_name(task_name),
+                                                        self.config_manager.settings(task_name),
+                                                        self._record_input_size())
+
+    @staticmethod
+    def _broker_name(task_name: Tuple[str, str]) -> str:
+        """Name under which a Task's time spent waiting for resources is tracked"""
+        return ".".join(task_name).replace(f"{ConfigManager.ROOT}.", "")
 
     @staticmethod
-    def _release_resources(projected_threads: int, projected_memory: int):
-        """Free resources used in running Task"""
+    def _snapshot_results() -> dict:
+        """Copy of currently tracked results to provide to an AggregateTask. Record-level dictionaries are copied so
+        that Task chains that are still running do not modify the AggregateTask's input"""
         with TaskChainDistributor.update_lock:
-            TaskChainDistributor.current_threads_in_use_count -= projected_threads
-            TaskChainDistributor.current_gb_memory_in_use_count -= projected_memory
-        with TaskChainDistributor.awaiting_resources:
-            TaskChainDistributor.awaiting_resources.notifyAll()
+            return {
+                key: (value.copy() if isinstance(value, dict) and not isinstance(value, TaskResult) else value)
+                for key, value in TaskChainDistributor.results.items()
+            }
 
     def _finalize_results(self, task: Task, result: TaskResult):
         """Call task finalization method"""
-        if not isinstance(task, AggregateTask):
-            with TaskChainDistributor.update_lock:
+        with TaskChainDistributor.update_lock:
+            if not isinstance(task, AggregateTask):
+                if result.record_id not in TaskChainDistributor.results.keys():
+                    # Record was removed by an AggregateTask while this chain was running
+                    self[result.task_name] = result
+                    return
                 TaskChainDistributor.results = type(task).finalize(self, TaskChainDistributor.results, task, result)
-        else:
+                return
+            late_results = self._late_results()
             TaskChainDistributor.results = type(task).finalize(self, TaskChainDistributor.results, task, result)
+            # pylint: disable=protected-access
+            if task._remap_results:
+                for record_id, record_results in late_results.items():
+                    if isinstance(TaskChainDistributor.results.get(record_id), dict):
+                        TaskChainDistributor.results[record_id].update(record_results)
+            self.tracked_record_ids = {key for key in TaskChainDistributor.results.keys()
+                                       if key not in self.task_blueprints.keys()}
+
+    def _late_results(self) -> Dict[str, Dict]:
+        """Task results that other chains finalized after this chain's AggregateTask received its input. A remapping
+        AggregateTask replaces tracked results with its output, so these are reapplied to the records that it keeps"""
+        late_results = {}
+        for record_id, record_data in TaskChainDistributor.results.items():
+            if record_id in self.task_blueprints.keys() or not isinstance(record_data, dict):
+                continue
+            prior_data = self.aggregate_input.get(record_id, {})
+            updated = {key: value for key, value in record_data.items()
+                       if isinstance(value, TaskResult) and prior_data.get(key) is not value}
+            if len(updated) > 0:
+                late_results[record_id] = updated
+        return late_results
 
     def _finalize_output(self, task: Task, result: TaskResult):
-        """Populate Task output to final output directory and output .pkl file. Do not finalize Tasks that were skipped
+        """Populate Task output to final output directory and results store. Do not finalize Tasks that were skipped
         """
         with TaskChainDistributor.update_lock:
-            if result.record_id not in TaskChainDistributor.results.keys():
+            if isinstance(task, AggregateTask) and result.record_id not in TaskChainDistributor.results.keys():
                 TaskChainDistributor.results[result.record_id] = {}
-                # pylint: disable=fixme
-                # TODO: Manage memory better (write tasks as they complete, reload for AggregateTasks)
-                #  https://docs.h5py.org/en/stable/index.html
-                TaskChainDistributor.output_data_to_pickle[result.record_id] = {}
         self._finalize_results(task, result)
         if task.is_skip:
             return
@@ -189,6 +429,7 @@ class TaskChainDistributor(dict):
             _sub_out = os.path.join(self.results_dir, str(result.record_id))
             if not os.path.exists(_sub_out):
                 os.makedirs(_sub_out)
+            final_output = {}
             for file_str in result_data:
                 obj = result.get(file_str)
                 if obj is None:
@@ -196,33 +437,53 @@ class TaskChainDistributor(dict):
                 if isinstance(obj, Path) or (isinstance(obj, str) and os.path.exists(obj)):
                     _path = os.path.splitext(os.path.basename(obj))
                     _out = os.path.join(_sub_out, _path[0] + "." + result.task_name + _path[1])
+                    if TaskChainDistributor.output_finalizer is not None:
+                        # Output is stored once its file is in place, so that stored paths always exist
+                        TaskChainDistributor.output_finalizer.finalize(
+                            str(obj), _out, partial(TaskChainDistributor.results_store.put, result.record_id,
+                                                    {file_str: _out}))
+                        continue
                     copy(obj, _out)
                     obj = _out
-                with TaskChainDistributor.update_lock:
-                    if result.record_id not in TaskChainDistributor.output_data_to_pickle.keys():
-                        TaskChainDistributor.output_data_to_pickle[result.record_id] = {}
-                    TaskChainDistributor.output_data_to_pickle[result.record_id][file_str] = obj
+                final_output[file_str] = obj
+            TaskChainDistributor.results_store.put(result.record_id, final_output)
 
-    @staticmethod
-    def _update_distributed_input(record_id: str, requirement_node: Type[Task]) -> Dict:
-        """Populate input to a Task with the requested from:to mapping defined in DependencyInput class"""
+    def _update_distributed_input(self, requirement_node: Type[Task]) -> Dict:
+        """Populate input to a Task with the requested from:to mapping defined in DependencyInput class. Data is
+        collected from tracked results, or from this chain's record data if an AggregateTask removed the record while
+        this chain was running"""
+        with TaskChainDistributor.update_lock:
+            record_data = TaskChainDistributor.results.get(self.record_id, self)
         amended_dict = {}
         for dependency in requirement_node.depends():
             if dependency.collect_by is None:
-                amended_dict.update(TaskChainDistributor.results[record_id])
+                amended_dict.update(record_data)
                 continue
             for prior_id, prior_mapping in dependency.collect_by.items():
                 if isinstance(prior_mapping, dict):
                     if prior_id.lower() != ConfigManager.ROOT.lower():
                         for _from, _to in prior_mapping.items():
-                            amended_dict[_to] = TaskChainDistributor.results[record_id][prior_id][_from]
+                            amended_dict[_to] = record_data[prior_id][_from]
                     else:
                         for _from, _to in prior_mapping.items():
-                            amended_dict[_to] = TaskChainDistributor.results[record_id][_from]
+                            amended_dict[_to] = record_data[_from]
                 else:
                     for attr in prior_mapping:
                         if attr.lower() != ConfigManager.ROOT.lower():
-                            amended_dict[attr] = TaskChainDistributor.results[record_id][prior_id][attr]
+                            amended_dict[attr] = record_data[prior_id][attr]
                         else:
-                            amended_dict[attr] = TaskChainDistributor.results[record_id][attr]
+                            amended_dict[attr] = record_data[attr]
         return amended_dict
+
+
+def _run_task_in_process(task: Task) -> Tuple[Task, TaskResult]:
+    """Run Task within a process of the process pool. The Task is returned along with its result so that any state set
+    in its run() method is available when it is finalized. The CPU time that the process used while running the Task is
+    added to the Task's usage. Processes are reused, and only report the largest peak memory of any Task they have run,
+    so the peak memory of the process is only added if it rose while running the Task"""
+    start = resource.getrusage(resource.RUSAGE_SELF)
+    result = task.run_task()
+    end = resource.getrusage(resource.RUSAGE_SELF)
+    task.resource_usage.add(end.ru_utime + end.ru_stime - start.ru_utime - start.ru_stime,
+                            max_rss(end) if end.ru_maxrss > start.ru_maxrss else None)
+    return task, result
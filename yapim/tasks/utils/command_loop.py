@@ -0,0 +1,54 @@
+"""Supervise external commands for async Tasks from a single asyncio event loop"""
+
+import asyncio
+import threading
+from typing import Awaitable, Optional
+
+from plumbum import ProcessExecutionError
+
+
+class CommandLoop:
+    """Process-wide asyncio event loop that runs on a background thread.
+
+    Tasks that define `async def run(self)` are run on this loop, and the commands that they launch with
+    `parallel_async()`/`single_async()` are started with non-blocking subprocess calls. Waiting on any number of
+    commands therefore does not require a thread per command.
+    """
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_loop() -> asyncio.AbstractEventLoop:
+        """Get event loop, starting its thread on first use"""
+        with CommandLoop._lock:
+            if CommandLoop._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="yapim-command-loop", daemon=True).start()
+                CommandLoop._loop = loop
+            return CommandLoop._loop
+
+    @staticmethod
+    def run(awaitable: Awaitable):
+        """ Run awaitable on the event loop and block the calling thread until it completes
+
+        :param awaitable: Coroutine to run
+        :return: Result of coroutine
+        """
+        return asyncio.run_coroutine_threadsafe(awaitable, CommandLoop.get_loop()).result()
+
+    @staticmethod
+    async def run_command(cmd: str) -> str:
+        """ Run a shell command string without blocking the event loop
+
+        :param cmd: Command, as formatted by plumbum
+        :raises: ProcessExecutionError if command exits with a non-zero status
+        :return: Command stdout
+        """
+        process = await asyncio.create_subprocess_shell(cmd, stdout=asyncio.subprocess.PIPE,
+                                                        stderr=asyncio.subprocess.PIPE, executable="/bin/bash")
+        stdout, stderr = await process.communicate()
+        stdout = stdout.decode(errors="replace")
+        stderr = stderr.decode(errors="replace")
+        if process.returncode != 0:
+            raise ProcessExecutionError([cmd], process.returncode, stdout, stderr)
+        return stdout
@@ -25,3 +25,7 @@ class InputDict(dict):
 
     def __setitem__(self, key, value):
         raise AttributeError("Input is immutable and unable to be modified")
+
+    def __reduce__(self):
+        # Default dict pickling restores items with __setitem__
+        return InputDict, (dict(self),)
@@ -1,8 +1,12 @@
 """Populate dependencies for easy loading"""
 
+import importlib.util
 import pkgutil
+import sys
 from inspect import isclass, isabstract
 from pathlib import Path
+from types import ModuleType
+from typing import Dict, Optional, Type
 
 from yapim.tasks.task import Task
 
@@ -10,11 +14,35 @@ from yapim.tasks.task import Task
 def get_modules(package_dir: Path) -> dict:
     """Get all modules in package, search nested directories"""
     out = {}
-    for loader, module_name, _ in pkgutil.walk_packages([str(package_dir)]):
-        module = loader.find_module(module_name).load_module(module_name)
-        for attribute_name in dir(module):
-            attribute = getattr(module, attribute_name)
-            if isclass(attribute) and issubclass(attribute, Task) and not isabstract(attribute):
-                # Add the class to this package's variables
-                out[attribute.__name__] = attribute
+    for module_finder, module_name, _ in pkgutil.walk_packages([str(package_dir)]):
+        # Add the classes to this package's variables
+        out.update(get_tasks(load_module(module_name, module_finder.find_spec(module_name).origin)))
     return out
+
+
+def get_tasks(module: ModuleType) -> Dict[str, Type[Task]]:
+    """Get Task classes that are available in a module, by name"""
+    out = {}
+    for attribute_name in dir(module):
+        attribute = getattr(module, attribute_name)
+        if isclass(attribute) and issubclass(attribute, Task) and not isabstract(attribute):
+            out[attribute.__name__] = attribute
+    return out
+
+
+def load_module(module_name: str, path: Optional[str]) -> ModuleType:
+    """ Import module from its file, replacing any module that was imported under the same name
+
+    :param module_name: Name of module, which may be nested in packages (e.g. tasks.align)
+    :param path: Path to module file, or to __init__.py of a package
+    :return: Imported module
+    """
+    submodule_search_locations = None
+    if path is not None and Path(path).name == "__init__.py":
+        submodule_search_locations = [str(Path(path).parent)]
+    spec = importlib.util.spec_from_file_location(module_name, path,
+                                                  submodule_search_locations=submodule_search_locations)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,133 @@
+"""Populate final Task output to a pipeline's results directory without copying where possible"""
+
+import errno
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from yapim.utils.config_manager import ConfigManager
+
+# Linux ioctl that shares the extents of a file with another file on a copy-on-write filesystem (btrfs, XFS)
+_FICLONE = 0x40049409
+
+
+class OutputFinalizer:
+    """ Populate each "final" output file of a Task with the pipeline's FinalizeStrategy:
+
+    - copy: copy file
+    - hardlink: hard link file
+    - reflink: clone file on a copy-on-write filesystem
+    - symlink: symlink to file
+    - move: move file, and replace it with a symlink to its new location so that later Tasks can still read it
+
+    Strategies other than symlink fall back to a copy when the file cannot be linked, e.g. when the results directory
+    is on another filesystem. Copies are made on a bounded pool of background threads, so that a Task chain does not
+    wait on them. Files are written under a temporary name, so that a partial copy is never found in its final location
+    """
+    def __init__(self, strategy: str, workers: int = 4):
+        """ Create finalizer
+
+        :param strategy: FinalizeStrategy from ConfigManager
+        :param workers: Maximum number of copies made at once
+        """
+        self.strategy = strategy
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="finalize")
+        self._copies: List[Future] = []
+        self._lock = threading.Lock()
+
+    def finalize(self, file: str, final_file: str, on_complete: Optional[Callable[[], None]] = None):
+        """ Populate file to its final location
+
+        :param file: Task output file
+        :param final_file: Path in results directory
+        :param on_complete: Called once file is in its final location, which is after its copy has completed if it is
+         copied
+        """
+        if os.path.exists(final_file) and os.path.samefile(file, final_file):
+            # Finalized in an earlier run
+            OutputFinalizer._complete(on_complete)
+            return
+        if self.strategy != ConfigManager.COPY_FINALIZE:
+            try:
+                self._link(file, final_file)
+                OutputFinalizer._complete(on_complete)
+                return
+            except OSError as err:
+                if self.strategy == ConfigManager.SYMLINK_FINALIZE:
+                    raise
+                logging.debug("Copying %s to %s, as %s failed: %s", file, final_file, self.strategy, err)
+        with self._lock:
+            self._copies.append(self._pool.submit(OutputFinalizer._copy, file, final_file, on_complete))
+
+    def close(self):
+        """Wait for copies to complete. Raises the first exception encountered by a copy"""
+        self._pool.shutdown(wait=True)
+        with self._lock:
+            copies, self._copies = self._copies, []
+        for copy in copies:
+            err = copy.exception()
+            if err is not None:
+                raise err
+
+    def _link(self, file: str, final_file: str):
+        """Populate file with strategy, raising OSError if it cannot be linked"""
+        tmp_file = final_file + ".tmp"
+        if os.path.lexists(tmp_file):
+            os.remove(tmp_file)
+        if self.strategy == ConfigManager.HARDLINK_FINALIZE:
+            os.link(file, tmp_file)
+        elif self.strategy == ConfigManager.REFLINK_FINALIZE:
+            OutputFinalizer._reflink(file, tmp_file)
+        elif self.strategy == ConfigManager.SYMLINK_FINALIZE:
+            os.symlink(os.path.abspath(file), tmp_file)
+        else:
+            OutputFinalizer._move(file, final_file)
+            return
+        os.replace(tmp_file, final_file)
+
+    @staticmethod
+    def _reflink(file: str, new_file: str):
+        """Clone file, raising OSError if the filesystem does not support it"""
+        # pylint: disable=import-outside-toplevel
+        try:
+            import fcntl
+        except ImportError as err:
+            raise OSError(errno.EOPNOTSUPP, "reflink is not supported on this platform") from err
+        with open(file, "rb") as file_ptr, open(new_file, "wb") as new_file_ptr:
+            try:
+                fcntl.ioctl(new_file_ptr.fileno(), _FICLONE, file_ptr.fileno())
+            except OSError:
+                new_file_ptr.close()
+                os.remove(new_file)
+                raise
+
+    @staticmethod
+    def _move(file: str, final_file: str):
+        """Move file within a filesystem and leave a symlink to its new location"""
+        if os.path.islink(file):
+            # Symlinks are finalized as the file they point to, which is not moved out from under its owner
+            raise OSError(errno.EINVAL, "cannot move a symlink", file)
+        os.replace(file, final_file)
+        try:
+            os.symlink(os.path.abspath(final_file), file)
+        except OSError:
+            os.replace(final_file, file)
+            raise
+
+    @staticmethod
+    def _copy(file: str, final_file: str, on_complete: Optional[Callable[[], None]] = None):
+        """Copy file under a temporary name and move it into place"""
+        tmp_file = final_file + ".tmp"
+        shutil.copy(file, tmp_file)
+        os.replace(tmp_file, final_file)
+        OutputFinalizer._complete(on_complete)
+
+    @staticmethod
+    def _complete(on_complete: Optional[Callable[[], None]]):
+        """Call callback of a file that is in its final location"""
+        if on_complete is not None:
+            on_complete()
+
@@ -0,0 +1,205 @@
+"""Grant thread and memory allocations to waiting Tasks. Releasing resources wakes only the requests that are granted"""
+
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from yapim.utils.config_manager import ConfigManager
+
+
+class WaitMetrics:
+    """Track time spent by a Task waiting for resources"""
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, wait_time: float):
+        """Record a completed wait"""
+        self.count += 1
+        self.total += wait_time
+        self.maximum = max(self.maximum, wait_time)
+
+    @property
+    def mean(self) -> float:
+        """Mean time waited"""
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def __str__(self):  # pragma: no cover
+        return f"<WaitMetrics count: {self.count}, mean: {self.mean:.3f}s, max: {self.maximum:.3f}s>"
+
+    def __repr__(self):  # pragma: no cover
+        return self.__str__()
+
+
+# pylint: disable=too-few-public-methods
+class ResourceRequest:
+    """Pending request for resources. The requesting thread waits on its own event until the request is granted"""
+    def __init__(self, task_name: str, threads: int, memory: int, order: int):
+        self.task_name = task_name
+        self.threads = threads
+        self.memory = memory
+        self.order = order
+        self.requested_at = time.monotonic()
+        self.granted = threading.Event()
+        # Number of times that a later request was granted while this request was waiting
+        self.bypassed = 0
+
+
+class ResourceBroker:
+    """Manage the thread and memory budget of a pipeline.
+
+    Pending requests are grouped into FIFO queues by their (threads, memory) shape, so a release only inspects the head
+    of each queue. Granted requests are woken individually.
+
+    Policies:
+
+    fifo: Requests are granted in the order they were made. A request that does not fit blocks later requests.
+
+    best-fit: The largest waiting request that fits in the free resources is granted first. Requests of the same shape
+    are granted in the order they were made. Once the oldest waiting request has been passed over `max_bypass` times,
+    it reserves freed resources and no other request is granted until it fits.
+    """
+    FIFO = ConfigManager.FIFO_ALLOCATION
+    BEST_FIT = ConfigManager.BEST_FIT_ALLOCATION
+
+    def __init__(self, maximum_threads: int, maximum_memory: int, policy: str = FIFO, max_bypass: int = 100):
+        """ Create broker for a resource budget
+
+        :param maximum_threads: Total threads available
+        :param maximum_memory: Total memory (in GB) available
+        :param policy: Admission policy, either ResourceBroker.FIFO or ResourceBroker.BEST_FIT
+        :param max_bypass: Times that best-fit may pass over the oldest waiting request before reserving resources
+         for it
+        :raises: ValueError if policy is not valid
+        """
+        if policy not in (ResourceBroker.FIFO, ResourceBroker.BEST_FIT):
+            raise ValueError(f"Resource policy must be one of '{ResourceBroker.FIFO}' or '{ResourceBroker.BEST_FIT}'")
+        self.maximum_threads = maximum_threads
+        self.maximum_memory = maximum_memory
+        self.policy = policy
+        self.max_bypass = max_bypass
+        self.threads_in_use = 0
+        self.memory_in_use = 0
+        self._lock = threading.Lock()
+        self._queues: Dict[Tuple[int, int], Deque[ResourceRequest]] = {}
+        self._shapes: List[Tuple[int, int]] = []
+        self._waiting = 0
+        self._order = 0
+        self._metrics: Dict[str, WaitMetrics] = {}
+
+    @property
+    def waiting(self) -> int:
+        """Number of requests that are waiting for resources"""
+        return self._waiting
+
+    def acquire(self, task_name: str, threads: int, memory: int):
+        """ Block until requested resources are available
+
+        :param task_name: Name used to track wait time
+        :param threads: Threads requested
+        :param memory: Memory requested
+        """
+        with self._lock:
+            request = ResourceRequest(task_name, threads, memory, self._order)
+            self._order += 1
+            # Under best-fit, waiting requests only fit in free resources if the oldest request has reserved them
+            if self._waiting == 0 and self._fits(request):
+                self._grant(request)
+            elif self.policy == ResourceBroker.BEST_FIT and self._fits(request) and self._bypass_oldest():
+                self._grant(request)
+            else:
+                self._enqueue(request)
+        request.granted.wait()
+        self._record_wait(request)
+
+    def release(self, threads: int, memory: int):
+        """ Return resources to the budget and grant any waiting requests that now fit
+
+        :param threads: Threads released
+        :param memory: Memory released
+        """
+        with self._lock:
+            self.threads_in_use -= threads
+            self.memory_in_use -= memory
+            self._admit()
+
+    def metrics(self) -> Dict[str, WaitMetrics]:
+        """Wait-time metrics by task name"""
+        with self._lock:
+            return dict(self._metrics)
+
+    def _record_wait(self, request: ResourceRequest):
+        """Store wait time for a granted request"""
+        wait_time = time.monotonic() - request.requested_at
+        with self._lock:
+            if request.task_name not in self._metrics:
+                self._metrics[request.task_name] = WaitMetrics()
+            self._metrics[request.task_name].add(wait_time)
+
+    def _fits(self, request: ResourceRequest) -> bool:
+        """Request fits in currently free resources"""
+        return self.threads_in_use + request.threads <= self.maximum_threads and \
+            self.memory_in_use + request.memory <= self.maximum_memory
+
+    def _grant(self, request: ResourceRequest):
+        """Allocate resources to request and wake its thread"""
+        self.threads_in_use += request.threads
+        self.memory_in_use += request.memory
+        request.granted.set()
+
+    def _enqueue(self, request: ResourceRequest):
+        """Add request to the queue for its shape"""
+        shape = (request.threads, request.memory)
+        if shape not in self._queues:
+            self._queues[shape] = deque()
+            self._shapes.append(shape)
+            # Largest shapes are checked first when using best-fit
+            self._shapes.sort(reverse=True)
+        self._queues[shape].append(request)
+        self._waiting += 1
+
+    def _admit(self):
+        """Grant waiting requests based on policy"""
+        while self._waiting > 0:
+            request = self._next_request()
+            if request is None:
+                return
+            self._queues[(request.threads, request.memory)].popleft()
+            self._waiting -= 1
+            self._grant(request)
+
+    def _oldest(self) -> Optional[ResourceRequest]:
+        """Waiting request that was made first"""
+        oldest: Optional[ResourceRequest] = None
+        for shape in self._shapes:
+            if len(self._queues[shape]) > 0 and (oldest is None or self._queues[shape][0].order < oldest.order):
+                oldest = self._queues[shape][0]
+        return oldest
+
+    def _bypass_oldest(self) -> bool:
+        """Pass over the oldest waiting request to grant a later request. Returns False if the oldest waiting request
+        has reserved freed resources"""
+        oldest = self._oldest()
+        if oldest is None:
+            return True
+        if oldest.bypassed >= self.max_bypass:
+            return False
+        oldest.bypassed += 1
+        return True
+
+    def _next_request(self) -> Optional[ResourceRequest]:
+        """Select next request to grant, or None if no request may be granted"""
+        oldest = self._oldest()
+        if oldest is None:
+            return None
+        if self.policy == ResourceBroker.FIFO or oldest.bypassed >= self.max_bypass:
+            return oldest if self._fits(oldest) else None
+        # Shapes are sorted largest-first
+        for shape in self._shapes:
+            if len(self._queues[shape]) > 0 and self._fits(self._queues[shape][0]):
+                if self._queues[shape][0] is not oldest:
+                    oldest.bypassed += 1
+                return self._queues[shape][0]
+        return None
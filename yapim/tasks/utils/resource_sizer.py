@@ -0,0 +1,111 @@
+"""Predict the threads, memory and time that each Task requests from the resources it used in earlier runs"""
+
+import math
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from yapim.tasks.utils.slurm_status import format_slurm_time, parse_slurm_time
+from yapim.utils.config_manager import TaskSettings
+from yapim.utils.results_store import UsageRecord
+
+_GB = 1 << 30
+
+
+class SizedResources(NamedTuple):
+    """Threads, memory (in GB) and SLURM time limit requested by a Task"""
+    threads: int
+    memory: int
+    time: Optional[str]
+
+
+class TaskUsageSummary(NamedTuple):
+    """Resources used by a Task across the records it ran on"""
+    task: str
+    runs: int
+    mean_seconds: float
+    max_seconds: float
+    # CPU seconds per second of runtime, or None if CPU time was not measured
+    mean_cores: Optional[float]
+    # Mean fraction of requested threads used, or None if not measured
+    mean_utilization: Optional[float]
+    # Bytes, or None if not measured
+    max_peak_memory: Optional[int]
+
+
+class ResourceSizer:
+    """ Size the resource requests of Tasks from the usage stored in a pipeline's results store.
+
+    A Task's request on a record is sized from the largest usage of any of its earlier runs, scaled up by the size of
+    the record's input files if they are larger than any input the Task has run on, and with headroom added. Requests
+    are never larger than the values set in the config file, which are used for Tasks that have not been measured.
+    Memory is only sized once the peak memory of every run of a Task has been measured
+    """
+    MEMORY_HEADROOM = 1.25
+    CPU_HEADROOM = 1.25
+    # Jobs that exceed their time limit are killed, so time is sized generously
+    TIME_HEADROOM = 2.0
+
+    def __init__(self, history: Iterable[UsageRecord]):
+        """ Create sizer
+
+        :param history: Stored usage, as returned by ResultsStore.usage_history()
+        """
+        self._history: Dict[str, List[UsageRecord]] = {}
+        for record in history:
+            self._history.setdefault(record.task, []).append(record)
+
+    def size(self, task: str, settings: TaskSettings, input_size: int) -> SizedResources:
+        """ Size the resources that a Task requests on a record
+
+        :param task: Name of Task's working directory
+        :param settings: Task's settings, whose values are the largest that may be requested
+        :param input_size: Total size (in bytes) of record's input files
+        :return: Requested resources
+        """
+        threads, memory = int(settings.threads), int(settings.memory)
+        time = None if settings.time is None else str(settings.time)
+        records = self._history.get(task)
+        if records is None:
+            return SizedResources(threads, memory, time)
+        scale = ResourceSizer._scale(records, input_size)
+        # A run whose peak memory was not measured may have used more than those that were
+        peaks = [record.peak_memory for record in records]
+        if all(peaks):
+            memory = min(memory, max(1, math.ceil(max(peaks) * scale * ResourceSizer.MEMORY_HEADROOM / _GB)))
+        cores = [record.cpu_seconds / record.seconds for record in records
+                 if record.cpu_seconds is not None and record.seconds > 0]
+        if len(cores) > 0:
+            threads = min(threads, max(1, math.ceil(max(cores) * ResourceSizer.CPU_HEADROOM)))
+        time_limit = None if time is None else parse_slurm_time(time)
+        if time_limit is not None:
+            seconds = max(record.seconds for record in records) * scale * ResourceSizer.TIME_HEADROOM
+            if seconds < time_limit:
+                time = format_slurm_time(seconds)
+        return SizedResources(threads, memory, time)
+
+    def summary(self) -> List[TaskUsageSummary]:
+        """Summarize the resources used by each Task, ordered by Task name"""
+        summaries = []
+        for task, records in sorted(self._history.items()):
+            seconds = [record.seconds for record in records]
+            measured = [record for record in records if record.cpu_seconds is not None and record.seconds > 0]
+            peaks = [record.peak_memory for record in records if record.peak_memory is not None]
+            summaries.append(TaskUsageSummary(
+                task=task,
+                runs=len(records),
+                mean_seconds=sum(seconds) / len(seconds),
+                max_seconds=max(seconds),
+                mean_cores=sum(record.cpu_seconds / record.seconds for record in measured) / len(measured)
+                if len(measured) > 0 else None,
+                mean_utilization=sum(record.cpu_seconds / record.seconds / (record.threads or 1) for record in measured)
+                / len(measured) if len(measured) > 0 else None,
+                max_peak_memory=max(peaks) if len(peaks) > 0 else None,
+            ))
+        return summaries
+
+    @staticmethod
+    def _scale(records: List[UsageRecord], input_size: int) -> float:
+        """Factor by which input is larger than the largest input that a Task has run on"""
+        largest_input = max(record.input_size or 0 for record in records)
+        if input_size <= 0 or largest_input <= 0:
+            return 1.0
+        return max(1.0, input_size / largest_input)
@@ -0,0 +1,104 @@
+"""Measure the CPU time and peak memory of the commands that a Task runs"""
+
+import itertools
+import resource
+import sys
+import threading
+from typing import Dict, Optional, Set, Union
+
+from plumbum.commands.base import BaseCommand
+
+
+class ResourceUsage:
+    """ CPU time and peak memory used by a Task.
+
+    Local commands launched with parallel()/single() are measured when they exit, and SLURM jobs are measured from
+    job accounting. Tasks that use the `process` backend are also measured as a whole. The commands of async Tasks, and
+    the Python code of Tasks that use the `thread` backend, are not measured. Once the CPU time or peak memory of any
+    part of a Task is not known, that of the Task is not known either, so that it is not sized from partial usage
+    """
+    def __init__(self):
+        # None once the CPU time of any measured part of the Task is not known
+        self.cpu_seconds: Optional[float] = 0.0
+        # Largest peak resident set size, in bytes, of any one measured part of the Task, or None once one is not known
+        self.peak_memory: Optional[int] = 0
+        # Set once any usage has been added
+        self.measured = False
+        self._lock = threading.Lock()
+
+    def add(self, cpu_seconds: Optional[float], peak_memory: Optional[int]):
+        """ Add the usage of a command
+
+        :param cpu_seconds: User and system CPU time, or None if not known
+        :param peak_memory: Peak resident set size, in bytes, or None if not known
+        """
+        with self._lock:
+            self.measured = True
+            if cpu_seconds is None or self.cpu_seconds is None:
+                self.cpu_seconds = None
+            else:
+                self.cpu_seconds += cpu_seconds
+            if peak_memory is None or self.peak_memory is None:
+                self.peak_memory = None
+            else:
+                self.peak_memory = max(self.peak_memory, peak_memory)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def max_rss(usage: resource.struct_rusage) -> int:
+    """Peak resident set size of rusage in bytes, which Linux reports in kilobytes"""
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+_running_lock = threading.Lock()
+# Usage of each measured command that is running in this process, by command
+_running: Dict[int, ResourceUsage] = {}
+# Commands that ran at the same time as a command of another Task
+_overlapped: Set[int] = set()
+_command_ids = itertools.count()
+
+
+def run_command(cmd: Union[BaseCommand, object], usage: ResourceUsage) -> str:
+    """ Run a local command, and add the CPU time and peak memory of the child processes that exited while it ran to
+    usage.
+
+    The usage of child processes is only reported for this process as a whole, so the command is not measured if a
+    command of another Task ran at the same time. The peak memory of a command is the largest that any child process
+    has reached, which includes the memory of this process when the child was forked. A command's peak memory is only
+    known if it is larger than both, and is otherwise left unknown rather than overstated
+
+    :param cmd: plumbum command
+    :param usage: Usage of Task that runs command
+    :raises: ProcessExecutionError if command exits with a non-zero status
+    :return: Command stdout
+    """
+    command_id = next(_command_ids)
+    with _running_lock:
+        for other_id, other_usage in _running.items():
+            if other_usage is not usage:
+                _overlapped.update((other_id, command_id))
+        _running[command_id] = usage
+        start = resource.getrusage(resource.RUSAGE_CHILDREN)
+    try:
+        return cmd()
+    finally:
+        end = resource.getrusage(resource.RUSAGE_CHILDREN)
+        with _running_lock:
+            del _running[command_id]
+            overlapped = command_id in _overlapped
+            _overlapped.discard(command_id)
+        if overlapped:
+            usage.add(None, None)
+        else:
+            peak_memory = None
+            if end.ru_maxrss > max(start.ru_maxrss, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss):
+                peak_memory = max_rss(end)
+            usage.add(end.ru_utime + end.ru_stime - start.ru_utime - start.ru_stime, peak_memory)
@@ -0,0 +1,96 @@
+"""Group SLURM scripts that are submitted at about the same time into job arrays"""
+
+import itertools
+import os
+import threading
+from typing import Dict, List, Optional
+
+from plumbum import local
+
+
+class SLURMBatcher:
+    """ Collect the SLURM scripts that Tasks submit and launch them as job arrays, so that a step that runs on
+    thousands of records submits a few hundred `sbatch` calls rather than thousands.
+
+    Scripts are grouped by key, which should identify the Task and the resources that the script requests. A group is
+    submitted once it holds `batch_size` scripts, or `batch_wait` seconds after its first script was added.
+    """
+    ARRAY_SCRIPT = "slurm-array-runner-%d.sh"
+    _array_ids = itertools.count()
+
+    class Batch:
+        """Scripts that will be launched in the same job array"""
+        def __init__(self):
+            self.scripts: List[str] = []
+            self.full = threading.Event()
+            self.launched = threading.Event()
+            self.array_id: Optional[str] = None
+
+    def __init__(self, batch_size: int, batch_wait: float):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._pending: Dict[str, SLURMBatcher.Batch] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, script: str) -> Optional[str]:
+        """ Add script to the job array for its key and wait until the array is launched. The first script added to a
+        batch launches it.
+
+        :param key: Scripts with the same key are run in the same job array
+        :param script: Path to SLURM script
+        :return: Job id of array task that runs script, or None if the job array could not be launched
+        """
+        with self._lock:
+            batch = self._pending.get(key)
+            is_first = batch is None
+            if is_first:
+                batch = SLURMBatcher.Batch()
+                self._pending[key] = batch
+            index = len(batch.scripts)
+            batch.scripts.append(script)
+            if len(batch.scripts) >= self.batch_size:
+                del self._pending[key]
+                batch.full.set()
+        if is_first:
+            batch.full.wait(self.batch_wait)
+            with self._lock:
+                if self._pending.get(key) is batch:
+                    del self._pending[key]
+            try:
+                batch.array_id = SLURMBatcher._launch(batch.scripts)
+            finally:
+                batch.launched.set()
+        batch.launched.wait()
+        if batch.array_id is None:
+            return None
+        return f"{batch.array_id}_{index}"
+
+    @staticmethod
+    def _launch(scripts: List[str]) -> Optional[str]:
+        """ Write a job array script that runs each script by its array index, and launch it using sbatch
+
+        :param scripts: Scripts to run, which all request the same resources
+        :return: Job id of array, or None if sbatch output could not be parsed
+        """
+        array_script = os.path.join(os.path.dirname(scripts[0]),
+                                    SLURMBatcher.ARRAY_SCRIPT % next(SLURMBatcher._array_ids))
+        with open(array_script, "w") as file_ptr:
+            file_ptr.write("#!/bin/bash\n\n")
+            # All scripts in a batch request the same resources, so the first script's header applies to each
+            with open(scripts[0], "r") as script_ptr:
+                for line in script_ptr:
+                    if line.startswith("#SBATCH"):
+                        file_ptr.write(line)
+            file_ptr.write("#SBATCH --array=0-%d\n\n" % (len(scripts) - 1))
+            file_ptr.write("SCRIPTS=(\n")
+            for script in scripts:
+                file_ptr.write('  "%s"\n' % script)
+            file_ptr.write(")\n")
+            file_ptr.write('bash "${SCRIPTS[$SLURM_ARRAY_TASK_ID]}"\n')
+        log_line = str(local["sbatch"][array_script]()).split()
+        if len(log_line) == 0:
+            return None
+        try:
+            return str(int(log_line[-1]))
+        except ValueError:
+            return None
@@ -2,15 +2,15 @@
 Module holds logic for running a dask distributed task within a SLURM job
 """
 
+import itertools
+import logging
 import os
-from pathlib import Path
-from time import sleep
 from typing import List, Union, Optional
 
 from plumbum.machines.local import LocalCommand, local
 
-from yapim.tasks.utils.slurm_status import SlurmStatus
-from yapim.utils.config_manager import ConfigManager
+from yapim.tasks.utils.slurm_batcher import SLURMBatcher
+from yapim.tasks.utils.slurm_status import SlurmMonitor, SlurmJob
 
 
 class SlurmRunError(Exception):
@@ -25,9 +25,11 @@ class SLURMCaller:
     and called by dask task manager, respectively.
 
     """
-    OUTPUT_SCRIPTS = "slurm-runner.sh"
+    OUTPUT_SCRIPTS = "slurm-runner-%d.sh"
     FAILED_ID = "failed-job-id"
-    status: Optional[SlurmStatus] = None
+    monitor: Optional[SlurmMonitor] = None
+    batcher: Optional[SLURMBatcher] = None
+    _script_ids = itertools.count()
 
     def __init__(self,
                  cmd: Union[LocalCommand, str, List[Union[LocalCommand, str]]],
@@ -44,15 +46,18 @@ class SLURMCaller:
         self.user_id = self.config_manager.get_slurm_userid()
         self.time_override = time_override
         self.threads_override = threads_override
-        if SLURMCaller.status is None:
-            SLURMCaller.status = SlurmStatus(self.user_id)
+        if SLURMCaller.monitor is None:
+            SLURMCaller.monitor = SlurmMonitor(self.user_id)
+        if SLURMCaller.batcher is None and self.config_manager.slurm_batch_size > 1:
+            SLURMCaller.batcher = SLURMBatcher(self.config_manager.slurm_batch_size,
+                                               self.config_manager.slurm_batch_wait)
 
         # Generated job id
         self.job_id: str = SLURMCaller.FAILED_ID
         # Initialize as not running
         self.running = False
-        # Path of script that will run
-        self.script = str(os.path.join(task.wdir, SLURMCaller.OUTPUT_SCRIPTS))
+        # Path of script that will run. Named uniquely as the script may wait to be launched in a job array
+        self.script = str(os.path.join(task.wdir, SLURMCaller.OUTPUT_SCRIPTS % next(SLURMCaller._script_ids)))
         # Create slurm script in working directory
         self._generate_script()
 
@@ -73,8 +78,15 @@ class SLURMCaller:
     def _launch_script(self):
         """ Run generated script using sbatch
 
-        Check if loaded properly and store in object data if properly launched
+        Check if loaded properly and store in object data if properly launched. If batching is enabled, the script is
+        launched as part of a job array
         """
+        if SLURMCaller.batcher is not None:
+            job_id = SLURMCaller.batcher.submit(self._batch_key(), self.script)
+            if job_id is not None:
+                self.job_id = job_id
+                self.running = True
+            return
         # Call script using sbatch
         log_line = str(local["sbatch"][self.script]()).split()
         # If no output to stdout/err, return
@@ -83,14 +95,13 @@ class SLURMCaller:
         # Otherwise set running status based on contents of stdout/err
         self.running = self._has_launched(log_line[-1])
 
-    # Call squeue using user id and check if created job id is present
-    def _is_running(self) -> bool:
-        """ Method will check if the job_id created by launching the sbatch script is still
-        visible within a user's `squeue`.
+    def _batch_key(self) -> str:
+        """ Scripts for the same Task that request the same resources may run in the same job array
 
-        :return: Task still running (true) or has completed/failed to start (false)
+        :return: Task name and SBATCH header of script
         """
-        return self.running and SLURMCaller.status.check_status(self.job_id)
+        with open(self.script, "r") as file_ptr:
+            return self.task.name + "".join(line for line in file_ptr if line.startswith("#SBATCH"))
 
     def _has_launched(self, log_line: str) -> bool:
         """ Parse output from sbatch to see if job id was adequately created
@@ -116,37 +127,26 @@ class SLURMCaller:
         file_ptr.write("#!/bin/bash\n\n")
 
         # Write all header lines
-        nodes = self.config_manager.find(self.task.full_name, ConfigManager.NODES)
-        if nodes is None:
-            nodes = "1"
-        file_ptr.write(SLURMCaller._create_header_line("--nodes", nodes))
-
-        tasks = self.config_manager.find(self.task.full_name, ConfigManager.TASKS)
-        if tasks is None:
-            tasks = "1"
-        file_ptr.write(SLURMCaller._create_header_line("--tasks", tasks))
-
+        settings = self.config_manager.settings(self.task.full_name)
+        file_ptr.write(SLURMCaller._create_header_line("--nodes", "1" if settings.nodes is None else settings.nodes))
+        file_ptr.write(SLURMCaller._create_header_line("--tasks", "1" if settings.tasks is None else settings.tasks))
         file_ptr.write(
             SLURMCaller._create_header_line("--cpus-per-task",
-                                            self.config_manager.find(self.task.full_name, ConfigManager.THREADS)
-                                            if self.threads_override is None else self.threads_override)
-        )
-        file_ptr.write(
-            SLURMCaller._create_header_line("--mem",
-                                            str(self.config_manager.find(self.task.full_name, ConfigManager.MEMORY)) +
-                                            "GB")
+                                            self.task.threads if self.threads_override is None
+                                            else self.threads_override)
         )
+        file_ptr.write(SLURMCaller._create_header_line("--mem", str(self.task.memory) + "GB"))
         file_ptr.write(
             SLURMCaller._create_header_line("--time",
-                                            self.config_manager.find(self.task.full_name, ConfigManager.TIME)
-                                            if self.time_override is None else self.time_override)
+                                            self.task.time_limit if self.time_override is None
+                                            else self.time_override)
         )
         # Write additional header lines passed in by user
         for added_arg in self.config_manager.get_sbatch_flagged_arguments():
             file_ptr.write(SLURMCaller._create_header_line(*added_arg))
         file_ptr.write("\n")
 
-        added_header = self.config_manager.find(self.task.full_name, ConfigManager.SLURM_HEADER)
+        added_header = settings.slurm_header
         if isinstance(added_header, list):
             for header_line in added_header:
                 file_ptr.write(header_line)
@@ -176,19 +176,24 @@ class SLURMCaller:
         return "slurm-%s.out" % self.job_id
 
     def __call__(self, *args, **kwargs):
-        """ Call will run script using sbatch and periodically check for when to stop running
+        """ Call will run script using sbatch and wait for the SLURM monitor to report that it has left the queue. The
+        resources that the job used are added to its Task's usage
 
         :param args: Any args passed
         :param kwargs: Any kwargs passed
+        :raises: SlurmRunError if job timed out, or did not complete, or exited with a non-zero status or signal
         """
         # Launch and acquire job id
         self._launch_script()
-        SLURMCaller.status.update()
-        # Check for running status
-        while self._is_running():
-            sleep(60)  # Wait 1 minute in between checking if still running
-        slurm_file = Path("slurm-%s.out" % self.job_id)
-        if slurm_file.exists():
-            _file = "\n".join(open(slurm_file, "r").readlines())
-            if "ERROR" in _file and "TIME" in _file:
-                raise SlurmRunError("Timeout found in SLURM job")
+        if not self.running:
+            return
+        job = SLURMCaller.monitor.wait(self.job_id)
+        self.task.resource_usage.add(job.cpu_seconds, job.peak_memory)
+        if job.state == SlurmJob.TIMEOUT:
+            raise SlurmRunError(f"Timeout found in SLURM job {self.job_id}")
+        error = job.error()
+        if error is not None:
+            raise SlurmRunError(error)
+        if not job.accounted:
+            logging.info("Unable to confirm that SLURM job %s completed, as job accounting is not available",
+                         self.job_id)
@@ -1,36 +1,280 @@
 """Manage status of in-progress SLURM jobs"""
 
+import logging
 import threading
-from datetime import datetime, timedelta
+import time
+from typing import Dict, Iterable, Optional, Tuple
 
-from plumbum import local
+from plumbum import local, ProcessExecutionError, CommandNotFound
 
 
-class SlurmStatus:
-    """Queries squeue job information for user, periodically queries to update cached status. Will re-check c. 60s"""
-    def __init__(self, user_id: str):
-        self.lock = threading.Lock()
+# Multipliers of sacct memory units
+_MEMORY_UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_slurm_time(value: str) -> Optional[float]:
+    """ Parse a SLURM duration, such as a --time limit or a sacct TotalCPU value. Durations are formatted as minutes,
+    minutes:seconds, hours:minutes:seconds, days-hours, days-hours:minutes or days-hours:minutes:seconds
+
+    :param value: Duration
+    :return: Duration in seconds, or None if value is not a duration
+    """
+    value = str(value).strip()
+    days = 0.0
+    try:
+        if "-" in value:
+            days_str, value = value.split("-", 1)
+            days = float(days_str)
+            # Fields after days begin with hours
+            fields = [float(field) for field in value.split(":")]
+            fields += [0.0] * (3 - len(fields))
+        else:
+            fields = [float(field) for field in value.split(":")]
+            if len(fields) == 1:
+                fields = [0.0, fields[0], 0.0]
+            elif len(fields) == 2:
+                fields = [0.0, *fields]
+    except ValueError:
+        return None
+    if len(fields) != 3:
+        return None
+    hours, minutes, seconds = fields
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def format_slurm_time(seconds: float) -> str:
+    """Format a duration as a SLURM --time limit, in whole minutes"""
+    minutes = max(int(-(-seconds // 60)), 1)
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{days}-{hours:02d}:{minutes:02d}:00" if days > 0 else f"{hours:02d}:{minutes:02d}:00"
+
+
+class SlurmJob:
+    """State of a SLURM job being waited on. `complete` is set once the job has left the queue, along with the CPU
+    time and peak memory that the job used, if job accounting reports them"""
+    TIMEOUT = "TIMEOUT"
+    COMPLETED = "COMPLETED"
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.state: Optional[str] = None
+        self.exit_code: Optional[int] = None
+        # Signal that ended the job, which sacct reports after the exit code
+        self.signal: Optional[int] = None
+        # Set if job accounting was available once the job left the queue
+        self.accounted = False
+        self.cpu_seconds: Optional[float] = None
+        # Peak resident set size of any step of the job, in bytes
+        self.peak_memory: Optional[int] = None
+        self.complete = threading.Event()
+
+    def error(self) -> Optional[str]:
+        """ Reason that a job that has left the queue did not complete. Jobs are only checked if job accounting is
+        available
+
+        :return: Description of failure, or None if job completed
+        """
+        if not self.accounted:
+            return None
+        if self.state is None:
+            return f"SLURM job {self.job_id} was not found in job accounting"
+        if self.state != SlurmJob.COMPLETED or self.exit_code not in (None, 0) or self.signal not in (None, 0):
+            return f"SLURM job {self.job_id} ended with state {self.state} and exit code " \
+                   f"{self.exit_code}:{self.signal}"
+        return None
+
+
+class SlurmMonitor:
+    """ Single background thread that tracks the SLURM jobs launched by a pipeline.
+
+    squeue is polled for all watched jobs at once, starting at `min_interval` seconds after a job is watched or leaves
+    the queue, and backing off to `max_interval` seconds while nothing changes. Once a job leaves the queue, its final
+    state, exit code and resource usage are read from sacct and its waiting Task is woken.
+    """
+    MIN_INTERVAL = 5.0
+    MAX_INTERVAL = 60.0
+    # Polls to wait for a job that has left the queue to be found in job accounting
+    ACCOUNTING_POLLS = 3
+
+    def __init__(self, user_id: str, min_interval: float = MIN_INTERVAL, max_interval: float = MAX_INTERVAL):
         self._user_id = user_id
-        self._time_last_checked = None
-        self._status_message = None
-
-    def _set_status(self):
-        """Set status of all running tasks"""
-        self._time_last_checked = datetime.now()
-        self._status_message = str(local["squeue"]["-u", self._user_id]())
-
-    def update(self):
-        """Update currently tracked info once a job has been launched"""
-        with self.lock:
-            self._set_status()
-
-    def check_status(self, job_id: str) -> bool:
-        """Check cache for running status. Update cache if too much time has elapsed since last check"""
-        with self.lock:
-            if self._status_message is None:
-                self._set_status()
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._interval = min_interval
+        self._next_poll = 0.0
+        self._jobs: Dict[str, SlurmJob] = {}
+        # Polls on which each job that has left the queue was not found in job accounting
+        self._unaccounted: Dict[str, int] = {}
+        self._changed = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, job_id: str) -> SlurmJob:
+        """ Begin tracking a launched job
+
+        :param job_id: Id of job, or <array id>_<index> for a job array task
+        :return: Job whose `complete` event is set once it has left the queue
+        """
+        with self._changed:
+            soonest_poll = time.monotonic() + self._min_interval
+            if len(self._jobs) == 0 or soonest_poll < self._next_poll:
+                self._next_poll = soonest_poll
+            self._interval = self._min_interval
+            job = self._jobs.get(job_id)
+            if job is None:
+                job = SlurmJob(job_id)
+                self._jobs[job_id] = job
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="yapim-slurm-monitor", daemon=True)
+                self._thread.start()
+            self._changed.notify_all()
+        return job
+
+    def wait(self, job_id: str) -> SlurmJob:
+        """ Block until job has left the queue
+
+        :param job_id: Id of job
+        :return: Completed job
+        """
+        job = self.watch(job_id)
+        job.complete.wait()
+        return job
+
+    def _run(self):
+        """Poll queue for as long as the pipeline runs, sleeping while no jobs are watched"""
+        while True:
+            with self._changed:
+                while len(self._jobs) == 0 or time.monotonic() < self._next_poll:
+                    self._changed.wait(None if len(self._jobs) == 0 else self._next_poll - time.monotonic())
+                watched = list(self._jobs.keys())
+            try:
+                self._poll(watched)
+            # pylint: disable=broad-except
+            except Exception as err:
+                logging.info("Unable to check SLURM job status: %s", err)
+            with self._changed:
+                self._next_poll = time.monotonic() + self._interval
+
+    def _poll(self, watched: Iterable[str]):
+        """ Query queue for watched jobs and complete those that have left it
+
+        :param watched: Ids of jobs to check
+        """
+        queued = SlurmMonitor.parse_queue(str(local["squeue"]["-h", "-r", "-u", self._user_id, "-o", "%i %T"]()))
+        finished = [job_id for job_id in watched if job_id not in queued]
+        sacct_output = SlurmMonitor._query_accounting(finished) if len(finished) > 0 else ""
+        accounted = sacct_output is not None
+        accounting = SlurmMonitor.parse_accounting(sacct_output or "")
+        usage = SlurmMonitor.parse_usage(sacct_output or "")
+        with self._changed:
+            for job_id in finished:
+                state, exit_code, signal = accounting.get(job_id, (None, None, None))
+                # Job is between the queue and accounting
+                if state in ("PENDING", "RUNNING", "REQUEUED", "COMPLETING"):
+                    continue
+                if state is None and accounted:
+                    polls = self._unaccounted.get(job_id, 0) + 1
+                    if polls < SlurmMonitor.ACCOUNTING_POLLS:
+                        self._unaccounted[job_id] = polls
+                        continue
+                self._unaccounted.pop(job_id, None)
+                job = self._jobs.pop(job_id)
+                job.state = state
+                job.exit_code = exit_code
+                job.signal = signal
+                job.accounted = accounted
+                job.cpu_seconds, job.peak_memory = usage.get(job_id, (None, None))
+                job.complete.set()
+            if len(finished) > 0:
+                self._interval = self._min_interval
             else:
-                current_time = datetime.now()
-                if current_time - self._time_last_checked > timedelta(seconds=60):
-                    self._set_status()
-            return job_id in self._status_message
+                self._interval = min(self._interval * 2, self._max_interval)
+
+    @staticmethod
+    def _query_accounting(job_ids: Iterable[str]) -> Optional[str]:
+        """ Get final states, exit codes and resource usage of jobs and their steps from sacct
+
+        :param job_ids: Ids of jobs
+        :return: sacct output formatted as `JobID,State,ExitCode,TotalCPU,MaxRSS`. None if job accounting is not
+         available
+        """
+        try:
+            return str(local["sacct"]["-n", "-P", "-o", "JobID,State,ExitCode,TotalCPU,MaxRSS",
+                                      "-j", ",".join(job_ids)]())
+        except (ProcessExecutionError, CommandNotFound) as err:
+            logging.info("Unable to read SLURM job accounting: %s", err)
+            return None
+
+    @staticmethod
+    def parse_queue(squeue_output: str) -> Dict[str, str]:
+        """ Parse squeue output formatted as `%i %T`
+
+        :param squeue_output: squeue output
+        :return: Map of job id to state
+        """
+        queued = {}
+        for line in squeue_output.splitlines():
+            line = line.split()
+            if len(line) >= 2:
+                queued[line[0]] = line[1]
+        return queued
+
+    @staticmethod
+    def parse_accounting(sacct_output: str) -> Dict[str, Tuple[str, Optional[int], Optional[int]]]:
+        """ Parse sacct output formatted as `JobID,State,ExitCode` with `|` delimiters. ExitCode is formatted as
+        `<exit code>:<signal>`
+
+        :param sacct_output: sacct output
+        :return: Map of job id to (state, exit code, signal)
+        """
+        accounting = {}
+        for line in sacct_output.splitlines():
+            line = line.strip().split("|")
+            if len(line) < 3:
+                continue
+            # State may include detail, such as "CANCELLED by 1000"
+            state = line[1].split()[0] if len(line[1]) > 0 else None
+            codes = []
+            for code in line[2].split(":")[:2]:
+                try:
+                    codes.append(int(code))
+                except ValueError:
+                    codes.append(None)
+            codes += [None] * (2 - len(codes))
+            accounting[line[0]] = (state, codes[0], codes[1])
+        return accounting
+
+    @staticmethod
+    def parse_usage(sacct_output: str) -> Dict[str, Tuple[Optional[float], Optional[int]]]:
+        """ Parse resource usage from sacct output formatted as `JobID,State,ExitCode,TotalCPU,MaxRSS` with `|`
+        delimiters. TotalCPU of a job includes its steps, and MaxRSS is reported for each step
+
+        :param sacct_output: sacct output
+        :return: Map of job id to (CPU seconds, peak memory in bytes)
+        """
+        usage: Dict[str, Tuple[Optional[float], Optional[int]]] = {}
+        for line in sacct_output.splitlines():
+            line = line.strip().split("|")
+            if len(line) < 5:
+                continue
+            job_id, _, step = line[0].partition(".")
+            cpu_seconds, peak_memory = usage.get(job_id, (None, None))
+            if len(step) == 0:
+                cpu_seconds = parse_slurm_time(line[3])
+            step_memory = SlurmMonitor._parse_memory(line[4])
+            if step_memory is not None:
+                peak_memory = max(peak_memory or 0, step_memory)
+            usage[job_id] = (cpu_seconds, peak_memory)
+        return usage
+
+    @staticmethod
+    def _parse_memory(value: str) -> Optional[int]:
+        """Parse sacct memory, such as `1024K`, in bytes. Values without units are in kilobytes"""
+        value = value.strip()
+        if len(value) == 0:
+            return None
+        multiplier = _MEMORY_UNITS.get(value[-1].upper())
+        try:
+            return int(float(value[:-1]) * multiplier) if multiplier is not None else int(float(value) * 1024)
+        except ValueError:
+            return None
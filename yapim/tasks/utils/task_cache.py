@@ -0,0 +1,181 @@
+"""Reuse the output of Tasks that were run on the same input, configuration and program version"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Tuple
+
+from yapim.utils.config_manager import ConfigManager
+
+
+class TaskCache:
+    """ Content-addressed store of Task output that may be shared between pipeline runs and users.
+
+    A Task's key is a digest of its name, record id, input, configuration section and program version. Input files are
+    hashed by content, so the key does not depend on where the input is stored. On a hit, the Task's output files are
+    copied from the cache rather than running the Task.
+
+    Entries are stored as <cache directory>/<key[:2]>/<key>/, with one file or directory per output key.
+    """
+    # Settings that change how a Task is run, but not its output
+    IGNORED_SETTINGS = {ConfigManager.THREADS, ConfigManager.MEMORY, ConfigManager.TIME, ConfigManager.WORKERS,
+                        ConfigManager.NODES, ConfigManager.TASKS, ConfigManager.BACKEND, ConfigManager.DEPENDENCIES,
+                        ConfigManager.CACHE}
+    MANIFEST = "manifest.json"
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Digests of files, by (path, size, modification time)
+        self._digests: Dict[Tuple[str, int, float], str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_cached(task) -> bool:
+        """Task has requested caching in its configuration section"""
+        return task.settings.cache
+
+    def key(self, task) -> str:
+        """ Digest of Task's name, record id, input, configuration section and program version
+
+        :param task: Task to run
+        :return: Hex digest
+        """
+        digest = hashlib.sha256()
+        for part in (task.name, str(task.record_id)):
+            self._update(digest, part)
+        self._update(digest, self._value_digest(dict(task.input)))
+        config = {key: value for key, value in task.config.items() if key not in TaskCache.IGNORED_SETTINGS}
+        self._update(digest, json.dumps(config, sort_keys=True, default=str))
+        # pylint: disable=protected-access
+        self._update(digest, json.dumps(task._versions, default=str))
+        if task.settings.program is not None:
+            # Upgrading a program changes its size or modification time
+            executable = str(task.program.executable)
+            stat = os.stat(executable)
+            self._update(digest, f"{executable}:{stat.st_size}:{stat.st_mtime}")
+        return digest.hexdigest()
+
+    def restore(self, key: str, task) -> bool:
+        """ Copy cached output to Task's output paths
+
+        :param key: Task key
+        :param task: Task to restore output of
+        :return: True if Task's output was restored
+        """
+        entry = self._entry(key)
+        if not entry.joinpath(TaskCache.MANIFEST).exists():
+            return False
+        with open(entry.joinpath(TaskCache.MANIFEST), "r") as file_ptr:
+            cached_keys = set(json.load(file_ptr))
+        outputs = TaskCache._output_files(task)
+        if set(outputs.keys()) != cached_keys or len(cached_keys) == 0:
+            return False
+        for output_key, path in outputs.items():
+            TaskCache._copy(entry.joinpath(output_key), path)
+        return True
+
+    def store(self, key: str, task):
+        """ Add Task's output files to cache. Entries are written to a temporary directory and moved into place, so
+        concurrent runs that store the same key do not conflict
+
+        :param key: Task key
+        :param task: Task that has completed
+        """
+        entry = self._entry(key)
+        outputs = TaskCache._output_files(task)
+        if entry.exists() or len(outputs) == 0:
+            return
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{key}-", dir=entry.parent))
+        try:
+            for output_key, path in outputs.items():
+                TaskCache._copy(path, staging.joinpath(output_key))
+            with open(staging.joinpath(TaskCache.MANIFEST), "w") as file_ptr:
+                json.dump(sorted(outputs.keys()), file_ptr)
+            os.rename(staging, entry)
+        except OSError:
+            # Another run stored this key first
+            shutil.rmtree(staging, ignore_errors=True)
+
+    @staticmethod
+    def invalidate(task):
+        """ Remove Task's output files, which were written by a run with a different key
+
+        :param task: Task whose output is out of date
+        """
+        for path in TaskCache._output_files(task).values():
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.lexists(path):
+                os.remove(path)
+
+    def _entry(self, key: str) -> Path:
+        """Directory of cache entry"""
+        return self.directory.joinpath(key[:2]).joinpath(key)
+
+    @staticmethod
+    def _output_files(task) -> Dict[str, Path]:
+        """Task output values that are paths, by output key. Other output is set by the Task's __init__ method and is
+        not cached"""
+        return {str(output_key): Path(output) for output_key, output in task.output.items()
+                if output_key != "final" and isinstance(output, (Path, str))}
+
+    @staticmethod
+    def _copy(source: Path, destination: Path):
+        """Copy file or directory, replacing destination"""
+        if os.path.isdir(source):
+            shutil.rmtree(destination, ignore_errors=True)
+            shutil.copytree(source, destination)
+        else:
+            shutil.copy(source, destination)
+
+    @staticmethod
+    def _update(digest, part: str):
+        """Add a length-prefixed string to digest, so that parts cannot run together"""
+        data = part.encode()
+        digest.update(str(len(data)).encode() + b":" + data)
+
+    def _value_digest(self, value) -> str:
+        """Digest of an input value. Files and directories are hashed by content, containers by their items, and other
+        values by their string representation"""
+        digest = hashlib.sha256()
+        if isinstance(value, dict):
+            for key in sorted(value.keys(), key=str):
+                self._update(digest, str(key))
+                self._update(digest, self._value_digest(value[key]))
+        elif isinstance(value, (list, tuple, set)):
+            items = sorted(value, key=str) if isinstance(value, set) else value
+            for item in items:
+                self._update(digest, self._value_digest(item))
+        elif isinstance(value, (Path, str)) and os.path.isfile(value):
+            self._update(digest, "file:" + self._file_digest(str(value)))
+        elif isinstance(value, (Path, str)) and os.path.isdir(value):
+            for root, dirs, files in os.walk(value):
+                dirs.sort()
+                for file in sorted(files):
+                    path = os.path.join(root, file)
+                    self._update(digest, os.path.relpath(path, value))
+                    self._update(digest, self._file_digest(path))
+        else:
+            self._update(digest, type(value).__name__ + ":" + str(value))
+        return digest.hexdigest()
+
+    def _file_digest(self, path: str) -> str:
+        """Digest of file contents. Digests are reused while a file's size and modification time are unchanged"""
+        stat = os.stat(path)
+        memo_key = (path, stat.st_size, stat.st_mtime)
+        with self._lock:
+            if memo_key in self._digests:
+                return self._digests[memo_key]
+        digest = hashlib.sha256()
+        with open(path, "rb") as file_ptr:
+            for block in iter(lambda: file_ptr.read(1 << 20), b""):
+                digest.update(block)
+        with self._lock:
+            self._digests[memo_key] = digest.hexdigest()
+        return self._digests[memo_key]
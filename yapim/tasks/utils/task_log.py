@@ -0,0 +1,105 @@
+"""Write the commands that a Task runs, and their output, to its working directory"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Optional, TextIO
+
+
+class TaskLog:
+    """ Log of a single Task, kept open while the Task runs.
+
+    Each command and its output are appended to `task.log`, and a record of each event is appended to `task.jsonl` as
+    one JSON object per line, e.g.:
+
+    {"time": 1700000000.0, "record_id": "0", "task": "Write", "event": "command", "command": "/bin/echo 0"}
+
+    Both files are written through a buffer that is flushed once a command's output has been written, and when the log
+    is closed
+    """
+    LOG = "task.log"
+    RECORDS = "task.jsonl"
+    # Events
+    START = "start"
+    COMMAND = "command"
+    OUTPUT = "output"
+    COMPLETE = "complete"
+    ERROR = "error"
+
+    def __init__(self, wdir: Path, record_id: str, task_name: str):
+        """ Create log. Files are opened when the first event is written
+
+        :param wdir: Task working directory
+        :param record_id: Id of record that Task is running on
+        :param task_name: Name of Task
+        """
+        self.wdir = Path(wdir)
+        self.record_id = str(record_id)
+        self.task_name = task_name
+        self._log: Optional[TextIO] = None
+        self._records: Optional[TextIO] = None
+        # Commands of async Tasks may complete at the same time
+        self._lock = threading.Lock()
+
+    def event(self, event: str, **fields):
+        """ Write a record of an event to the JSON-lines log
+
+        :param event: Name of event
+        :param fields: Additional fields of record, which must be JSON-serializable
+        """
+        with self._lock:
+            self._write_record(event, fields)
+
+    def command(self, cmd: str):
+        """Write a command that is about to run"""
+        with self._lock:
+            self._log_file().write(cmd + "\n")
+            self._write_record(TaskLog.COMMAND, {"command": cmd})
+
+    def output(self, cmd: str, out, slurm_log_file: Optional[str] = None):
+        """ Write the output of a command, followed by its SLURM log if one was written
+
+        :param cmd: Command that was run
+        :param out: Output of command, or None
+        :param slurm_log_file: Path to SLURM log of command
+        """
+        with self._lock:
+            log = self._log_file()
+            if out is not None:
+                log.write(str(out) + "\n")
+            if slurm_log_file is not None and os.path.exists(slurm_log_file):
+                log.write("------BEGIN SLURM LOG OUTPUT SECTION------\n")
+                with open(slurm_log_file, "r") as slurm_log_ptr:
+                    shutil.copyfileobj(slurm_log_ptr, log)
+                log.write("------END SLURM LOG OUTPUT SECTION------\n")
+            log.write("\n")
+            self._write_record(TaskLog.OUTPUT, {"command": cmd, "output": None if out is None else str(out),
+                                                "slurm_log": slurm_log_file})
+            log.flush()
+            self._records.flush()
+
+    def close(self):
+        """Flush and close log files. The log may be written to again after it is closed"""
+        with self._lock:
+            for file_ptr in (self._log, self._records):
+                if file_ptr is not None:
+                    file_ptr.close()
+            self._log = None
+            self._records = None
+
+    def _log_file(self) -> TextIO:
+        """Human-readable log, opened for appending when first written. Caller holds the lock"""
+        if self._log is None:
+            self._log = open(self.wdir.joinpath(TaskLog.LOG), "a")
+        return self._log
+
+    def _write_record(self, event: str, fields: dict):
+        """Write JSON-lines record. Caller holds the lock"""
+        if self._records is None:
+            self._records = open(self.wdir.joinpath(TaskLog.RECORDS), "a")
+        record = {"time": time.time(), "record_id": self.record_id, "task": self.task_name, "event": event}
+        record.update(fields)
+        self._records.write(json.dumps(record, default=str) + "\n")
@@ -1,7 +1,13 @@
 """Track version info for calling programs, allow/disallow versions and provide logic to run"""
 
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Dict
 
-from typing import Optional
+from plumbum import ProcessExecutionError
+from plumbum.machines import LocalCommand
 
 
 class VersionInfo:
@@ -31,3 +37,63 @@ class VersionInfo:
     def calling_parameter(self) -> str:
         """Parameter used to gather version info at the command line"""
         return self._calling_parameter
+
+
+class VersionProbes:
+    """ Process-wide cache of the output of program version calls, so that a program is called once per pipeline and
+    not once per Task per record. Output is keyed on the program's path, size and modification time, so an upgraded
+    program is called again. Set a file with `load()` to keep output between runs of a pipeline.
+    """
+    _responses: Dict[str, Optional[str]] = {}
+    _key_locks: Dict[str, threading.Lock] = {}
+    _lock = threading.Lock()
+    _path: Optional[Path] = None
+
+    @staticmethod
+    def load(path: Path):
+        """ Read cached output from file, and write newly-probed output to it
+
+        :param path: JSON file
+        """
+        with VersionProbes._lock:
+            VersionProbes._path = Path(path)
+            if VersionProbes._path.exists():
+                with open(VersionProbes._path, "r") as file_ptr:
+                    VersionProbes._responses.update(json.load(file_ptr))
+
+    @staticmethod
+    def probe(program: LocalCommand, calling_parameter: str) -> Optional[str]:
+        """ Call program with version parameter, or get output of an earlier call
+
+        :param program: Program to call
+        :param calling_parameter: Parameter that makes the program output its version
+        :return: Program output, or None if program exited with a non-zero status
+        """
+        executable = str(program.executable)
+        stat = os.stat(executable)
+        key = f"{executable}:{stat.st_size}:{stat.st_mtime}:{calling_parameter}"
+        with VersionProbes._lock:
+            key_lock = VersionProbes._key_locks.setdefault(key, threading.Lock())
+        # Tasks that request the same program wait for one call to complete
+        with key_lock:
+            with VersionProbes._lock:
+                if key in VersionProbes._responses:
+                    return VersionProbes._responses[key]
+            try:
+                response = program[calling_parameter]()
+            except ProcessExecutionError:
+                response = None
+            with VersionProbes._lock:
+                VersionProbes._responses[key] = response
+                VersionProbes._save()
+        return response
+
+    @staticmethod
+    def _save():
+        """Write cached output to file, if set. Called with lock held"""
+        if VersionProbes._path is None:
+            return
+        temp_path = VersionProbes._path.with_suffix(".tmp")
+        with open(temp_path, "w") as file_ptr:
+            json.dump(VersionProbes._responses, file_ptr)
+        os.replace(temp_path, VersionProbes._path)
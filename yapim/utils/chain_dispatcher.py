@@ -0,0 +1,63 @@
+"""Start Task chains as the resource broker grants them resources, rather than from a fixed-size pool of workers"""
+
+import threading
+from concurrent.futures import Future
+
+from yapim.tasks.task_chain_distributor import TaskChainDistributor
+
+
+class ChainDispatcher:
+    """Run each submitted Task chain on its own thread once the resource broker has granted the first Task in the chain
+    its threads and memory. Submitting blocks until the grant is made, so the number of chains in flight is bounded by
+    the pipeline's MaxThreads and MaxMemory and not by a worker count.
+
+    Use as a context manager to wait for all submitted chains to complete:
+
+    with ChainDispatcher() as dispatcher:
+        future = dispatcher.submit(task_chain)
+    """
+    def __init__(self):
+        self._running = 0
+        self._all_complete = threading.Condition()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.join()
+
+    def submit(self, task_chain: TaskChainDistributor) -> Future:
+        """ Wait for resources for the first Task in a chain, then run the chain on a new thread
+
+        :param task_chain: Task chain to run
+        :return: Future that completes with the chain
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+        task_chain.acquire_first_resources()
+        with self._all_complete:
+            self._running += 1
+        threading.Thread(target=self._run, args=(task_chain, future), daemon=True).start()
+        return future
+
+    def join(self):
+        """Wait for all submitted chains to complete"""
+        with self._all_complete:
+            self._all_complete.wait_for(lambda: self._running == 0)
+
+    def _run(self, task_chain: TaskChainDistributor, future: Future):
+        """Run Task chain and store its outcome"""
+        err = None
+        try:
+            task_chain.run()
+        # pylint: disable=broad-except
+        except BaseException as chain_err:
+            err = chain_err
+        task_chain.release_held_resources()
+        if err is not None:
+            future.set_exception(err)
+        else:
+            future.set_result(None)
+        with self._all_complete:
+            self._running -= 1
+            self._all_complete.notify_all()
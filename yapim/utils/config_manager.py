@@ -1,10 +1,12 @@
 """Manages the config file, as well as arguments that are set for each part of the pipeline"""
 
+import hashlib
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Tuple, Dict, Optional
+from typing import List, Tuple, Dict, NamedTuple, Optional
 
-import yaml
 from plumbum import local, CommandNotFound
 
 
@@ -50,6 +52,24 @@ class MissingDependenciesError(ValueError):
     pass
 
 
+class TaskSettings(NamedTuple):
+    """Settings of a Task or dependency, with settings inherited from its parent section already applied"""
+    section: dict
+    resolved: dict
+    threads: Optional[object]
+    memory: Optional[object]
+    time: Optional[object]
+    nodes: Optional[object]
+    tasks: Optional[object]
+    backend: str
+    skip: bool
+    cache: bool
+    program: Optional[str]
+    program_path: Optional[str]
+    flags: Tuple[str, ...]
+    slurm_header: Optional[List[str]]
+
+
 class ConfigManager:
     """ConfigManager handles parsing user-passed config file"""
     ROOT = "root"
@@ -64,24 +84,116 @@ class ConfigManager:
     MEMORY = "memory"
     TIME = "time"
     USE_CLUSTER = "USE_CLUSTER"
+    SLURM_BATCH_SIZE = "batch-size"
+    SLURM_BATCH_WAIT = "batch-wait"
     DEPENDENCIES = "dependencies"
     PROGRAM = "program"
     FLAGS = "FLAGS"
     DATA = "data"
     SKIP = "skip"
+    BACKEND = "backend"
+    CACHE = "cache"
+    THREAD_BACKEND = "thread"
+    PROCESS_BACKEND = "process"
     MAX_THREADS = "MaxThreads"
     MAX_MEMORY = "MaxMemory"
     GLOBAL = "GLOBAL"
+    SCHEDULER = "Scheduler"
+    BATCH_SCHEDULER = "batch"
+    DAG_SCHEDULER = "dag"
+    ALLOCATION_POLICY = "AllocationPolicy"
+    FIFO_ALLOCATION = "fifo"
+    BEST_FIT_ALLOCATION = "best-fit"
+    TASK_CACHE = "TaskCache"
+    COMPLETION_CHECK = "CompletionCheck"
+    STAT_COMPLETION = "stat"
+    MANIFEST_COMPLETION = "manifest"
+    VERIFY_COMPLETION = "verify"
+    FINALIZE_STRATEGY = "FinalizeStrategy"
+    COPY_FINALIZE = "copy"
+    HARDLINK_FINALIZE = "hardlink"
+    REFLINK_FINALIZE = "reflink"
+    SYMLINK_FINALIZE = "symlink"
+    MOVE_FINALIZE = "move"
+    FINALIZE_WORKERS = "FinalizeWorkers"
+    PRIORITY_POLICY = "PriorityPolicy"
+    FIFO_PRIORITY = "fifo"
+    LPT_PRIORITY = "lpt"
+    CRITICAL_PATH_PRIORITY = "critical-path"
+    RESOURCE_SIZING = "ResourceSizing"
+    STATIC_SIZING = "static"
+    AUTO_SIZING = "auto"
+    # Executables that the programs of each config were found at, by digest of config file, PATH and working directory
+    VALIDATION_CACHE = Path(os.environ.get("XDG_CACHE_HOME", "~/.cache")).expanduser().joinpath("yapim", "validated")
+    # Kinds of path checks run during validation
+    DATA_CHECK = "data"
+    PROGRAM_CHECK = "program"
+    DEPENDENCY_PROGRAM_CHECK = "dependency-program"
 
     def __init__(self, config_path: Path, storage_directory: Optional[Path] = None):
+        # Tasks import ConfigManager for its constants, so the YAML parser is only imported when a config is loaded
+        # pylint: disable=import-outside-toplevel
+        import yaml
         with open(str(Path(config_path).resolve()), "r") as file_ptr:
-            self.config = yaml.load(file_ptr, Loader=yaml.FullLoader)
-            # Confirm all paths in file are valid
-            self._validate_global()
+            contents = file_ptr.read()
+        self.config = yaml.load(contents, Loader=yaml.FullLoader)
+        # Confirm all paths in file are valid
+        self._validate_global(contents)
         self.storage_directory = storage_directory
+        # Resolved settings, by (scope, name)
+        self._settings: Dict[Tuple[str, str], TaskSettings] = {}
+        self._sbatch_arguments: Optional[List[Tuple[str, str]]] = None
+
+    def settings(self, task_data: Tuple[str, str]) -> TaskSettings:
+        """ Get (scope, name) settings, which are resolved from the config file on first use
+
+        :param task_data: (scope, name) of Task or dependency
+        :return: Settings with inherited values applied
+        """
+        settings = self._settings.get(task_data)
+        if settings is None:
+            settings = self._compile(task_data)
+            self._settings[task_data] = settings
+        return settings
+
+    def _compile(self, task_data: Tuple[str, str]) -> TaskSettings:
+        """Resolve settings of a Task or dependency from its own config section and its parent's section"""
+        section = self._section(task_data)
+        resolved = dict(self.parent_info(task_data))
+        resolved.update(section)
+        program = resolved.get(ConfigManager.PROGRAM)
+        program_path = None
+        if program is not None:
+            program = str(program)
+            try:
+                program_path = program if os.path.exists(program) else str(local.which(program))
+            except CommandNotFound:
+                # Skipped Tasks are not validated. Report the missing program if the Task requests it
+                program_path = None
+        backend = resolved.get(ConfigManager.BACKEND)
+        return TaskSettings(
+            section=section,
+            resolved=resolved,
+            threads=resolved.get(ConfigManager.THREADS),
+            memory=resolved.get(ConfigManager.MEMORY),
+            time=resolved.get(ConfigManager.TIME),
+            nodes=resolved.get(ConfigManager.NODES),
+            tasks=resolved.get(ConfigManager.TASKS),
+            backend=ConfigManager.THREAD_BACKEND if backend is None else str(backend),
+            skip=str(resolved.get(ConfigManager.SKIP)).lower() == "true",
+            cache=str(resolved.get(ConfigManager.CACHE)).lower() == "true",
+            program=program,
+            program_path=program_path,
+            flags=tuple(ConfigManager._parse_flags(resolved.get(ConfigManager.FLAGS))),
+            slurm_header=resolved.get(ConfigManager.SLURM_HEADER),
+        )
 
     def get(self, task_data: Tuple[str, str]) -> dict:
         """Get (scope, name) data from config file"""
+        return self.settings(task_data).section
+
+    def _section(self, task_data: Tuple[str, str]) -> dict:
+        """Find (scope, name) section in config file"""
         if task_data[0] == ConfigManager.ROOT:
             return self.config[task_data[1]]
         if ConfigManager.DEPENDENCIES not in self.config[task_data[0]].keys():
@@ -91,13 +203,7 @@ class ConfigManager:
     def find(self, task_data: Tuple[str, str], key: str) -> Optional:
         """Find a Task's data `key`. If not found in Task's own config section, check parent sections.
         Return None if nothing is found."""
-        config_section = self.get(task_data)
-        if key in config_section.keys():
-            return config_section[key]
-        inner = self.parent_info(task_data)
-        if key in inner.keys():
-            return inner[key]
-        return None
+        return self.settings(task_data).resolved.get(key)
 
     def parent_info(self, task_data: Tuple[str, str]) -> dict:
         """Get this Task's parent info, which may be the top-level ConfigManager.ROOT location"""
@@ -105,9 +211,71 @@ class ConfigManager:
             return self.config[task_data[1]]
         return self.config[task_data[0]]
 
+    @property
+    def use_cluster(self) -> bool:
+        """Run was launched on SLURM"""
+        return bool(self.config[ConfigManager.SLURM][ConfigManager.USE_CLUSTER])
+
+    @property
+    def scheduler(self) -> str:
+        """Scheduler requested in GLOBAL section. Defaults to running Tasks in batches split at each AggregateTask"""
+        return str(self.config[ConfigManager.GLOBAL].get(ConfigManager.SCHEDULER, ConfigManager.BATCH_SCHEDULER))
+
+    @property
+    def allocation_policy(self) -> str:
+        """Policy used to grant waiting Tasks their requested threads and memory. Defaults to first-come first-served"""
+        global_options = self.config[ConfigManager.GLOBAL]
+        return str(global_options.get(ConfigManager.ALLOCATION_POLICY, ConfigManager.FIFO_ALLOCATION))
+
+    @property
+    def task_cache_directory(self) -> Optional[Path]:
+        """Directory of cache of Task output that is shared between runs, if set in GLOBAL section"""
+        directory = self.config[ConfigManager.GLOBAL].get(ConfigManager.TASK_CACHE)
+        return None if directory is None else Path(str(directory)).expanduser().resolve()
+
+    @property
+    def completion_check(self) -> str:
+        """How Tasks that completed in an earlier run are found. Defaults to checking that each output path exists"""
+        global_options = self.config[ConfigManager.GLOBAL]
+        return str(global_options.get(ConfigManager.COMPLETION_CHECK, ConfigManager.STAT_COMPLETION))
+
+    @property
+    def finalize_strategy(self) -> str:
+        """How final Task output is populated to the results directory. Defaults to copying each file"""
+        global_options = self.config[ConfigManager.GLOBAL]
+        return str(global_options.get(ConfigManager.FINALIZE_STRATEGY, ConfigManager.COPY_FINALIZE))
+
+    @property
+    def finalize_workers(self) -> int:
+        """Maximum number of final output files copied at once"""
+        return int(self.config[ConfigManager.GLOBAL].get(ConfigManager.FINALIZE_WORKERS, 4))
+
+    @property
+    def priority_policy(self) -> str:
+        """Order in which records and Tasks that are ready to run are started. Defaults to the order of the input"""
+        global_options = self.config[ConfigManager.GLOBAL]
+        return str(global_options.get(ConfigManager.PRIORITY_POLICY, ConfigManager.FIFO_PRIORITY))
+
+    @property
+    def resource_sizing(self) -> str:
+        """How the threads, memory and time requested by each Task are set. Defaults to the values in the config file"""
+        global_options = self.config[ConfigManager.GLOBAL]
+        return str(global_options.get(ConfigManager.RESOURCE_SIZING, ConfigManager.STATIC_SIZING))
+
+    @property
+    def slurm_batch_size(self) -> int:
+        """Maximum number of SLURM scripts for a Task to launch in one job array. Defaults to launching each script as
+        its own job"""
+        return int(self.config[ConfigManager.SLURM].get(ConfigManager.SLURM_BATCH_SIZE, 1))
+
+    @property
+    def slurm_batch_wait(self) -> float:
+        """Seconds to wait for a job array to fill before it is launched"""
+        return float(self.config[ConfigManager.SLURM].get(ConfigManager.SLURM_BATCH_WAIT, 30))
+
     # pylint: disable=raise-missing-from
-    def _validate_global(self):
-        """Confirm global settings are present and valid"""
+    def _validate_global(self, contents: str):
+        """Confirm global settings are present and valid. `contents` is the text of the config file"""
         data_dict = self.config
         for required_arg in (ConfigManager.GLOBAL, ConfigManager.INPUT, ConfigManager.SLURM):
             if required_arg not in data_dict.keys():
@@ -119,14 +287,63 @@ class ConfigManager:
                 int(data_dict[ConfigManager.GLOBAL][required_arg])
             except ValueError:
                 raise MissingRequiredHeader(f"Global argument {required_arg} is not an integer!")
+        scheduler = self.scheduler
+        if scheduler not in (ConfigManager.BATCH_SCHEDULER, ConfigManager.DAG_SCHEDULER):
+            raise InvalidProtocolError(f"Global argument {ConfigManager.SCHEDULER} must be one of "
+                                       f"'{ConfigManager.BATCH_SCHEDULER}' or '{ConfigManager.DAG_SCHEDULER}', "
+                                       f"not '{scheduler}'")
+        allocation_policy = self.allocation_policy
+        if allocation_policy not in (ConfigManager.FIFO_ALLOCATION, ConfigManager.BEST_FIT_ALLOCATION):
+            raise InvalidProtocolError(f"Global argument {ConfigManager.ALLOCATION_POLICY} must be one of "
+                                       f"'{ConfigManager.FIFO_ALLOCATION}' or '{ConfigManager.BEST_FIT_ALLOCATION}', "
+                                       f"not '{allocation_policy}'")
+        completion_check = self.completion_check
+        if completion_check not in (ConfigManager.STAT_COMPLETION, ConfigManager.MANIFEST_COMPLETION,
+                                    ConfigManager.VERIFY_COMPLETION):
+            raise InvalidProtocolError(f"Global argument {ConfigManager.COMPLETION_CHECK} must be one of "
+                                       f"'{ConfigManager.STAT_COMPLETION}', '{ConfigManager.MANIFEST_COMPLETION}' or "
+                                       f"'{ConfigManager.VERIFY_COMPLETION}', not '{completion_check}'")
+        finalize_strategies = (ConfigManager.COPY_FINALIZE, ConfigManager.HARDLINK_FINALIZE,
+                               ConfigManager.REFLINK_FINALIZE, ConfigManager.SYMLINK_FINALIZE,
+                               ConfigManager.MOVE_FINALIZE)
+        if self.finalize_strategy not in finalize_strategies:
+            raise InvalidProtocolError(f"Global argument {ConfigManager.FINALIZE_STRATEGY} must be one of "
+                                       f"{', '.join(repr(strategy) for strategy in finalize_strategies)}, "
+                                       f"not '{self.finalize_strategy}'")
+        priority_policies = (ConfigManager.FIFO_PRIORITY, ConfigManager.LPT_PRIORITY,
+                             ConfigManager.CRITICAL_PATH_PRIORITY)
+        if self.priority_policy not in priority_policies:
+            raise InvalidProtocolError(f"Global argument {ConfigManager.PRIORITY_POLICY} must be one of "
+                                       f"{', '.join(repr(policy) for policy in priority_policies)}, "
+                                       f"not '{self.priority_policy}'")
+        if self.resource_sizing not in (ConfigManager.STATIC_SIZING, ConfigManager.AUTO_SIZING):
+            raise InvalidProtocolError(f"Global argument {ConfigManager.RESOURCE_SIZING} must be one of "
+                                       f"'{ConfigManager.STATIC_SIZING}' or '{ConfigManager.AUTO_SIZING}', "
+                                       f"not '{self.resource_sizing}'")
+        try:
+            if self.finalize_workers < 1:
+                raise ValueError
+        except ValueError:
+            raise InvalidProtocolError(f"Global argument {ConfigManager.FINALIZE_WORKERS} must be a positive integer")
+        try:
+            if self.slurm_batch_size < 1 or self.slurm_batch_wait < 0:
+                raise ValueError
+        except ValueError:
+            raise InvalidProtocolError(f"SLURM arguments {ConfigManager.SLURM_BATCH_SIZE} and "
+                                       f"{ConfigManager.SLURM_BATCH_WAIT} must be a positive integer and a "
+                                       f"non-negative number")
         max_memory = int(data_dict[ConfigManager.GLOBAL][ConfigManager.MAX_MEMORY])
         max_threads = int(data_dict[ConfigManager.GLOBAL][ConfigManager.MAX_THREADS])
-        ConfigManager._validate(self.config, False, max_memory, max_threads)
+        checks: List[Tuple[str, str, str]] = []
+        ConfigManager._validate(self.config, False, max_memory, max_threads, checks)
+        ConfigManager._check_paths(checks, contents)
 
     # pylint: disable=too-many-branches
     @staticmethod
-    def _validate(data_dict, is_dependency: bool, max_memory: int, max_threads: int):
-        """ Confirm that data and dependency paths provided in file are all valid."""
+    def _validate(data_dict, is_dependency: bool, max_memory: int, max_threads: int,
+                  checks: List[Tuple[str, str, str]]):
+        """ Confirm that config sections are well-formed, and collect the data and dependency paths that must exist
+        as (kind of check, task name, path)"""
         if not isinstance(data_dict, dict):
             raise MissingDataError("Dependency section is improperly configured!")
         for task_name, task_dict in data_dict.items():
@@ -158,63 +375,127 @@ class ConfigManager:
                 if memory > max_memory:
                     raise InvalidResourcesError(f"Max memory is set to {max_memory} "
                                                 f"but {task_name} requests {memory}")
+            backends = (ConfigManager.THREAD_BACKEND, ConfigManager.PROCESS_BACKEND)
+            if ConfigManager.BACKEND in task_dict.keys() and task_dict[ConfigManager.BACKEND] not in backends:
+                raise InvalidProtocolError(f"'{ConfigManager.BACKEND}' for {task_name} must be one of "
+                                           f"'{ConfigManager.THREAD_BACKEND}' or '{ConfigManager.PROCESS_BACKEND}'")
             if ConfigManager.SKIP in task_dict.keys() and task_dict[ConfigManager.SKIP] is True:
                 continue
             if ConfigManager.DATA in task_dict.keys():
                 for _val in ConfigManager._parse_flags(task_dict[ConfigManager.DATA]):
                     if ":" in _val:
                         _val = _val.split(":")[1]
-                    if not os.path.exists(str(Path(_val).resolve())):
-                        raise MissingDataError("Data for task %s (provided: %s) does not exist!" % (
-                            task_name, _val
-                        ))
+                    checks.append((ConfigManager.DATA_CHECK, task_name, _val))
             if ConfigManager.PROGRAM in task_dict.keys():
-                try:
-                    local.which(task_dict[ConfigManager.PROGRAM])
-                except CommandNotFound:
-                    # pylint: disable=raise-missing-from
-                    raise InvalidPathError(
-                        "Task %s (provided program path: %s) is not present in your system's path!" % (
-                            task_name, task_dict[ConfigManager.PROGRAM]))
+                checks.append((ConfigManager.PROGRAM_CHECK, task_name, task_dict[ConfigManager.PROGRAM]))
             if "dependencies" in task_dict.keys():
-                ConfigManager._validate(task_dict["dependencies"], True, max_memory, max_threads)
-                ConfigManager._check_dependencies(task_dict)
+                ConfigManager._validate(task_dict["dependencies"], True, max_memory, max_threads, checks)
+                ConfigManager._check_dependencies(task_dict, checks)
 
     # pylint: disable=fixme
     # TODO: Handle empty input dictionaries for config-level dependencies
     @staticmethod
-    def _check_dependencies(task_dict: Dict):
+    def _check_dependencies(task_dict: Dict, checks: List[Tuple[str, str, str]]):
         """ Check dependencies section of config file section
 
         :param task_dict: dictionary section for task
+        :param checks: List to add program paths to check to
         :raises: MissingDataError for poorly formed or missing data
         """
         for prog_name, prog_data in task_dict["dependencies"].items():
             # Provided as dict with program path and FLAGS
             if isinstance(prog_data, dict):
-                provided_program = ""
-                try:
-                    if ConfigManager.PROGRAM in prog_data.keys():
-                        provided_program = prog_data[ConfigManager.PROGRAM]
-                        if not os.path.exists(provided_program):
-                            local.which(provided_program)
-                except CommandNotFound as not_found_err:
-                    raise InvalidPathError(
-                        "Dependency %s (program path provided: %s) is not present in your system's path!" % (
-                            prog_name, provided_program)) from not_found_err
+                if ConfigManager.PROGRAM in prog_data.keys():
+                    checks.append((ConfigManager.DEPENDENCY_PROGRAM_CHECK, prog_name, prog_data[ConfigManager.PROGRAM]))
             else:
                 raise MissingDataError("Dependency section is improperly configured!")
 
+    @staticmethod
+    def _check_paths(checks: List[Tuple[str, str, str]], contents: str):
+        """ Confirm that data and program paths exist. Each distinct path is checked once, and paths are checked
+        concurrently, as each check may be a round-trip to a network filesystem. Searching PATH for a program is only
+        done once for the same config file, PATH and working directory, after which the executable that was found is
+        checked
+
+        :param checks: (kind of check, task name, path) to confirm
+        :param contents: Contents of config file
+        :raises: MissingDataError or InvalidPathError for the first path in the config file that is not found
+        """
+        digest = hashlib.sha256()
+        for part in (contents, local.env.get("PATH", ""), os.getcwd()):
+            digest.update(part.encode() + b"\0")
+        marker = ConfigManager.VALIDATION_CACHE.joinpath(digest.hexdigest())
+        executables: Dict[str, str] = {}
+        try:
+            with open(marker, "r") as file_ptr:
+                executables = json.load(file_ptr)
+        except (OSError, ValueError):
+            pass
+        # First task to request each check, in config file order
+        distinct: Dict[Tuple[str, str], str] = {}
+        for kind, task_name, path in checks:
+            distinct.setdefault((kind, str(path)), task_name)
+        with ThreadPoolExecutor(max_workers=max(1, min(32, len(distinct)))) as pool:
+            found = list(pool.map(lambda check: ConfigManager._find_path(*check, executables), distinct.keys()))
+        for ((kind, path), task_name), found_path in zip(distinct.items(), found):
+            if found_path is not None:
+                continue
+            if kind == ConfigManager.DATA_CHECK:
+                raise MissingDataError("Data for task %s (provided: %s) does not exist!" % (task_name, path))
+            if kind == ConfigManager.PROGRAM_CHECK:
+                raise InvalidPathError(
+                    "Task %s (provided program path: %s) is not present in your system's path!" % (task_name, path))
+            raise InvalidPathError(
+                "Dependency %s (program path provided: %s) is not present in your system's path!" % (task_name, path))
+        found_executables = {path: found_path for (kind, path), found_path in zip(distinct.keys(), found)
+                             if kind != ConfigManager.DATA_CHECK}
+        if found_executables != executables:
+            try:
+                marker.parent.mkdir(parents=True, exist_ok=True)
+                with open(marker, "w") as file_ptr:
+                    json.dump(found_executables, file_ptr)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _find_path(kind: str, path: str, executables: Dict[str, str]) -> Optional[str]:
+        """ Check that data path exists, or find program on PATH
+
+        :param kind: Kind of check
+        :param path: Data path or program
+        :param executables: Executables that programs were found at by an earlier check
+        :return: Data path or program executable, or None if not found
+        """
+        if kind == ConfigManager.DATA_CHECK:
+            path = str(Path(path).resolve())
+            return path if os.path.exists(path) else None
+        if kind == ConfigManager.DEPENDENCY_PROGRAM_CHECK and os.path.exists(path):
+            return path
+        executable = executables.get(path)
+        if executable is not None and os.path.exists(executable):
+            return executable
+        try:
+            executable = str(local.which(path))
+        except CommandNotFound:
+            return None
+        # plumbum keeps the executables it has found for the life of the process
+        return executable if os.path.exists(executable) else None
+
     def get_sbatch_flagged_arguments(self) -> List[Tuple[str, str]]:
         """ Get SLURM arguments from file
 
         :return: SLURM arguments parsed to input list
         """
-        ignore_slurm_fields = {"USE_CLUSTER", "--nodes", "--ntasks", "--mem", "user-id"}
+        if self._sbatch_arguments is not None:
+            return list(self._sbatch_arguments)
+        ignore_slurm_fields = {"USE_CLUSTER", "--nodes", "--ntasks", "--mem", "user-id", ConfigManager.SLURM_BATCH_SIZE,
+                               ConfigManager.SLURM_BATCH_WAIT}
         slurm_section_data = {key: str(val)
                               for key, val in self.config[ConfigManager.SLURM].items()
                               if key not in ignore_slurm_fields}
-        return sorted(((key, value) for key, value in slurm_section_data.items()), key=lambda v: v[0])
+        self._sbatch_arguments = sorted(((key, value) for key, value in slurm_section_data.items()),
+                                        key=lambda v: v[0])
+        return list(self._sbatch_arguments)
 
     def get_slurm_userid(self):
         """ Get user id from slurm section.
@@ -233,6 +514,8 @@ class ConfigManager:
 
         :return: List of arguments to pass to calling program
         """
+        if config_param == ConfigManager.FLAGS:
+            return list(self.settings(task.full_name).flags)
         flags = self.find(task.full_name, config_param)
         return ConfigManager._parse_flags(flags)
 
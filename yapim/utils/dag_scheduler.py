@@ -0,0 +1,274 @@
+"""Schedule (record, Task) units directly from the pipeline dependency graph. AggregateTasks only gate the Tasks that
+require them"""
+
+import heapq
+import itertools
+import queue
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple, Type, Iterable, Union
+
+from yapim.tasks.aggregate_task import AggregateTask
+from yapim.tasks.task import Task
+from yapim.tasks.task_chain_distributor import TaskChainDistributor
+from yapim.utils.chain_dispatcher import ChainDispatcher
+from yapim.utils.config_manager import ConfigManager
+from yapim.utils.dependency_graph import DependencyGraph, Node
+from yapim.utils.path_manager import PathManager
+from yapim.utils.priority_policy import PriorityPolicy
+
+# (record_id, top-level Task name). AggregateTasks operate on the entire input set and use a record_id of None
+Unit = Tuple[Optional[str], str]
+
+
+# pylint: disable=too-many-instance-attributes
+class DAGScheduler:
+    """Dispatch each (record, Task) unit as soon as the units it requires have completed.
+
+    A Task unit for a record waits only on the Tasks listed in its requires() method. An AggregateTask waits until every
+    record has completed the Tasks it requires, and only Tasks that require the AggregateTask wait on it. Records that
+    are removed from tracking by an AggregateTask are not scheduled for any further Tasks. Records that are added by an
+    AggregateTask are scheduled for the Tasks that are downstream of it.
+
+    Units that are ready at the same time are started in the order of the pipeline's PriorityPolicy.
+    """
+    # Events handled by the scheduling thread
+    _RECORD = "record"
+    _INPUT_COMPLETE = "input-complete"
+    _UNIT = "unit"
+
+    def __init__(self,
+                 dependency_graph: DependencyGraph,
+                 task_blueprints: Dict[str, Type[Task]],
+                 config_manager: ConfigManager,
+                 path_manager: PathManager,
+                 results_base_dir: Union[Path, str],
+                 display_status_messages: bool,
+                 priority_policy: Optional[PriorityPolicy] = None):
+        """ Create scheduler for a pipeline
+
+        :param dependency_graph: Pipeline dependency graph
+        :param task_blueprints: Mapping of task name to type
+        :param config_manager: Pipeline config manager
+        :param path_manager: Pipeline path manager
+        :param results_base_dir: Results directory for this pipeline
+        :param display_status_messages: Display status messages as pipeline runs
+        :param priority_policy: Order in which ready units are started. Units are started in the order they become
+         ready if not provided
+        """
+        self._dependency_graph = dependency_graph
+        self._priority_policy = priority_policy
+        self.task_blueprints = task_blueprints
+        self.config_manager = config_manager
+        self.path_manager = path_manager
+        self.results_base_dir = results_base_dir
+        self.display_status_messages = display_status_messages
+        self._task_lists: Dict[str, List[Node]] = {
+            task_list[-1].name: task_list for task_list in dependency_graph.sorted_graph_identifiers
+        }
+        self._aggregates: Set[str] = {name for name in self._task_lists.keys()
+                                      if issubclass(task_blueprints[name], AggregateTask)}
+        self._requirements: Dict[str, List[str]] = {name: dependency_graph.requirements(name)
+                                                    for name in self._task_lists.keys()}
+        self._dependents: Dict[str, List[str]] = {name: [] for name in self._task_lists.keys()}
+        for name, requirements in self._requirements.items():
+            for requirement in requirements:
+                self._dependents[requirement].append(name)
+        # Record state
+        self._records: Dict[str, Set[str]] = {}
+        self._dropped: Set[str] = set()
+        self._unmet: Dict[Unit, int] = {}
+        self._running: Set[Unit] = set()
+        self._completed: Set[Unit] = set()
+        # Heap of (-priority, order became ready, unit) of units that are ready to start
+        self._ready: List[Tuple[float, int, Unit]] = []
+        self._ready_order = itertools.count()
+        # AggregateTask state
+        self._outstanding: Dict[str, int] = {name: 0 for name in self._aggregates}
+        self._unmet_aggregates: Dict[str, int] = {
+            name: len([req for req in self._requirements[name] if req in self._aggregates])
+            for name in self._aggregates
+        }
+        self._started_aggregates: Set[str] = set()
+        self._tracked_ids: Dict[str, Optional[Set[str]]] = {}
+        self._input_complete = False
+        self._events: queue.Queue = queue.Queue()
+        self._dispatcher: Optional[ChainDispatcher] = None
+        self._error: Optional[BaseException] = None
+
+    def run(self, record_ids: Iterable[str]):
+        """Run all units in pipeline for provided record ids. Record ids may be streamed - each record is scheduled as
+        soon as it is yielded, and AggregateTasks wait until every record has been yielded. Raises the first exception
+        encountered by a unit (or by the record id iterator) after all running units have completed"""
+        with ChainDispatcher() as dispatcher:
+            self._dispatcher = dispatcher
+            threading.Thread(target=self._read_records, args=(record_ids,), daemon=True).start()
+            while not self._input_complete or len(self._running) > 0 or len(self._ready) > 0:
+                if len(self._ready) == 0:
+                    self._handle(*self._events.get())
+                # Units that became ready while the last unit waited for resources are ranked before one is started
+                while True:
+                    try:
+                        self._handle(*self._events.get_nowait())
+                    except queue.Empty:
+                        break
+                if len(self._ready) > 0:
+                    self._dispatch(heapq.heappop(self._ready)[2])
+        if self._error is not None:
+            raise self._error
+
+    def _handle(self, event: str, payload):
+        """Update scheduling state with an event"""
+        if event == DAGScheduler._RECORD:
+            self._add_record(payload, self._task_lists.keys())
+        elif event == DAGScheduler._INPUT_COMPLETE:
+            self._input_complete = True
+            if payload is not None and self._error is None:
+                self._error = payload
+            self._dispatch_ready_aggregates()
+        else:
+            self._unit_complete(*payload)
+
+    def _read_records(self, record_ids: Iterable[str]):
+        """Pass record ids to the scheduling thread as they are yielded"""
+        err = None
+        try:
+            for record_id in record_ids:
+                if self._error is not None:
+                    break
+                self._events.put((DAGScheduler._RECORD, record_id))
+        # pylint: disable=broad-except
+        except BaseException as read_err:
+            err = read_err
+        self._events.put((DAGScheduler._INPUT_COMPLETE, err))
+
+    def _unit_complete(self, unit: Unit, task_chain: TaskChainDistributor, err: Optional[BaseException]):
+        """Handle the outcome of a unit"""
+        self._running.remove(unit)
+        if err is not None:
+            if self._error is None:
+                self._error = err
+            return
+        if unit[0] is None:
+            self._tracked_ids[unit[1]] = task_chain.tracked_record_ids
+        self._complete(unit)
+
+    def _add_record(self, record_id: str, task_names: Iterable[str]):
+        """Begin tracking a record that will run the provided Tasks"""
+        task_names = {name for name in task_names if name not in self._aggregates}
+        self._records[record_id] = task_names
+        if self._priority_policy is not None:
+            with TaskChainDistributor.update_lock:
+                record_data = TaskChainDistributor.results.get(record_id, {})
+            self._priority_policy.add_record(record_id, record_data)
+        for name in task_names:
+            self._unmet[(record_id, name)] = len([
+                req for req in self._requirements[name]
+                if (req in self._aggregates and (None, req) not in self._completed) or req in task_names
+            ])
+            for dependent in self._dependents[name]:
+                if dependent in self._aggregates:
+                    self._outstanding[dependent] += 1
+        for name in task_names:
+            if self._unmet[(record_id, name)] == 0:
+                self._push((record_id, name))
+
+    def _drop_record(self, record_id: str):
+        """Stop tracking a record that was removed by an AggregateTask. Running units are allowed to complete"""
+        self._dropped.add(record_id)
+        for name in self._records.pop(record_id):
+            unit = (record_id, name)
+            if unit not in self._completed and unit not in self._running:
+                for dependent in self._dependents[name]:
+                    if dependent in self._aggregates:
+                        self._outstanding[dependent] -= 1
+
+    def _push(self, unit: Unit):
+        """Add a unit whose requirements have completed to the units that are ready to start"""
+        priority = 0.0 if self._priority_policy is None else self._priority_policy.priority(unit[0], (unit[1],))
+        heapq.heappush(self._ready, (-priority, next(self._ready_order), unit))
+
+    def _dispatch(self, unit: Unit):
+        """Create Task chain for unit and submit to executor. Units of records that were removed by an AggregateTask
+        while the unit waited to start are not run"""
+        if self._error is not None or unit[0] in self._dropped:
+            return
+        record_id, task_name = unit
+        with TaskChainDistributor.update_lock:
+            if record_id is None:
+                input_data = TaskChainDistributor.results
+                chain_id = next(iter(TaskChainDistributor.results.keys()))
+            else:
+                input_data = TaskChainDistributor.results[record_id]
+                chain_id = record_id
+            task_chain = TaskChainDistributor(chain_id, [self._task_lists[task_name]], self.task_blueprints,
+                                              self.config_manager, self.path_manager, input_data,
+                                              self.results_base_dir, self.display_status_messages)
+        self._running.add(unit)
+        self._dispatcher.submit(task_chain).add_done_callback(
+            lambda future: self._events.put((DAGScheduler._UNIT, (unit, task_chain, future.exception())))
+        )
+
+    def _complete(self, unit: Unit):
+        """Mark unit as complete and dispatch any units that are now ready"""
+        self._completed.add(unit)
+        record_id, task_name = unit
+        if record_id is None:
+            self._complete_aggregate(task_name)
+            return
+        for dependent in self._dependents[task_name]:
+            if dependent in self._aggregates:
+                self._outstanding[dependent] -= 1
+        if record_id in self._dropped:
+            with TaskChainDistributor.update_lock:
+                TaskChainDistributor.results.pop(record_id, None)
+        else:
+            for dependent in self._dependents[task_name]:
+                if dependent in self._records[record_id]:
+                    self._unmet[(record_id, dependent)] -= 1
+                    if self._unmet[(record_id, dependent)] == 0:
+                        self._push((record_id, dependent))
+        self._dispatch_ready_aggregates()
+
+    def _complete_aggregate(self, task_name: str):
+        """Reconcile tracked records with the output of an AggregateTask and dispatch downstream units"""
+        current_ids = self._tracked_ids.get(task_name)
+        if current_ids is None:
+            # AggregateTask was not run, as there was no input
+            current_ids = set()
+        for record_id in set(self._records.keys()) - current_ids:
+            self._drop_record(record_id)
+        for dependent in self._dependents[task_name]:
+            if dependent in self._aggregates:
+                self._unmet_aggregates[dependent] -= 1
+                continue
+            for record_id, task_names in list(self._records.items()):
+                if dependent in task_names:
+                    self._unmet[(record_id, dependent)] -= 1
+                    if self._unmet[(record_id, dependent)] == 0:
+                        self._push((record_id, dependent))
+        new_ids = current_ids - set(self._records.keys()) - self._dropped
+        if len(new_ids) > 0:
+            downstream = self._downstream(task_name)
+            for record_id in new_ids:
+                self._add_record(record_id, downstream)
+        self._dispatch_ready_aggregates()
+
+    def _dispatch_ready_aggregates(self):
+        """Dispatch AggregateTasks whose requirements have completed for the entire input set"""
+        if not self._input_complete:
+            return
+        for task_name in sorted(self._aggregates - self._started_aggregates):
+            if task_name in self._started_aggregates:
+                continue
+            if self._outstanding[task_name] > 0 or self._unmet_aggregates[task_name] > 0:
+                continue
+            self._started_aggregates.add(task_name)
+            if len(TaskChainDistributor.results.keys()) == 0:
+                self._complete((None, task_name))
+            else:
+                self._push((None, task_name))
+
+    def _downstream(self, task_name: str) -> Set[str]:
+        """Names of all Tasks that directly or indirectly require a given Task"""
+        return set(self._dependency_graph.downstream(task_name))
@@ -1,9 +1,7 @@
 """Logic for building dependency graphs and topologically sorting to create tasks to complete"""
 
 import inspect
-from typing import List, Dict, Tuple, Type, Iterable, Optional, Set
-
-import networkx as nx
+from typing import List, Dict, Tuple, Type, Iterable, Optional, Set, Callable, FrozenSet, Hashable
 
 from yapim import AggregateTask
 from yapim.tasks.task import Task
@@ -36,7 +34,7 @@ class Node:
         return self.__str__()
 
     def __hash__(self):
-        return hash(self.scope + "." + self.name)
+        return hash((self.scope, self.name))
 
     def __eq__(self, other: "Node"):
         if not isinstance(other, Node):
@@ -44,6 +42,58 @@ class Node:
         return self.scope == other.scope and self.name == other.name
 
 
+class _DiGraph:
+    """Directed graph of Nodes (or Task names), stored as adjacency lists of integer node ids. Nodes and edges are kept
+    in the order in which they were added, so that sorting is deterministic"""
+    def __init__(self):
+        self.nodes: List[Hashable] = []
+        self.ids: Dict[Hashable, int] = {}
+        self.successors: List[List[int]] = []
+        self.predecessors: List[List[int]] = []
+        self._edges: Set[Tuple[int, int]] = set()
+
+    def add_node(self, node: Hashable) -> int:
+        """Add node if not present, and return its id"""
+        node_id = self.ids.get(node)
+        if node_id is None:
+            node_id = len(self.nodes)
+            self.ids[node] = node_id
+            self.nodes.append(node)
+            self.successors.append([])
+            self.predecessors.append([])
+        return node_id
+
+    def add_edge(self, source: Hashable, target: Hashable):
+        """Add edge from source to target, adding either node if not present"""
+        edge = (self.add_node(source), self.add_node(target))
+        if edge not in self._edges:
+            self._edges.add(edge)
+            self.successors[edge[0]].append(edge[1])
+            self.predecessors[edge[1]].append(edge[0])
+
+    def topological_sort(self) -> Optional[List[Hashable]]:
+        """ Sort nodes with Kahn's algorithm. Nodes are sorted in generations - the nodes whose predecessors have all
+        been sorted, in the order they were added - which is the order that networkx sorted them in
+
+        :return: Sorted nodes, or None if graph has a cycle
+        """
+        in_degree = [len(predecessors) for predecessors in self.predecessors]
+        generation = [node_id for node_id, degree in enumerate(in_degree) if degree == 0]
+        out = []
+        while len(generation) > 0:
+            out.extend(generation)
+            next_generation = []
+            for node_id in generation:
+                for successor in self.successors[node_id]:
+                    in_degree[successor] -= 1
+                    if in_degree[successor] == 0:
+                        next_generation.append(successor)
+            generation = next_generation
+        if len(out) < len(self.nodes):
+            return None
+        return [self.nodes[node_id] for node_id in out]
+
+
 class DependencyGraph:
     """ Class takes list of tasks and creates dependency DAG of data
         Topological sort outputs order in which tasks can be completed
@@ -70,19 +120,46 @@ class DependencyGraph:
         :param task_blueprints: Mapping of task name to type. If not provided, generated using `__name__(self)`
         :raises: DependencyGraphGenerationError
         """
-        self._graph = nx.DiGraph()
+        self._graph = _DiGraph()
         self._graph.add_node(DependencyGraph.ROOT_NODE)
         if task_blueprints is not None:
             self.idx: Dict[str, Type[Task]] = task_blueprints
         else:
             self.idx = {task.__name__: task for task in tasks}
+        # (Task, dependency) names in the dependency subtree of each Task, which is expanded once per graph
+        self._dependency_edges: Dict[str, List[Tuple[str, str]]] = {}
+        self._expanding: Set[str] = set()
         self._build_dependency_graph(tasks)
         self._sorted_graph: Optional[List[List[Node]]] = None
-        if not nx.is_directed_acyclic_graph(self._graph):
-            print("Cycle found!")
-            raise DependencyGraph.ERR
+        self._reachability: Optional[_Reachability] = None
         self.sort_graph()
 
+    @staticmethod
+    def from_requirements(requirements: Dict[str, List[str]],
+                          sorted_identifiers: List[List[Tuple[str, str]]]) -> "DependencyGraph":
+        """ Create graph that was built before from its Tasks' requirements and sorted (scope, name) identifiers,
+        without loading any Task
+
+        :param requirements: Names of Tasks listed in each top-level Task's requires() method
+        :param sorted_identifiers: Sorted lists of (scope, name), as given by `sorted_graph_identifiers`
+        :return: Graph, which may be queried but whose Tasks are not loaded
+        """
+        dependency_graph = DependencyGraph.__new__(DependencyGraph)
+        dependency_graph.idx = {}
+        dependency_graph._dependency_edges = {}
+        dependency_graph._expanding = set()
+        dependency_graph._graph = _DiGraph()
+        dependency_graph._graph.add_node(DependencyGraph.ROOT_NODE)
+        for task_name, task_requirements in requirements.items():
+            task_node = Node(DependencyGraph.ROOT, task_name)
+            dependency_graph._graph.add_edge(DependencyGraph.ROOT_NODE, task_node)
+            for requirement in task_requirements:
+                dependency_graph._graph.add_edge(Node(DependencyGraph.ROOT, requirement), task_node)
+        dependency_graph._sorted_graph = [[Node(*identifier) for identifier in task_list]
+                                          for task_list in sorted_identifiers]
+        dependency_graph._reachability = None
+        return dependency_graph
+
     def _build_dependency_graph(self, tasks: Iterable[Type[Task]]):
         """Create dependency graph from list of Task class objects"""
         for task in tasks:
@@ -90,12 +167,13 @@ class DependencyGraph:
             self._graph.add_edge(DependencyGraph.ROOT_NODE, task_node)
             # Link requirements for already completed tasks in pipeline
             # Gather dependencies needed for fulfilling given requirement
-            if task.requires() is None:
+            requirements = task.requires()
+            if requirements is None:
                 continue
-            if not isinstance(task.requires(), list):
+            if not isinstance(requirements, list):
                 print("requires() must return a list")
                 raise DependencyGraph.ERR
-            for requirement in task.requires():
+            for requirement in requirements:
                 if not isinstance(requirement, (str, type)):
                     print("Requirements must be strings or class objects")
                     raise DependencyGraph.ERR
@@ -107,17 +185,19 @@ class DependencyGraph:
                     raise DependencyGraph.ERR
                 self._graph.add_edge(Node(DependencyGraph.ROOT, requirement), task_node)
 
-    def _add_dependencies(self, task_node: Node, scope: str, graph: nx.Graph):
-        """Add in dependencies that are listed for a given Task"""
+    def _dependency_names(self, task_name: str) -> List[str]:
+        """Validate dependencies that are listed for a given Task, and return their names"""
         # Link dependency names
-        task = self.idx[task_node.name]
+        task = self.idx[task_name]
         dependency: DependencyInput
-        if task.depends() is None:
-            return
-        if not isinstance(task.depends(), list):
+        dependencies = task.depends()
+        if dependencies is None:
+            return []
+        if not isinstance(dependencies, list):
             print("depends() must return a list")
             raise DependencyGraph.ERR
-        for dependency in task.depends():
+        names = []
+        for dependency in dependencies:
             if not isinstance(dependency, DependencyInput) or not isinstance(dependency.name, (str, type)):
                 print("Dependency names must be strings or class objects")
                 raise DependencyGraph.ERR
@@ -137,39 +217,95 @@ class DependencyGraph:
                 if issubclass(task, AggregateTask):
                     print(f"Task <{task.__name__}> is of type Task and cannot use AggregateTask dependencies")
                     raise DependencyGraph.ERR
-            dependency_node: Node = Node(scope, dependency.name)
-            graph.add_edge(task_node, dependency_node)
-            self._add_dependencies(dependency_node, scope, graph)
+            names.append(dependency.name)
+        return names
+
+    def _expand_dependencies(self, task_name: str) -> List[Tuple[str, str]]:
+        """ (Task, dependency) names in a Task's dependency subtree, in the order they are found by a depth-first
+        search. Subtrees are memoised, so a dependency that is shared by many Tasks is only expanded once
+
+        :param task_name: Name of Task
+        :return: Edges of dependency subtree, without repeats
+        """
+        edges = self._dependency_edges.get(task_name)
+        if edges is not None:
+            return edges
+        if task_name in self._expanding:
+            print("Cycle found!")
+            raise DependencyGraph.ERR
+        self._expanding.add(task_name)
+        edges = []
+        for dependency_name in self._dependency_names(task_name):
+            edges.append((task_name, dependency_name))
+            edges.extend(self._expand_dependencies(dependency_name))
+        self._expanding.remove(task_name)
+        # Subtrees that are shared by several dependencies are listed once
+        edges = list(dict.fromkeys(edges))
+        self._dependency_edges[task_name] = edges
+        return edges
 
     def sort_graph(self):
         """Sort top-level Task requirements, and insert Task-level dependencies"""
-        sorted_graph = list(nx.topological_sort(self._graph))
+        sorted_graph = self._graph.topological_sort()
+        if sorted_graph is None:
+            print("Cycle found!")
+            raise DependencyGraph.ERR
         sorted_graph.remove(DependencyGraph.ROOT_NODE)
         out_steps = []
         for node in sorted_graph:
-            graph = nx.DiGraph()
-            self._add_dependencies(node, node.name, graph)
-            step_list = list(reversed(list(nx.topological_sort(graph))))
-            if len(step_list) > 0:
-                out_steps.append(step_list)
-            else:
+            edges = self._expand_dependencies(node.name)
+            if len(edges) == 0:
                 out_steps.append([node])
+                continue
+            graph = _DiGraph()
+            for task_name, dependency_name in edges:
+                graph.add_edge(task_name, dependency_name)
+            # Dependencies are scoped to the top-level Task
+            out_steps.append([node if name == node.name else Node(node.name, name)
+                              for name in reversed(graph.topological_sort())])
         self._sorted_graph = out_steps
+        self._reachability = None
 
     @property
     def sorted_graph_identifiers(self) -> List[List[Node]]:
         """Sorted graph"""
         return self._sorted_graph
 
+    def requirements(self, task_name: str) -> List[str]:
+        """Names of top-level Tasks/AggregateTasks that are directly listed in a Task's requires() method"""
+        node_id = self._graph.ids.get(Node(DependencyGraph.ROOT, task_name))
+        if node_id is None:
+            return []
+        return [self._graph.nodes[predecessor].name for predecessor in self._graph.predecessors[node_id]
+                if self._graph.nodes[predecessor] != DependencyGraph.ROOT_NODE]
+
+    def describe(self) -> Tuple[Dict[str, List[str]], List[List[Tuple[str, str]]]]:
+        """Requirements and sorted identifiers from which `from_requirements` recreates this graph"""
+        return {task_list[-1].name: self.requirements(task_list[-1].name) for task_list in self._sorted_graph}, \
+            [[node.get() for node in task_list] for task_list in self._sorted_graph]
+
+    @property
+    def reachability(self) -> "_Reachability":
+        """Index of the top-level Tasks that are downstream of each top-level Task. Built once per graph"""
+        if self._reachability is None:
+            self._reachability = _Reachability([task_list[-1].name for task_list in self._sorted_graph],
+                                               self.requirements)
+        return self._reachability
+
+    def downstream(self, task_name: str) -> FrozenSet[str]:
+        """Names of top-level Tasks that directly or indirectly require a given Task"""
+        return self.reachability.downstream(task_name)
+
     def _find_task_idx(self, task_name: str, dependency_name: Optional[str] = None) -> Tuple[int, int]:
         """Locate index of a Task within its task list"""
-        for i, task_list in enumerate(self.sorted_graph_identifiers):
-            if task_list[-1].name == task_name:
-                if dependency_name is None:
-                    return i, -1
-                for j, task in enumerate(task_list[:-1]):
-                    if task.name == dependency_name:
-                        return i, j
+        i = self.reachability.position.get(task_name)
+        if i is None:
+            return -1, -1
+        if dependency_name is None:
+            return i, -1
+        for j, task in enumerate(self.sorted_graph_identifiers[i][:-1]):
+            if task.name == dependency_name:
+                return i, j
         return -1, -1
 
     def _get_tasks_name_strings(self, task_idx: Tuple[int, int]) -> List[str]:
@@ -179,27 +315,61 @@ class DependencyGraph:
             task_names.append(task_names[-1] + "." + self.sorted_graph_identifiers[task_idx[0]][task_idx[1]].name)
         return task_names
 
-    def _connecting_paths(self, task1: Node, task2: Node):
-        """Identify paths that connect nodes by calling the networkx method"""
-        try:
-            return next(nx.all_simple_paths(self._graph, task1, task2))
-        except StopIteration:
-            return []
-
     def get_affected_nodes(self, task_name: str, dependency_name: Optional[str] = None) -> Set[str]:
         """Find nodes that are affected by deleting a given Task - e.g., list all nodes that depend on a given node"""
-        out_nodes = set()
-        self._get_nodes_helper(out_nodes, task_name, dependency_name)
-        return out_nodes
-
-    def _get_nodes_helper(self, out_nodes: Set[str], task_name: str, dependency_name: Optional[str] = None):
-        """Recursive search through nodes list to identify nodes that would be effected by deleting a Task's data"""
         task_pos = self._find_task_idx(task_name, dependency_name)
         if task_pos == (-1, -1):
-            return
-        for _task_name in self._get_tasks_name_strings(task_pos):
-            out_nodes.add(_task_name)
-        for task_list in self.sorted_graph_identifiers[task_pos[0] + 1:]:
-            connections = self._connecting_paths(self.sorted_graph_identifiers[task_pos[0]][-1], task_list[-1])
-            if len(connections) > 0:
-                self._get_nodes_helper(out_nodes, task_list[-1].name)
+            return set()
+        return set(self._get_tasks_name_strings(task_pos)) | self.downstream(task_name)
+
+
+class _Reachability:
+    """ Transitive closure of the requirements between top-level Tasks. Tasks are numbered in topological order, and
+    the Tasks that are downstream of each Task (including itself) are stored as the set bits of an integer. Sets of
+    downstream names are created when first requested
+    """
+    def __init__(self, sorted_names: List[str], requirements: Callable[[str], List[str]]):
+        """ Build index
+
+        :param sorted_names: Names of top-level Tasks in topological order
+        :param requirements: Names of the Tasks that a Task directly requires
+        """
+        self.names = sorted_names
+        self.position: Dict[str, int] = {name: i for i, name in enumerate(sorted_names)}
+        dependents: List[List[int]] = [[] for _ in sorted_names]
+        for i, name in enumerate(sorted_names):
+            for requirement in requirements(name):
+                dependents[self.position[requirement]].append(i)
+        # Each Task's dependents come after it in topological order, so are complete when it is reached
+        self.descendants: List[int] = [0] * len(sorted_names)
+        for i in reversed(range(len(sorted_names))):
+            bits = 1 << i
+            for dependent in dependents[i]:
+                bits |= self.descendants[dependent]
+            self.descendants[i] = bits
+        self._downstream: Dict[str, FrozenSet[str]] = {}
+
+    def is_downstream(self, task_name: str, other_name: str) -> bool:
+        """Task directly or indirectly requires other Task"""
+        if task_name not in self.position or other_name not in self.position or task_name == other_name:
+            return False
+        return bool(self.descendants[self.position[other_name]] >> self.position[task_name] & 1)
+
+    def downstream(self, task_name: str) -> FrozenSet[str]:
+        """Names of Tasks that directly or indirectly require a given Task"""
+        out = self._downstream.get(task_name)
+        if out is not None:
+            return out
+        i = self.position.get(task_name)
+        if i is None:
+            return frozenset()
+        names = []
+        # Clear bit of the Task itself
+        bits = self.descendants[i] & ~(1 << i)
+        while bits:
+            low_bit = bits & -bits
+            names.append(self.names[low_bit.bit_length() - 1])
+            bits ^= low_bit
+        out = frozenset(names)
+        self._downstream[task_name] = out
+        return out
@@ -1,37 +1,54 @@
 """Manage execution of Task pipeline across input set"""
 
+import itertools
 import logging
 import os
 import pickle
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import as_completed, ProcessPoolExecutor
+from multiprocessing import get_context
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Union
 
-from art import tprint
 # pylint: disable=no-member
 from plumbum import colors
 
 from yapim import AggregateTask
 from yapim.tasks.task_chain_distributor import TaskChainDistributor
+from yapim.tasks.utils.output_finalizer import OutputFinalizer
+from yapim.tasks.utils.resource_sizer import ResourceSizer
+from yapim.tasks.utils.task_cache import TaskCache
+from yapim.tasks.utils.version_info import VersionProbes
+from yapim.utils.chain_dispatcher import ChainDispatcher
 from yapim.utils.config_manager import ConfigManager
+from yapim.utils.dag_scheduler import DAGScheduler
 from yapim.utils.dependency_graph import Node, DependencyGraph
 from yapim.utils.input_loader import InputLoader
 from yapim.utils.package_management.package_loader import PackageLoader
 from yapim.utils.path_manager import PathManager
+from yapim.utils.priority_policy import PriorityPolicy
+from yapim.utils.results_store import ResultsStore
 
 
 class Executor:
     """YAPIM executor generates a topologically-sorted list of Tasks to complete. AggregateTasks break TaskLists -
     execution of Task list ends at an AggregateTask and waits for complete input to reach this point before
-    proceeding"""
+    proceeding. Within a Task list, a record's Tasks that do not require each other run concurrently.
+
+    Setting `Scheduler: dag` in the GLOBAL config section instead runs each (record, Task) unit as soon as the units it
+    requires have completed, so that only Tasks that require an AggregateTask wait on it.
+
+    Task chains are started as the resource broker grants them threads and memory, so the number of chains in flight is
+    limited only by MaxThreads and MaxMemory. Records are started in the order of the PriorityPolicy set in the GLOBAL
+    config section."""
     def __init__(self,
                  input_data: InputLoader,
                  config_path: Union[Path, str],
                  base_output_dir: Union[Path, str],
                  pipeline_steps_directory: Union[Path, str],
                  dependencies_directories: Optional[List[Union[Path, str]]] = None,
-                 display_status_messages: bool = True
+                 display_status_messages: bool = True,
+                 task_index: Optional[dict] = None
                  ):
         """ Generate executor
 
@@ -43,20 +60,26 @@ class Executor:
         :param dependencies_directories: Directory (possibly nested) of dependencies in pipeline. Names may overwrite
          existing pipeline steps
         :param display_status_messages: Display status messages as pipeline runs
+        :param task_index: Index of pipeline package, which lets Tasks be imported as they are used rather than by
+         searching each directory
         """
         pipeline_tasks, self.task_blueprints = PackageLoader.load_from_directories(pipeline_steps_directory,
-                                                                                   dependencies_directories)
-        self.task_list: List[List[Node]] = DependencyGraph(pipeline_tasks, self.task_blueprints) \
-            .sorted_graph_identifiers
+                                                                                   dependencies_directories,
+                                                                                   task_index)
+        # Directories are loaded again in each process of a process backend
+        self.task_directories = (Path(pipeline_steps_directory).resolve(),
+                                 [Path(directory).resolve() for directory in (dependencies_directories or [])])
+        self.dependency_graph = DependencyGraph(pipeline_tasks, self.task_blueprints)
+        self.task_list: List[List[Node]] = self.dependency_graph.sorted_graph_identifiers
 
         self.pipeline_name = os.path.basename(pipeline_steps_directory)
         self.path_manager = PathManager(base_output_dir)
         self.results_base_dir = base_output_dir.joinpath(PathManager.RESULTS).joinpath(self.pipeline_name)
         if not self.results_base_dir.exists():
             os.makedirs(self.results_base_dir)
-        print(colors.yellow & colors.bold | "Gathering files...")
-        print(colors.yellow & colors.bold | "------------------")
-        self.input_data_dict = Executor._load_input_data(input_data)
+        self.input_loader = input_data
+        # Input of each record, filled as records are streamed from the input loader
+        self.input_data_dict: Dict[str, Dict] = {}
         self.config_manager = None
         self.display_messages = display_status_messages
         try:
@@ -65,32 +88,60 @@ class Executor:
         except BaseException as err:
             print(err)
             sys.exit(1)
+        # Program version output is kept between runs
+        VersionProbes.load(base_output_dir.joinpath(".version-probes.json"))
         TaskChainDistributor.initialize_class()
         TaskChainDistributor.set_allocations(self.config_manager)
-        TaskChainDistributor.results.update(self.input_data_dict)
-        TaskChainDistributor.output_data_to_pickle.update({key: {} for key in TaskChainDistributor.results.keys()})
-        existing_data = InputLoader.populate_requested_existing_input(
+        TaskChainDistributor.results_store = ResultsStore(self.results_base_dir.joinpath(f"{self.pipeline_name}.db"))
+        # Output of records that are not in this run's input is not passed to downstream pipelines
+        TaskChainDistributor.results_store.start_run()
+        TaskChainDistributor.task_cache = None
+        if self.config_manager.task_cache_directory is not None:
+            TaskChainDistributor.task_cache = TaskCache(self.config_manager.task_cache_directory)
+        TaskChainDistributor.resource_sizer = None
+        if self.config_manager.resource_sizing == ConfigManager.AUTO_SIZING:
+            TaskChainDistributor.resource_sizer = ResourceSizer(TaskChainDistributor.results_store.usage_history())
+        self.priority_policy = PriorityPolicy(self.config_manager.priority_policy, self.dependency_graph,
+                                              TaskChainDistributor.results_store.runtimes())
+        self.existing_data = InputLoader.populate_requested_existing_input(
             self.config_manager.config[ConfigManager.INPUT], self.results_base_dir)
-        for key, value in existing_data.items():
-            if key not in self.input_data_dict.keys():
-                self.input_data_dict[key] = {}
-            if key not in TaskChainDistributor.results.keys():
-                TaskChainDistributor.results[key] = {}
-            self.input_data_dict[key].update(value)
-            TaskChainDistributor.results[key].update(value)
         self.begin_logging(base_output_dir)
 
+    def _stream_input_data(self) -> Iterator[str]:
+        """ Call InputLoader stream method, and add each record to the pipeline results as it is yielded. Existing
+        pipeline data is merged into the records it references, and records found only in existing data are yielded
+        once the input loader is exhausted
+
+        :return: Iterator over ids of records that have been added
+        """
+        for record_id, data in self.input_loader.stream():
+            Executor._validate_record_id(record_id)
+            self._add_record(record_id, data)
+            if record_id not in self.task_blueprints.keys():
+                yield record_id
+        for record_id in self.existing_data.keys():
+            if record_id not in self.input_data_dict.keys():
+                self._add_record(record_id, {})
+                # Ids that name a Task hold AggregateTask output rather than a record
+                if record_id not in self.task_blueprints.keys():
+                    yield record_id
+
+    def _add_record(self, record_id: str, data: Dict):
+        """Add record input, and any existing pipeline data for the record, to pipeline results"""
+        data = {**data, **self.existing_data.get(record_id, {})}
+        with TaskChainDistributor.update_lock:
+            self.input_data_dict[record_id] = data
+            TaskChainDistributor.results[record_id] = data
+        TaskChainDistributor.results_store.add_records([record_id])
+
     @staticmethod
-    def _load_input_data(input_data: InputLoader):
-        """Call InputLoader load method"""
-        input_data_dict: dict = input_data.load()
-        for key in input_data_dict.keys():
-            key = str(key)
-            if " " in key:
-                raise AttributeError("Valid input key types must not contain spaces in their names")
-            if "object at" in key:
-                raise AttributeError("Valid input key types must implement .__str__(self) that returns unique ids")
-        return input_data_dict
+    def _validate_record_id(record_id):
+        """Raise if record id cannot be used in file names"""
+        record_id = str(record_id)
+        if " " in record_id:
+            raise AttributeError("Valid input key types must not contain spaces in their names")
+        if "object at" in record_id:
+            raise AttributeError("Valid input key types must implement .__str__(self) that returns unique ids")
 
     def begin_logging(self, base_output_dir: Path):
         """Log pipeline top-level messages"""
@@ -105,25 +156,99 @@ class Executor:
 
     def run(self):
         """Launch executor!"""
-        if len(self.input_data_dict) == 0:
+        print(colors.yellow & colors.bold | "Gathering files...")
+        print(colors.yellow & colors.bold | "------------------")
+        record_ids = self._stream_input_data()
+        # Tasks are started as records are streamed, so only the first record is waited on before starting
+        first_record_id = next(record_ids, None)
+        if first_record_id is None:
             print(colors.red & colors.bold | "No input was provided, exiting")
             sys.exit()
+        record_ids = itertools.chain((first_record_id,), record_ids)
+        # Banner fonts are only loaded when a pipeline runs
+        # pylint: disable=import-outside-toplevel
+        from art import tprint
         tprint(self.pipeline_name, font="smslant")
+        TaskChainDistributor.process_pool = self._create_process_pool()
+        TaskChainDistributor.output_finalizer = OutputFinalizer(self.config_manager.finalize_strategy,
+                                                                self.config_manager.finalize_workers)
+        try:
+            if self.config_manager.scheduler == ConfigManager.DAG_SCHEDULER:
+                self._run_dag(record_ids)
+            else:
+                self._run_batches(record_ids)
+        finally:
+            if TaskChainDistributor.process_pool is not None:
+                TaskChainDistributor.process_pool.shutdown()
+                TaskChainDistributor.process_pool = None
+            output_finalizer, TaskChainDistributor.output_finalizer = TaskChainDistributor.output_finalizer, None
+            output_finalizer.close()
+        # .pkl file is kept for pipelines that read output of this pipeline with an earlier version of YAPIM
+        with open(self.results_base_dir.joinpath(f"{self.pipeline_name}.pkl"), "wb") as out_ptr:
+            pickle.dump(TaskChainDistributor.results_store.load(), out_ptr)
+        TaskChainDistributor.results_store.close()
+        Executor._log_resource_waits()
+        print(colors.yellow & colors.bold | "\n%s complete!\n" % self.pipeline_name)
+
+    def _create_process_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Create process pool if any Task in the pipeline requests the process backend. Processes are spawned rather
+        than forked, as the pipeline process runs Tasks on many threads"""
+        if not any(self.config_manager.settings(task.get()).backend == ConfigManager.PROCESS_BACKEND
+                   for task_list in self.task_list for task in task_list):
+            return None
+        return ProcessPoolExecutor(min(TaskChainDistributor.maximum_threads, os.cpu_count() or 1),
+                                   mp_context=get_context("spawn"),
+                                   initializer=PackageLoader.load_from_directories,
+                                   initargs=self.task_directories)
+
+    @staticmethod
+    def _log_resource_waits():
+        """Log time that each Task spent waiting for threads/memory"""
+        for task_name, wait_metrics in sorted(TaskChainDistributor.resource_broker.metrics().items()):
+            logging.info("Resource wait:  task:%s  count:%d  mean:%.3fs  max:%.3fs", task_name, wait_metrics.count,
+                         wait_metrics.mean, wait_metrics.maximum)
+
+    def _run_dag(self, record_ids: Iterator[str]):
+        """Run each (record, Task) unit as soon as the units it requires complete"""
+        DAGScheduler(self.dependency_graph, self.task_blueprints, self.config_manager, self.path_manager,
+                     self.results_base_dir, self.display_messages, self.priority_policy) \
+            .run(record_ids)
+
+    def _run_batches(self, record_ids: Iterator[str]):
+        """ Run Task lists in batches that are split at each AggregateTask. Records in the first batch are started as
+        they are streamed, and later batches start once every record has been streamed. Unless the PriorityPolicy is
+        fifo, records in each batch are started in order of priority, so the first batch also waits for every record to
+        be streamed
+
+        :param record_ids: Stream of record ids
+        """
+        streamed_ids: Optional[Iterator[str]] = record_ids
         for task_batch in self._task_batch():
-            workers = self._get_max_resources_in_batch(task_batch[1])
-            with ThreadPoolExecutor(workers) as executor:
+            with ChainDispatcher() as dispatcher:
                 futures = []
                 if len(task_batch[1]) == 0:
                     continue
                 if task_batch[0] == "Task":
-                    for record_id, input_data in TaskChainDistributor.results.items():
-                        if record_id in self.task_blueprints.keys():
-                            continue
+                    if streamed_ids is None:
+                        with TaskChainDistributor.update_lock:
+                            batch_ids = [record_id for record_id in TaskChainDistributor.results.keys()
+                                         if record_id not in self.task_blueprints.keys()]
+                    else:
+                        batch_ids, streamed_ids = streamed_ids, None
+                    if self.priority_policy.policy != PriorityPolicy.FIFO:
+                        batch_ids = self._prioritize(batch_ids, task_batch[1])
+                    for record_id in batch_ids:
                         task_chain = TaskChainDistributor(record_id, task_batch[1], self.task_blueprints,
-                                                          self.config_manager, self.path_manager, input_data,
+                                                          self.config_manager, self.path_manager,
+                                                          TaskChainDistributor.results[record_id],
                                                           self.results_base_dir, self.display_messages)
-                        futures.append(executor.submit(task_chain.run))
+                        futures.append(dispatcher.submit(task_chain))
                 else:
+                    if streamed_ids is not None:
+                        # AggregateTasks operate on the complete input set
+                        for _ in streamed_ids:
+                            pass
+                        streamed_ids = None
                     if len(TaskChainDistributor.results.keys()) == 0:
                         continue
                     first_item = list(TaskChainDistributor.results.keys())[0]
@@ -131,14 +256,27 @@ class Executor:
                                                       self.config_manager, self.path_manager,
                                                       TaskChainDistributor.results,
                                                       self.results_base_dir, self.display_messages)
-                    futures.append(executor.submit(task_chain.run))
+                    futures.append(dispatcher.submit(task_chain))
                 for future in as_completed(futures):
                     exception = future.exception()
                     if exception is not None:
                         raise exception
-        with open(self.results_base_dir.joinpath(f"{self.pipeline_name}.pkl"), "wb") as out_ptr:
-            pickle.dump(TaskChainDistributor.output_data_to_pickle, out_ptr)
-        print(colors.yellow & colors.bold | "\n%s complete!\n" % self.pipeline_name)
+
+    def _prioritize(self, record_ids: Iterable[str], task_lists: List[List[Node]]) -> List[str]:
+        """ Order records by the priority of running a batch of Task lists on them
+
+        :param record_ids: Ids of records in batch
+        :param task_lists: Task lists in batch
+        :return: Record ids, highest priority first
+        """
+        task_names = [task_list[-1].name for task_list in task_lists]
+        priorities = {}
+        for record_id in record_ids:
+            with TaskChainDistributor.update_lock:
+                record_data = TaskChainDistributor.results[record_id]
+            self.priority_policy.add_record(record_id, record_data)
+            priorities[record_id] = self.priority_policy.priority(record_id, task_names)
+        return sorted(priorities.keys(), key=lambda record_id: -priorities[record_id])
 
     def _task_batch(self):
         """Batch tasks based on AggregateTasks in pipeline"""
@@ -155,27 +293,3 @@ class Executor:
             yield "Agg", [self.task_list[pos]]
             start = pos + 1
         yield "Task", self.task_list[start:]
-
-    def _get_max_resources_in_batch(self, task_batch: List[List[Node]]) -> int:
-        """Determine resource allotments based on threads and memory and return limiting resource"""
-        min_threads: int = 500
-        min_memory: int = 50000
-        for task_list in task_batch:
-            for task in task_list:
-                threads = self.config_manager.find(task.get(), ConfigManager.THREADS)
-                if threads is None:
-                    threads = min_threads
-                min_threads = min(min_threads, threads)
-                memory = self.config_manager.find(task.get(), ConfigManager.MEMORY)
-                if memory is None:
-                    memory = min_memory
-                min_memory = min(min_memory, memory)
-        min_threads = self.config_manager.config[ConfigManager.GLOBAL][ConfigManager.MAX_THREADS] // min_threads or 1
-        min_memory = self.config_manager.config[ConfigManager.GLOBAL][ConfigManager.MAX_MEMORY] // min_memory or 1
-        if min_memory < min_threads:
-            resources = min_memory
-        else:
-            resources = min_threads
-        if resources > 64:
-            return 64
-        return resources
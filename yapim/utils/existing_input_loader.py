@@ -1,16 +1,66 @@
 """Collect input data from existing YAPIM pipelines"""
 import os
 import pickle
-from collections import defaultdict
 from pathlib import Path
-from typing import Dict, TypeVar
+from typing import Dict, TypeVar, Optional
 
 from yapim.utils.config_manager import ImproperInputSection, ConfigManager
+from yapim.utils.results_store import ResultsStore
 
 PipelineInput = TypeVar("PipelineInput", str, dict, list)
 KeyType = TypeVar("KeyType", dict, str)
 
 
+class UpstreamResults:
+    """ Output of an earlier pipeline, indexed by output key. Output is read from the pipeline's results store, where
+    only the requested keys are loaded, or from the .pkl file of a pipeline that was run with an earlier version of
+    YAPIM
+    """
+    def __init__(self, pipeline_dir: Path, pipeline_id: str):
+        """
+        :param pipeline_dir: Results directory of pipeline
+        :param pipeline_id: Name of pipeline
+        :raises: FileNotFoundError if pipeline has no stored output
+        """
+        self._store: Optional[ResultsStore] = None
+        self._pkl_data: Optional[Dict[str, Dict]] = None
+        self._by_key: Dict[str, Dict[str, object]] = {}
+        store_file = pipeline_dir.joinpath(pipeline_id + ".db")
+        if store_file.exists():
+            self._store = ResultsStore(store_file)
+        else:
+            with open(pipeline_dir.joinpath(pipeline_id + ".pkl"), "rb") as file_ptr:
+                self._pkl_data = pickle.load(file_ptr)
+            # Index all keys in one pass over the .pkl data
+            for record_id, record_data in self._pkl_data.items():
+                for key, value in record_data.items():
+                    self._by_key.setdefault(key, {})[record_id] = value
+
+    def values(self, key: str) -> Dict[str, object]:
+        """ Value of an output key for each record that has it
+
+        :param key: Output key
+        :return: Mapping of {record_id: value}
+        """
+        if key not in self._by_key and self._store is not None:
+            self._by_key[key] = self._store.load_key(key)
+        return self._by_key.get(key, {})
+
+    def records(self) -> Dict[str, Dict]:
+        """ All output of each record
+
+        :return: Mappings of {record_id: {key: value}}
+        """
+        if self._store is not None:
+            return self._store.load()
+        return self._pkl_data
+
+    def close(self):
+        """Close results store"""
+        if self._store is not None:
+            self._store.close()
+
+
 class ExistingInputLoader(dict):
     """Parses config-level INPUT section for acceptable data matching requested keys/key-mappings"""
     # Default error message for improper input parsing
@@ -49,50 +99,31 @@ INPUT:
         self._input_section = input_section
         self._results_base_dir = results_base_dir
 
-    @staticmethod
-    def _load_pkl_data(pkl_file: Path) -> Dict[str, Dict]:
-        with open(pkl_file, "rb") as file_ptr:
-            return pickle.load(file_ptr)
-
-    def _parse_dict(self, requested_input: Dict[str, str], pkl_data: Dict[str, Dict], requested_pipeline_id: str):
-        pkl_input_data = defaultdict(dict)
+    def _parse_dict(self, requested_input: Dict[str, str], upstream: UpstreamResults, requested_pipeline_id: str):
         for _to, _from in requested_input.items():
-            # Check if pipeline pkl data records are needed in this pipeline
-            required = False
-            for record_id, pkl_record_data in pkl_data.items():
-                if _from in pkl_record_data.keys():
-                    pkl_input_data[record_id][_to] = pkl_record_data[_from]
-                    required = True
-            if not required:
+            # Check if pipeline records are needed in this pipeline
+            values = upstream.values(_from)
+            if len(values) == 0:
                 raise ImproperInputSection(f"INPUT `{requested_pipeline_id}.{_from}` does not have data")
-        for key, val in pkl_input_data.items():
-            if key not in self.keys():
-                self[key] = {}
-            self[key].update(val)
-
-    def _parse_str(self, requested_input: str, pkl_data: Dict[str, Dict], requested_pipeline_id: str):
-        pkl_input_data = defaultdict(dict)
-        required = False
-        for record_id, pkl_record_data in pkl_data.items():
-            if requested_input == "all":
-                pkl_input_data[record_id].update(pkl_record_data)
-                required = True
-            elif requested_input in pkl_record_data.keys():
-                pkl_input_data[record_id][requested_input] = pkl_record_data[requested_input]
-                required = True
-        if not required:
-            raise ImproperInputSection(f"INPUT `{requested_pipeline_id}.{requested_input}` does not have data")
-        for key, val in pkl_input_data.items():
-            if key not in self.keys():
-                self[key] = {}
-            self[key].update(val)
-
-    def _parse_list(self, requested_input: [KeyType], pkl_data: Dict[str, Dict], requested_pipeline_id: str):
+            for record_id, value in values.items():
+                self.setdefault(record_id, {})[_to] = value
+
+    def _parse_str(self, requested_input: str, upstream: UpstreamResults, requested_pipeline_id: str):
+        if requested_input == "all":
+            records = upstream.records()
+            if len(records) == 0:
+                raise ImproperInputSection(f"INPUT `{requested_pipeline_id}.{requested_input}` does not have data")
+            for record_id, record_data in records.items():
+                self.setdefault(record_id, {}).update(record_data)
+            return
+        self._parse_dict({requested_input: requested_input}, upstream, requested_pipeline_id)
+
+    def _parse_list(self, requested_input: [KeyType], upstream: UpstreamResults, requested_pipeline_id: str):
         for req_input in requested_input:
             if isinstance(req_input, str):
-                self._parse_str(req_input, pkl_data, requested_pipeline_id)
+                self._parse_str(req_input, upstream, requested_pipeline_id)
             elif isinstance(req_input, dict):
-                self._parse_dict(req_input, pkl_data, requested_pipeline_id)
+                self._parse_dict(req_input, upstream, requested_pipeline_id)
             else:
                 raise ExistingInputLoader._err
 
@@ -108,23 +139,25 @@ INPUT:
             # Root definition should not be required to be input, but is kept for legacy reasons
             if requested_pipeline_id == ConfigManager.ROOT:
                 continue
-            # Enclosed .pkl file and data
+            # Enclosed results store or .pkl file and data
             try:
-                pkl_data = ExistingInputLoader._load_pkl_data(
-                    Path(os.path.dirname(self._results_base_dir)).joinpath(requested_pipeline_id).joinpath(
-                        requested_pipeline_id + ".pkl"))
+                upstream_dir = Path(os.path.dirname(self._results_base_dir)).joinpath(requested_pipeline_id)
+                upstream = UpstreamResults(upstream_dir, requested_pipeline_id)
             except FileNotFoundError as f_err:
                 raise ImproperInputSection(f"Requested pipeline {requested_pipeline_id} is not present "
                                            f"or is improperly formatted") from f_err
-            # Definition is {"to": "from"} mappings
-            if isinstance(requested_pipeline_input, dict):
-                self._parse_dict(requested_pipeline_input, pkl_data, requested_pipeline_id)
-            # Definition is a single key to collect
-            elif isinstance(requested_pipeline_input, str):
-                self._parse_str(requested_pipeline_input, pkl_data, requested_pipeline_id)
-            # Definition is a list of keys or {"to": "from"} mappings to collect
-            elif isinstance(requested_pipeline_input, list):
-                self._parse_list(requested_pipeline_input, pkl_data, requested_pipeline_id)
-            else:
-                raise ExistingInputLoader._err
+            try:
+                # Definition is {"to": "from"} mappings
+                if isinstance(requested_pipeline_input, dict):
+                    self._parse_dict(requested_pipeline_input, upstream, requested_pipeline_id)
+                # Definition is a single key to collect
+                elif isinstance(requested_pipeline_input, str):
+                    self._parse_str(requested_pipeline_input, upstream, requested_pipeline_id)
+                # Definition is a list of keys or {"to": "from"} mappings to collect
+                elif isinstance(requested_pipeline_input, list):
+                    self._parse_list(requested_pipeline_input, upstream, requested_pipeline_id)
+                else:
+                    raise ExistingInputLoader._err
+            finally:
+                upstream.close()
         return dict(self)
@@ -1,21 +1,26 @@
 """Helper class for populating input from a directory to match provided extension types"""
 
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, ProcessPoolExecutor
+from multiprocessing import get_context
 from pathlib import Path
-from typing import Dict, Tuple, Optional, Callable
-
-from Bio import SeqIO
+from typing import Dict, Tuple, Optional, Callable, Iterator, List
 
+from yapim.utils import input_staging
 from yapim.utils.input_loader import InputLoader
 from yapim.utils.path_manager import PathManager
 
 
 class ExtensionLoader(InputLoader):
     """Extends InputLoader to populate input from contents of a directory. Uses provided extension mapping to create
-    input data"""
+    input data. Files may be gzip (or bgzip) compressed, in which case they are decompressed when staged"""
+    # Pool that stages files while input is loaded
+    staging_pool: Optional[ProcessPoolExecutor] = None
+    # Link input files that need no changes into the storage directory while input is loaded
+    link_unchanged: bool = False
+
     def __init__(self, directory: Optional[Path], write_dir: Path,
-                 extension_mapping: Optional[Dict[Tuple, Tuple[str, Callable]]] = None):
+                 extension_mapping: Optional[Dict[Tuple, Tuple[str, Callable]]] = None, link_input: bool = False):
         """ Create ExtensionLoader
 
         Examples of mapping:
@@ -31,6 +36,9 @@ class ExtensionLoader(InputLoader):
         :param directory: Path to directory with input data
         :param write_dir: Directory to write output
         :param extension_mapping: Mapping, or default to above example
+        :param link_input: Hard link (or symlink) input files that need no changes into the storage directory rather
+         than copying them. Linked files share their storage with the input files, so Tasks that edit their input in
+         place also edit the input files
         """
         if extension_mapping is None:
             mapping = {
@@ -46,6 +54,7 @@ class ExtensionLoader(InputLoader):
         self.extension_mapping = {}
         self._expand_convenience_mapping(mapping)
         self.directory = directory
+        self.link_input = link_input
         self.write_directory = write_dir.joinpath(PathManager.STORAGE_DIR)
         if not self.write_directory.exists():
             os.makedirs(self.write_directory)
@@ -54,25 +63,42 @@ class ExtensionLoader(InputLoader):
         return self.write_directory
 
     def load(self) -> Dict[str, Dict]:
-        out = {}
+        return dict(self.stream())
+
+    def stream(self) -> Iterator[Tuple[str, Dict]]:
+        """Yield each record once all of its files are staged"""
         print("Populating input...")
         if self.directory is None:
             print("Done")
-            return out
-        with ThreadPoolExecutor() as executor:
-            futures = []
-            for file in os.listdir(self.directory):
-                # pylint: disable=consider-iterating-dictionary
-                for key in self.extension_mapping.keys():
-                    if file.endswith(key):
-                        futures.append(executor.submit(self._load_file, file, key))
-            for future in as_completed(futures):
-                result = future.result()
-                if result[0] not in out.keys():
-                    out[result[0]] = {}
-                out[result[0]].update(result[1])
+            return
+        # Files matched by each record
+        record_files: Dict[str, List[Tuple[str, str]]] = {}
+        for file in os.listdir(self.directory):
+            # pylint: disable=consider-iterating-dictionary
+            for key in self.extension_mapping.keys():
+                if ExtensionLoader._uncompressed_name(file).endswith(key):
+                    record_files.setdefault(ExtensionLoader._basename(file, key), []).append((file, key))
+        # Files are rewritten in separate processes, as rewriting is CPU-bound. Processes are spawned rather than
+        # forked, as files are loaded on many threads
+        ExtensionLoader.staging_pool = ProcessPoolExecutor(mp_context=get_context("spawn"))
+        ExtensionLoader.link_unchanged = self.link_input
+        try:
+            with ThreadPoolExecutor() as executor:
+                futures = [executor.submit(self._load_file, file, key)
+                           for files in record_files.values() for file, key in files]
+                remaining = {basename: len(files) for basename, files in record_files.items()}
+                out: Dict[str, Dict] = {}
+                for future in as_completed(futures):
+                    basename, data = future.result()
+                    out.setdefault(basename, {}).update(data)
+                    remaining[basename] -= 1
+                    if remaining[basename] == 0:
+                        yield basename, out.pop(basename)
+        finally:
+            ExtensionLoader.staging_pool.shutdown()
+            ExtensionLoader.staging_pool = None
+            ExtensionLoader.link_unchanged = False
         print("Done")
-        return out
 
     def _expand_convenience_mapping(self, mapping: Dict):
         """Expand tuple from object initializer to map to name/Callable tuple"""
@@ -83,36 +109,53 @@ class ExtensionLoader(InputLoader):
     def _load_file(self, file: str, ext: str) -> Tuple[str, dict]:
         """Load a file, return its basename (less ext) and the dict mapping its file path"""
         file = os.path.join(self.directory, file)
-        basename = os.path.basename(file).replace(ext, "")
+        basename = ExtensionLoader._basename(file, ext)
         new_file = os.path.join(self.write_directory, basename + ext)
         if not os.path.exists(new_file):
             if ext in self.extension_mapping.keys():
                 self.extension_mapping[ext][1](file, new_file)
         return basename, {self.extension_mapping[ext][0]: new_file}
 
+    @staticmethod
+    def _basename(file: str, ext: str) -> str:
+        """Record id of file matched by ext"""
+        return ExtensionLoader._uncompressed_name(os.path.basename(file)).replace(ext, "")
+
+    @staticmethod
+    def _uncompressed_name(file: str) -> str:
+        """File name without gzip extension"""
+        for compressed_ext in input_staging.COMPRESSED_EXTENSIONS:
+            if file.endswith(compressed_ext):
+                return file[:-len(compressed_ext)]
+        return file
+
     @staticmethod
     def parse_fasta(file: str, new_file: str):
-        """Wrapper SeqIO.parse"""
-        SeqIO.write(ExtensionLoader._record_iter(file, "fasta"), new_file, "fasta")
+        """Stage FASTA file, with record descriptions removed from headers"""
+        ExtensionLoader._stage(file, new_file, input_staging.FASTA)
 
     @staticmethod
     def parse_fastq(file: str, new_file: str):
-        """Wrapper SeqIO.parse"""
-        SeqIO.write(ExtensionLoader._record_iter(file, "fastq"), new_file, "fastq")
+        """Stage FASTQ file, with record descriptions removed from headers"""
+        ExtensionLoader._stage(file, new_file, input_staging.FASTQ)
 
     @staticmethod
-    def _record_iter(file: str, file_type: str):
-        """Clear description column of records"""
-        for record in SeqIO.parse(file, file_type):
-            record.description = ""
-            yield record
+    def copy_gff3(file: str, new_file: str):
+        """Stage gff3 file"""
+        ExtensionLoader._stage(file, new_file, input_staging.TEXT)
 
     @staticmethod
-    def copy_gff3(file: str, new_file: str):
-        """Copy gff3 contents"""
-        original_file_ptr = open(file, "r")
-        new_file_ptr = open(new_file, "w")
-        for line in original_file_ptr:
-            new_file_ptr.write(line)
-        new_file_ptr.close()
-        original_file_ptr.close()
+    def _stage(file: str, new_file: str, file_format: str):
+        """ Write a decompressed copy of file with descriptions removed from headers, or link it into the storage
+        directory if it needs no changes and the loader links its input. Staging runs in the staging pool while input
+        is loaded
+
+        :param file: Input file
+        :param new_file: Path in storage directory
+        :param file_format: Format of file, as defined in input_staging
+        """
+        if ExtensionLoader.staging_pool is None:
+            input_staging.stage(file, new_file, file_format, ExtensionLoader.link_unchanged)
+        else:
+            ExtensionLoader.staging_pool.submit(input_staging.stage, file, new_file, file_format,
+                                                ExtensionLoader.link_unchanged).result()
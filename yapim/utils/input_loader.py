@@ -2,14 +2,15 @@
 input loaders"""
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterator, Tuple
 
 from yapim.utils.existing_input_loader import ExistingInputLoader
 
 
 class InputLoader(ABC):
     """Load input into pipeline with provided abstract methods. Executor will use InputLoader subclass instance
-    to populate input prior to launching pipeline"""
+    to populate input as the pipeline runs. Each record's Tasks start as soon as the record is yielded by stream(), and
+    AggregateTasks start once every record has been yielded"""
     @abstractmethod
     def load(self) -> Dict[str, Dict]:
         """ Populate input into dictionary of {record_id: {}} and return
@@ -18,6 +19,14 @@ class InputLoader(ABC):
         :rtype:
         """
 
+    def stream(self) -> Iterator[Tuple[str, Dict]]:
+        """ Yield each (record_id, {}) pair as soon as its input is ready. Override when records can be populated
+        one at a time, so that a record's Tasks do not wait on the rest of the input. Defaults to the output of load()
+
+        :return: Iterator over record ids and their input data
+        """
+        yield from self.load().items()
+
     @abstractmethod
     def storage_directory(self) -> Path:
         """ Location used for storing populated input
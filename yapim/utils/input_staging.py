@@ -0,0 +1,95 @@
+"""Stage input files in a pipeline's storage directory without parsing them into records"""
+
+import gzip
+import os
+from typing import BinaryIO, Iterable, Tuple
+
+FASTA = "fasta"
+FASTQ = "fastq"
+# Files that are never rewritten, other than to decompress them
+TEXT = "text"
+# Extensions of gzip (or bgzip) compressed input, which is decompressed when staged
+COMPRESSED_EXTENSIONS = (".gz", ".bgz")
+_GZIP_MAGIC = b"\x1f\x8b"
+_BUFFER_SIZE = 1 << 22
+
+
+def stage(file: str, new_file: str, file_format: str, link_unchanged: bool = False):
+    """ Stage input file. The file is decompressed and record descriptions are removed from its headers, leaving each
+    header as its record id. With link_unchanged, uncompressed files whose headers need no change are instead hard
+    linked (or symlinked, if the storage directory is on another filesystem), so share their storage with the input
+    file
+
+    :param file: Input file
+    :param new_file: Path in storage directory
+    :param file_format: FASTA, FASTQ or TEXT
+    :param link_unchanged: Link files that need no changes rather than copying them
+    """
+    if link_unchanged and not is_compressed(file) and not needs_rewrite(file, file_format):
+        link(file, new_file)
+        return
+    # Written under a temporary name, so that a partially staged file is not mistaken for a staged file
+    tmp_file = new_file + ".tmp"
+    with _open(file) as file_ptr, open(tmp_file, "wb", buffering=_BUFFER_SIZE) as new_file_ptr:
+        new_file_ptr.writelines(line for line, _ in _rewrite(file_ptr, file_format))
+    os.replace(tmp_file, new_file)
+
+
+def link(file: str, new_file: str):
+    """Hard link file to new path, or symlink if a hard link is not possible"""
+    try:
+        os.link(file, new_file)
+    except OSError:
+        os.symlink(os.path.abspath(file), new_file)
+
+
+def is_compressed(file: str) -> bool:
+    """File is gzip (or bgzip) compressed"""
+    with open(file, "rb") as file_ptr:
+        return file_ptr.read(2) == _GZIP_MAGIC
+
+
+def needs_rewrite(file: str, file_format: str) -> bool:
+    """Any header of file has a description"""
+    if file_format == TEXT:
+        return False
+    with _open(file) as file_ptr:
+        return any(line != original for line, original in _rewrite(file_ptr, file_format))
+
+
+def _rewrite(file_ptr: BinaryIO, file_format: str) -> Iterable[Tuple[bytes, bytes]]:
+    """ Lines of file with descriptions removed from headers. Sequence and quality lines are passed through unchanged,
+    so FASTQ input is expected to hold one sequence line per record
+
+    :param file_ptr: File opened in binary mode
+    :param file_format: FASTA, FASTQ or TEXT
+    :return: Line to write, and line that was read
+    """
+    if file_format == FASTA:
+        for line in file_ptr:
+            yield (_record_id(line) if line.startswith(b">") else line), line
+    elif file_format == FASTQ:
+        for i, line in enumerate(file_ptr):
+            position = i % 4
+            if position == 0:
+                yield _record_id(line), line
+            elif position == 2:
+                yield b"+\n", line
+            else:
+                yield line, line
+    else:
+        for line in file_ptr:
+            yield line, line
+
+
+def _record_id(header: bytes) -> bytes:
+    """Header line truncated to its record id"""
+    fields = header.split(None, 1)
+    return (fields[0] if len(fields) > 0 else header.rstrip()) + b"\n"
+
+
+def _open(file: str) -> BinaryIO:
+    """Open file for buffered reading, decompressing gzip (or bgzip) input"""
+    if is_compressed(file):
+        return gzip.open(file, "rb")
+    return open(file, "rb", buffering=_BUFFER_SIZE)
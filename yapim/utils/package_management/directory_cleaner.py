@@ -5,11 +5,11 @@ import shutil
 import sys
 from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
-from yapim.utils.dependency_graph import DependencyGraph
 from yapim.utils.package_management.package_loader import PackageLoader
 from yapim.utils.path_manager import PathManager
+from yapim.utils.results_store import ResultsStore
 
 
 class DirectoryCleaner:
@@ -35,6 +35,14 @@ class DirectoryCleaner:
                 else:
                     os.remove(file)
 
+    def _forget_outputs(self, task_prefix: Optional[str] = None, record_id: Optional[str] = None):
+        """Remove deleted output from completion manifests of pipelines in output directory"""
+        for store_file in glob.glob(str(self.output_directory.joinpath(PathManager.RESULTS).joinpath("*")
+                                        .joinpath("*.db"))):
+            store = ResultsStore(store_file)
+            store.forget_outputs(task_prefix, record_id)
+            store.close()
+
     def clean(self, pipeline_directory: Path, task_names: List[str]):
         """
         Remove task information by task name
@@ -42,15 +50,18 @@ class DirectoryCleaner:
         :param pipeline_directory: Pipeline code directory
         :param task_names: List of tasks to delete
         """
-        pipeline_tasks, task_blueprints = PackageLoader(pipeline_directory).load_from_package()
+        dependency_graph = PackageLoader(pipeline_directory).load_graph()
+        # Tasks downstream of more than one requested Task are removed once
+        affected_names = set()
+        for task_name in task_names:
+            affected_names.update(dependency_graph.get_affected_nodes(task_name))
         with ThreadPoolExecutor() as executor:
             futures = []
-            for task_name in task_names:
-                _task_names = DependencyGraph(pipeline_tasks, task_blueprints).get_affected_nodes(task_name)
-                for _name in _task_names:
-                    print(f"Removing {_name}")
-                    task_path = self.output_directory.joinpath(PathManager.WDIR).joinpath("*").joinpath(_name + "*")
-                    futures.append(executor.submit(DirectoryCleaner._rm_glob, task_path))
+            for _name in sorted(affected_names):
+                print(f"Removing {_name}")
+                task_path = self.output_directory.joinpath(PathManager.WDIR).joinpath("*").joinpath(_name + "*")
+                futures.append(executor.submit(DirectoryCleaner._rm_glob, task_path))
+                self._forget_outputs(task_prefix=_name)
             wait(futures)
 
     def remove(self, record_ids: List[str]):
@@ -68,6 +79,7 @@ class DirectoryCleaner:
                     # Remove wdir contents
                     task_path = self.output_directory.joinpath(PathManager.WDIR).joinpath(record_id)
                     futures.append(executor.submit(DirectoryCleaner._rm_glob, task_path))
+                    self._forget_outputs(record_id=record_id)
                     # Remove results contents
                     task_path = self.output_directory.joinpath(PathManager.RESULTS).joinpath("*").joinpath(record_id)
                     futures.append(executor.submit(DirectoryCleaner._rm_glob, task_path))
@@ -0,0 +1,113 @@
+"""Display the runtime and resource usage stored for the Tasks of each pipeline in an output directory"""
+import glob
+import os
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from yapim.tasks.utils.resource_sizer import ResourceSizer
+from yapim.utils.path_manager import PathManager
+from yapim.utils.results_store import ResultsStore, UsageRecord
+
+
+class HistoryReport:
+    """Format the usage stored in the results store of each pipeline that has written to an output directory"""
+    SUMMARY_HEADER = ("task", "runs", "mean time", "max time", "cores", "utilization", "peak memory")
+    RECORDS_HEADER = ("task", "record", "input", "time", "cpu time", "threads", "peak memory")
+
+    def __init__(self, output_directory: Path):
+        """
+        Create report
+
+        :param output_directory: Pipeline output top-level directory
+        """
+        self.output_directory = output_directory
+
+    def history(self) -> List[Tuple[str, List[UsageRecord]]]:
+        """ Load stored usage of each pipeline
+
+        :return: (pipeline name, usage records) of each pipeline, ordered by name
+        """
+        out = []
+        for store_file in sorted(glob.glob(str(self.output_directory.joinpath(PathManager.RESULTS).joinpath("*")
+                                                   .joinpath("*.db")))):
+            store = ResultsStore(store_file)
+            out.append((os.path.splitext(os.path.basename(store_file))[0], store.usage_history()))
+            store.close()
+        return out
+
+    def summary(self, task_names: Optional[Iterable[str]] = None) -> str:
+        """ Summarize the usage of each Task across the records it ran on
+
+        :param task_names: Tasks to include. Names match a Task's dependencies as well. All Tasks if not provided
+        :return: Table of each pipeline
+        """
+        sections = []
+        for pipeline_name, history in self.history():
+            rows = [(
+                summary.task, str(summary.runs), HistoryReport._format_time(summary.mean_seconds),
+                HistoryReport._format_time(summary.max_seconds),
+                "-" if summary.mean_cores is None else f"{summary.mean_cores:.2f}",
+                "-" if summary.mean_utilization is None else f"{summary.mean_utilization:.0%}",
+                HistoryReport._format_memory(summary.max_peak_memory)
+            ) for summary in ResourceSizer(HistoryReport._select(history, task_names)).summary()]
+            sections.append(HistoryReport._table(pipeline_name, HistoryReport.SUMMARY_HEADER, rows))
+        return "\n".join(sections)
+
+    def records(self, task_names: Optional[Iterable[str]] = None) -> str:
+        """ List the usage of each Task on each record
+
+        :param task_names: Tasks to include. Names match a Task's dependencies as well. All Tasks if not provided
+        :return: Table of each pipeline
+        """
+        sections = []
+        for pipeline_name, history in self.history():
+            rows = [(
+                record.task, record.record_id, HistoryReport._format_memory(record.input_size),
+                HistoryReport._format_time(record.seconds),
+                "-" if record.cpu_seconds is None else HistoryReport._format_time(record.cpu_seconds),
+                "-" if record.threads is None else str(record.threads),
+                HistoryReport._format_memory(record.peak_memory)
+            ) for record in HistoryReport._select(history, task_names)]
+            sections.append(HistoryReport._table(pipeline_name, HistoryReport.RECORDS_HEADER, rows))
+        return "\n".join(sections)
+
+    @staticmethod
+    def _select(history: List[UsageRecord], task_names: Optional[Iterable[str]]) -> List[UsageRecord]:
+        """Usage of requested Tasks, and of their dependencies, which are stored as <task>.<dependency>"""
+        if task_names is None:
+            return history
+        task_names = set(task_names)
+        if len(task_names) == 0:
+            return history
+        return [record for record in history if record.task.split(".")[0] in task_names]
+
+    @staticmethod
+    def _table(title: str, header: tuple, rows: List[tuple]) -> str:
+        """Format rows as left-aligned columns below a title"""
+        widths = [max(len(str(row[i])) for row in (header, *rows)) for i in range(len(header))]
+        lines = [title]
+        for row in (header, *rows):
+            lines.append("  ".join(str(value).ljust(width) for value, width in zip(row, widths)).rstrip())
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _format_time(seconds: float) -> str:
+        """Format duration as hours, minutes and seconds"""
+        if seconds < 60:
+            return f"{seconds:.1f}s"
+        minutes, seconds = divmod(int(round(seconds)), 60)
+        hours, minutes = divmod(minutes, 60)
+        if hours > 0:
+            return f"{hours}h{minutes:02d}m{seconds:02d}s"
+        return f"{minutes}m{seconds:02d}s"
+
+    @staticmethod
+    def _format_memory(size: Optional[int]) -> str:
+        """Format size in bytes with binary units"""
+        if size is None:
+            return "-"
+        for unit in ("B", "K", "M", "G"):
+            if size < 1024:
+                return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+            size /= 1024
+        return f"{size:.1f}T"
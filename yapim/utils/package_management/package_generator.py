@@ -6,8 +6,11 @@ import shutil
 from pathlib import Path
 from typing import List, Optional
 
+from yapim.utils.dependency_graph import DependencyGraph
 from yapim.utils.package_management.config_manager_generator import ConfigManagerGenerator
+from yapim.utils.package_management.package_loader import PackageLoader
 from yapim.utils.package_management.package_manager import PackageManager
+from yapim.utils.package_management.task_index import TaskIndex
 
 
 # pylint: disable=too-few-public-methods
@@ -58,6 +61,8 @@ class PackageGenerator(PackageManager):
         # Copy all dependency directories
         for pre, post in zip(self._dependencies_directories, output_data["dependencies"]):
             PackageGenerator._try_copy(pre, write_directory.joinpath(post), symlinks=True, dirs_exist_ok=True)
+        # Index Tasks, so that running the pipeline imports only the modules that it uses
+        output_data[PackageManager.INDEX] = self._create_index(write_directory, output_data)
         # Save metadata file
         pipeline_file = write_directory.joinpath(super().pipeline_file)
         # Create config stuff
@@ -68,6 +73,31 @@ class PackageGenerator(PackageManager):
         with open(pipeline_file, "wb") as file_ptr:
             pickle.dump(output_data, file_ptr)
 
+    def _create_index(self, write_directory: Path, output_data: dict) -> dict:
+        """ Index Tasks of copied pipeline directories, the loader's file and the pipeline's dependency graph
+
+        :param write_directory: Output directory
+        :param output_data: Pipeline directory names
+        :return: Index to store in pipeline file
+        """
+        index = {
+            PackageManager.DIRECTORIES: {
+                directory_name: TaskIndex.build(write_directory.joinpath(directory_name))
+                for directory_name in [output_data["tasks"], *output_data["dependencies"]]
+            }
+        }
+        if self._loader is not None:
+            loader_file = os.path.basename(self._loader)
+            index[PackageManager.LOADER] = (loader_file,
+                                            TaskIndex.file_digest(str(write_directory.joinpath(loader_file))))
+        pipeline_tasks, task_blueprints = PackageLoader.load_from_directories(
+            write_directory.joinpath(output_data["tasks"]),
+            [write_directory.joinpath(directory_name) for directory_name in output_data["dependencies"]],
+            index
+        )
+        index[PackageManager.GRAPH] = DependencyGraph(pipeline_tasks, task_blueprints).describe()
+        return index
+
     def _create_config(self, write_directory: Path):
         config_file_path = write_directory.joinpath(os.path.basename(self._tasks_directory) + "-config.yaml")
         if not config_file_path.exists() or input("Overwrite existing configuration file? [Y/n]: ").upper() == "Y":
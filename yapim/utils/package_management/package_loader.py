@@ -1,4 +1,5 @@
 """Utilities for end-users to load a packaged pipeline"""
+import os
 import pickle
 import sys
 from pathlib import Path
@@ -6,9 +7,11 @@ from typing import Dict, Type, Tuple, List, Optional
 
 from yapim import Task
 from yapim.tasks.utils.loader import get_modules
+from yapim.utils.dependency_graph import DependencyGraph
 from yapim.utils.extension_loader import ExtensionLoader
 from yapim.utils.input_loader import InputLoader
 from yapim.utils.package_management.package_manager import PackageManager
+from yapim.utils.package_management.task_index import TaskBlueprints, TaskIndex
 
 
 class PackageLoader(PackageManager):
@@ -27,6 +30,21 @@ class PackageLoader(PackageManager):
 
         :return: True/False if pipeline contents are valid
         """
+        pipeline_data = self._read_pipeline_pkl()
+        # Load and validate input loader
+        loader_path = pipeline_data.get("loader")
+        if loader_path is None or loader_path is False:
+            pipeline_data["loader"] = ExtensionLoader
+        else:
+            loader = super()._get_loader(self._pipeline_directory, pipeline_data[PackageManager.INDEX])
+            if not issubclass(loader, InputLoader):
+                print("Unable to validate loader")
+                sys.exit(1)
+            pipeline_data["loader"] = loader
+        return pipeline_data
+
+    def _read_pipeline_pkl(self) -> dict:
+        """Read pipeline .pkl file and confirm that the directories that it lists exist"""
         pipeline_pkl_path = self._pipeline_directory.joinpath(PackageLoader.pipeline_file)
         if not pipeline_pkl_path.exists():
             print("Unable to find pipeline .pkl file")
@@ -47,37 +65,67 @@ class PackageLoader(PackageManager):
             self._pipeline_directory.joinpath(dependency_directory)
             for dependency_directory in pipeline_data["dependencies"]
         ]
-        # Load and validate input loader
-        loader_path = pipeline_data.get("loader")
-        if loader_path is None or loader_path is False:
-            pipeline_data["loader"] = ExtensionLoader
-        else:
-            loader = super()._get_loader(self._pipeline_directory)
-            if not issubclass(loader, InputLoader):
-                print("Unable to validate loader")
-                sys.exit(1)
-            pipeline_data["loader"] = loader
+        # Packages created by earlier versions are not indexed
+        pipeline_data.setdefault(PackageManager.INDEX, {})
         return pipeline_data
 
     def load_from_package(self) -> Tuple[List[Type[Task]], Dict[str, Type[Task]]]:
         """Load YAPIM pipeline from directory"""
         pipeline_data = self.validate_pipeline_pkl()
-        return PackageLoader.load_from_directories(pipeline_data["tasks"], pipeline_data["dependencies"])
+        return PackageLoader.load_from_directories(pipeline_data["tasks"], pipeline_data["dependencies"],
+                                                   pipeline_data[PackageManager.INDEX])
+
+    def load_graph(self) -> DependencyGraph:
+        """Load dependency graph of pipeline. The graph is read from the pipeline's index, without importing its Tasks,
+        if no Task file has changed since the package was created"""
+        pipeline_data = self._read_pipeline_pkl()
+        index = pipeline_data[PackageManager.INDEX]
+        graph = index.get(PackageManager.GRAPH)
+        if graph is not None and all(TaskIndex.is_current(directory, PackageLoader._directory_index(index, directory))
+                                     for directory in [pipeline_data["tasks"], *pipeline_data["dependencies"]]):
+            return DependencyGraph.from_requirements(*graph)
+        return DependencyGraph(*PackageLoader.load_from_directories(pipeline_data["tasks"],
+                                                                    pipeline_data["dependencies"], index))
 
     @staticmethod
     def load_from_directories(
             tasks_directory: Path,
-            dependencies_directories: Optional[List[Path]]) -> Tuple[List[Type[Task]], Dict[str, Type[Task]]]:
+            dependencies_directories: Optional[List[Path]],
+            index: Optional[dict] = None) -> Tuple[List[Type[Task]], Dict[str, Type[Task]]]:
         """
         Load YAPIM pipeline from directories
 
         :param tasks_directory: Directory containing YAPIM tasks
         :param dependencies_directories: List of dependency directories
+        :param index: Index of package that directories belong to. Directories that are indexed and unchanged since the
+         package was created are not searched, and their Tasks are imported when first used
         :return: Tuple containing list of pipeline tasks and a {name: type} mapping for each task
         """
-        task_blueprints: Dict[str, Type[Task]] = get_modules(tasks_directory)
-        pipeline_tasks = list(task_blueprints.values())
-        if dependencies_directories is not None and len(dependencies_directories) > 0:
-            for directory in dependencies_directories:
-                task_blueprints.update(get_modules(directory))
-        return pipeline_tasks, task_blueprints
+        if index is None:
+            task_blueprints: Dict[str, Type[Task]] = get_modules(tasks_directory)
+            pipeline_tasks = list(task_blueprints.values())
+            if dependencies_directories is not None and len(dependencies_directories) > 0:
+                for directory in dependencies_directories:
+                    task_blueprints.update(get_modules(directory))
+            return pipeline_tasks, task_blueprints
+        blueprints = TaskBlueprints()
+        PackageLoader._add_directory(blueprints, tasks_directory, index)
+        # Every Task in the tasks directory is part of the pipeline
+        pipeline_tasks = [blueprints[task_name] for task_name in list(blueprints.keys())]
+        for directory in dependencies_directories or []:
+            PackageLoader._add_directory(blueprints, directory, index)
+        return pipeline_tasks, blueprints
+
+    @staticmethod
+    def _add_directory(blueprints: TaskBlueprints, directory: Path, index: dict):
+        """Add Tasks of directory from its index, or by importing each of its modules if it has changed"""
+        directory_index = PackageLoader._directory_index(index, directory)
+        if TaskIndex.is_current(directory, directory_index):
+            blueprints.add_index(Path(directory), directory_index)
+        else:
+            blueprints.add_types(get_modules(directory))
+
+    @staticmethod
+    def _directory_index(index: dict, directory: Path) -> Optional[dict]:
+        """TaskIndex of directory, if it was indexed"""
+        return index.get(PackageManager.DIRECTORIES, {}).get(os.path.basename(directory))
@@ -1,23 +1,39 @@
 """Utilities for package management classes"""
+import os
 import pkgutil
 import sys
 from abc import ABC
 from inspect import isclass, isabstract
 from pathlib import Path
-from typing import Type
+from typing import Optional, Type
 
+from yapim.tasks.utils.loader import load_module
 from yapim.utils.input_loader import InputLoader
+from yapim.utils.package_management.task_index import TaskIndex
 
 
 # pylint: disable=too-few-public-methods
 class PackageManager(ABC):
     """Base class defining means by which to access pipeline loader and pkl internals"""
     pipeline_file = ".pipeline.pkl"
+    # Index of the pipeline file, which holds the TaskIndex of each Task directory by name, the loader's file and
+    # digest, and the dependency graph
+    INDEX = "index"
+    DIRECTORIES = "directories"
+    LOADER = "loader"
+    GRAPH = "graph"
 
     @staticmethod
-    def _get_loader(pipeline_dir: Path) -> Type[InputLoader]:
-        for loader, module_name, _ in pkgutil.walk_packages([str(pipeline_dir)]):
-            module = loader.find_module(module_name).load_module(module_name)
+    def _get_loader(pipeline_dir: Path, index: Optional[dict] = None) -> Type[InputLoader]:
+        loader_file = None if index is None else index.get(PackageManager.LOADER)
+        if loader_file is not None and pipeline_dir.joinpath(loader_file[0]).exists() and \
+                TaskIndex.file_digest(str(pipeline_dir.joinpath(loader_file[0]))) == loader_file[1]:
+            # Only the loader's module is imported
+            modules = [load_module(os.path.splitext(loader_file[0])[0], str(pipeline_dir.joinpath(loader_file[0])))]
+        else:
+            modules = (load_module(module_name, module_finder.find_spec(module_name).origin)
+                       for module_finder, module_name, _ in pkgutil.walk_packages([str(pipeline_dir)]))
+        for module in modules:
             for attribute_name in dir(module):
                 attribute = getattr(module, attribute_name)
                 if isclass(attribute) and issubclass(attribute, InputLoader) and not isabstract(attribute):
@@ -0,0 +1,121 @@
+"""Index of the Tasks that a pipeline package defines, written when the package is created"""
+import hashlib
+import os
+import pkgutil
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, Mapping, Optional, Tuple, Type
+
+from yapim.tasks.task import Task
+from yapim.tasks.utils.loader import get_tasks, load_module
+
+
+class TaskIndex:
+    """ Record of the modules in a directory of Tasks and the Task classes that each module provides, along with a
+    digest of each Python file in the directory.
+
+    A pipeline whose files still match their digests may be loaded by importing only the modules of the Tasks that it
+    uses, rather than importing every module to find its Tasks.
+    """
+    FILES = "files"
+    MODULES = "modules"
+    CLASSES = "classes"
+
+    @staticmethod
+    def build(directory: Path) -> dict:
+        """ Import each module in directory and record the Tasks that it provides
+
+        :param directory: Directory of Tasks
+        :return: Index of {files: {path: digest}, modules: {module name: path}, classes: {class name: module name}},
+         with paths relative to directory
+        """
+        modules: Dict[str, str] = {}
+        classes: Dict[str, str] = {}
+        for module_finder, module_name, _ in pkgutil.walk_packages([str(directory)]):
+            path = module_finder.find_spec(module_name).origin
+            modules[module_name] = os.path.relpath(path, directory)
+            for class_name in get_tasks(load_module(module_name, path)).keys():
+                classes[class_name] = module_name
+        return {TaskIndex.FILES: TaskIndex.file_digests(directory), TaskIndex.MODULES: modules,
+                TaskIndex.CLASSES: classes}
+
+    @staticmethod
+    def is_current(directory: Path, index: Optional[dict]) -> bool:
+        """Index exists and no Python file in directory has been added, removed or changed since it was built"""
+        return index is not None and TaskIndex.file_digests(directory) == index[TaskIndex.FILES]
+
+    @staticmethod
+    def file_digests(directory: Path) -> Dict[str, str]:
+        """Digest of each Python file in directory, by path relative to directory"""
+        digests = {}
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            for file in sorted(files):
+                if file.endswith(".py"):
+                    path = os.path.join(root, file)
+                    digests[os.path.relpath(path, directory)] = TaskIndex.file_digest(path)
+        return digests
+
+    @staticmethod
+    def file_digest(path: str) -> str:
+        """Digest of file contents"""
+        with open(path, "rb") as file_ptr:
+            return hashlib.sha256(file_ptr.read()).hexdigest()
+
+
+class TaskBlueprints(Mapping):
+    """ Mapping of Task name to type. Tasks found in an index are imported the first time that they are looked up,
+    along with the packages that contain them
+    """
+    def __init__(self):
+        self._types: Dict[str, Type[Task]] = {}
+        # Directory and index of Tasks that have not been imported
+        self._sources: Dict[str, Tuple[Path, dict]] = {}
+        self._lock = threading.RLock()
+
+    def add_index(self, directory: Path, index: dict):
+        """Add the Tasks of an index, replacing Tasks of the same name"""
+        with self._lock:
+            for class_name in index[TaskIndex.CLASSES].keys():
+                self._types.pop(class_name, None)
+                self._sources[class_name] = (directory, index)
+
+    def add_types(self, task_types: Dict[str, Type[Task]]):
+        """Add Tasks that were already imported, replacing Tasks of the same name"""
+        with self._lock:
+            for class_name, task_type in task_types.items():
+                self._sources.pop(class_name, None)
+                self._types[class_name] = task_type
+
+    def __getitem__(self, class_name: str) -> Type[Task]:
+        with self._lock:
+            if class_name not in self._types.keys():
+                directory, index = self._sources[class_name]
+                module = TaskBlueprints._import(directory, index, index[TaskIndex.CLASSES][class_name])
+                self._types[class_name] = get_tasks(module)[class_name]
+                del self._sources[class_name]
+            return self._types[class_name]
+
+    def __contains__(self, class_name) -> bool:
+        # Checking for a Task does not import it
+        return class_name in self._types.keys() or class_name in self._sources.keys()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._types.keys()) + list(self._sources.keys()))
+
+    def __len__(self) -> int:
+        return len(self._types) + len(self._sources)
+
+    @staticmethod
+    def _import(directory: Path, index: dict, module_name: str):
+        """Import indexed module, and the packages that contain it, unless it was imported from the same file"""
+        path = str(Path(directory).joinpath(index[TaskIndex.MODULES][module_name]))
+        module = sys.modules.get(module_name)
+        if module is not None and getattr(module, "__file__", None) == path:
+            return module
+        if "." in module_name:
+            package_name = module_name.rsplit(".", 1)[0]
+            if package_name in index[TaskIndex.MODULES].keys():
+                TaskBlueprints._import(directory, index, package_name)
+        return load_module(module_name, path)
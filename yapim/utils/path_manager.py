@@ -68,16 +68,15 @@ class PathManager:
         # Record base dir - may be complex type, must convert properly to str
         record_id = str(record_id)
         base_dir = Path(self.wdir).joinpath(record_id)
-        if not base_dir.exists():
-            base_dir.mkdir()
+        # Tasks of a record may add directories concurrently
+        base_dir.mkdir(exist_ok=True)
         # Additional dirs, if needed
         if _subdirs is not None:
             assert isinstance(_subdirs, list)
             # Create all subdirectories provided in list and track them
             for _subd in _subdirs:
                 added_path = Path(self.wdir).joinpath(record_id).joinpath(_subd)
-                if not added_path.exists():
-                    added_path.mkdir()
+                added_path.mkdir(exist_ok=True)
                 self._dbs[_subd] = added_path
 
     def get_dir(self, record_id: str = None, subdir: str = None) -> str:
@@ -92,7 +91,8 @@ class PathManager:
         if record_id is not None:
             loc = os.path.join(loc, str(record_id))
         if subdir is not None:
-            loc = self._dbs.get(subdir, "")
+            # Subdirectories of other records share names, so are only looked up if no record is given
+            loc = os.path.join(loc, subdir) if record_id is not None else self._dbs.get(subdir, "")
         if os.path.exists(loc):
             return loc
         raise ValueError(
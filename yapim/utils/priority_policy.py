@@ -0,0 +1,144 @@
+"""Order the records and Tasks that are ready to run by their estimated remaining work"""
+
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from yapim.tasks.utils.task_result import TaskResult
+from yapim.utils.config_manager import ConfigManager
+from yapim.utils.dependency_graph import DependencyGraph, Node
+
+
+def input_size(data: dict) -> int:
+    """ Total size of the input files of a record. Output of Tasks is not included
+
+    :param data: Input of a record, or a mapping of record ids to their input
+    :return: Size in bytes
+    """
+    size = 0
+    for value in data.values():
+        if isinstance(value, TaskResult):
+            continue
+        if isinstance(value, dict):
+            size += input_size(value)
+        elif isinstance(value, (Path, str)):
+            try:
+                if os.path.isfile(value):
+                    size += os.path.getsize(value)
+            except (OSError, ValueError):
+                continue
+    return size
+
+
+class PriorityPolicy:
+    """ Rank work that is ready to run by the pipeline's PriorityPolicy. Work is a set of top-level Tasks run on a
+    record, and higher-ranked work is started first:
+
+    - fifo: work is started in the order it becomes ready
+    - lpt: work with the longest estimated runtime is started first, so that large records do not start last
+    - critical-path: work with the longest estimated path of remaining Tasks, through every Task that requires it, is
+      started first
+
+    The runtime of a Task on a record is estimated from the runtimes stored in the results store by earlier runs,
+    scaled by the size of the record's input files. Until a Task has a stored runtime, the size of the input files is
+    used alone.
+    """
+    FIFO = ConfigManager.FIFO_PRIORITY
+    LPT = ConfigManager.LPT_PRIORITY
+    CRITICAL_PATH = ConfigManager.CRITICAL_PATH_PRIORITY
+
+    def __init__(self, policy: str, dependency_graph: DependencyGraph, runtimes: Dict[str, Tuple[int, float, int]]):
+        """ Create policy for a pipeline
+
+        :param policy: PriorityPolicy from ConfigManager
+        :param dependency_graph: Pipeline dependency graph
+        :param runtimes: Stored runtimes, as returned by ResultsStore.runtimes()
+        :raises: ValueError if policy is not valid
+        """
+        if policy not in (PriorityPolicy.FIFO, PriorityPolicy.LPT, PriorityPolicy.CRITICAL_PATH):
+            raise ValueError(f"Priority policy must be one of '{PriorityPolicy.FIFO}', '{PriorityPolicy.LPT}' or "
+                             f"'{PriorityPolicy.CRITICAL_PATH}'")
+        self.policy = policy
+        # Working directory names of each top-level Task and its dependencies, in topological order
+        self._task_lists: Dict[str, List[str]] = {
+            task_list[-1].name: [PriorityPolicy.work_name(node) for node in task_list]
+            for task_list in dependency_graph.sorted_graph_identifiers
+        }
+        self._dependents: Dict[str, List[str]] = {name: [] for name in self._task_lists.keys()}
+        for name in self._task_lists.keys():
+            for requirement in dependency_graph.requirements(name):
+                self._dependents[requirement].append(name)
+        self._runtimes = runtimes
+        total_runs = sum(count for count, _, _ in runtimes.values())
+        total_seconds = sum(seconds for _, seconds, _ in runtimes.values())
+        total_size = sum(size or 0 for _, _, size in runtimes.values())
+        # Estimates of Tasks that have not been run before
+        self._mean_seconds = total_seconds / total_runs if total_runs > 0 else 0.0
+        self._seconds_per_byte = total_seconds / total_size if total_size > 0 else 0.0
+        self._sizes: Dict[Optional[str], int] = {}
+        self._ranks: Dict[Optional[str], Dict[str, float]] = {}
+
+    @staticmethod
+    def work_name(node: Node) -> str:
+        """Name of a Task's working directory, under which its runtimes are stored"""
+        return ".".join(node.get()).replace(f"{ConfigManager.ROOT}.", "")
+
+    def add_record(self, record_id: str, data: dict):
+        """ Measure the input files of a record, from which its runtimes are estimated
+
+        :param record_id: Id of record
+        :param data: Input of record
+        """
+        if self.policy != PriorityPolicy.FIFO:
+            self._sizes[record_id] = input_size(data)
+            self._ranks.pop(record_id, None)
+
+    def priority(self, record_id: Optional[str], task_names: Iterable[str]) -> float:
+        """ Rank of running top-level Tasks on a record. Work of equal rank is started in the order it became ready
+
+        :param record_id: Id of record, or None for an AggregateTask
+        :param task_names: Names of top-level Tasks
+        :return: Rank, where higher-ranked work is started first
+        """
+        if self.policy == PriorityPolicy.FIFO:
+            return 0.0
+        if self.policy == PriorityPolicy.LPT:
+            return sum(self.estimate(record_id, name) for name in task_names)
+        ranks = self._rank(record_id)
+        return max((ranks[name] for name in task_names), default=0.0)
+
+    def estimate(self, record_id: Optional[str], task_name: str) -> float:
+        """ Estimated runtime of a top-level Task, and the dependencies it lists, on a record
+
+        :param record_id: Id of record, or None for an AggregateTask
+        :param task_name: Name of top-level Task
+        :return: Runtime, in seconds if any Task has a stored runtime
+        """
+        size = self._sizes.get(record_id, 0)
+        return sum(self._work_estimate(work, size) for work in self._task_lists[task_name])
+
+    def _work_estimate(self, work: str, size: int) -> float:
+        """Estimated runtime of a single Task or dependency on input of the given size"""
+        runtime = self._runtimes.get(work)
+        if runtime is not None:
+            count, seconds, total_size = runtime
+            if size > 0 and total_size:
+                return seconds / total_size * size
+            return seconds / count
+        if size > 0 and self._seconds_per_byte > 0:
+            return self._seconds_per_byte * size
+        if self._mean_seconds > 0:
+            return self._mean_seconds
+        # No Task has been run before, so records are compared by the size of their input
+        return float(max(size, 1))
+
+    def _rank(self, record_id: Optional[str]) -> Dict[str, float]:
+        """Estimated runtime of the longest path from each top-level Task through the Tasks that require it"""
+        ranks = self._ranks.get(record_id)
+        if ranks is None:
+            ranks = {}
+            for name in reversed(list(self._task_lists.keys())):
+                ranks[name] = self.estimate(record_id, name) + max(
+                    (ranks[dependent] for dependent in self._dependents[name]), default=0.0)
+            self._ranks[record_id] = ranks
+        return ranks
@@ -0,0 +1,236 @@
+"""On-disk store of pipeline output that is written as each Task completes"""
+
+import pickle
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+
+class UsageRecord(NamedTuple):
+    """Runtime and resource usage of a Task on a record, as stored in a results store"""
+    record_id: str
+    task: str
+    seconds: float
+    input_size: int
+    cpu_seconds: Optional[float]
+    peak_memory: Optional[int]
+    threads: Optional[int]
+
+
+class ResultsStore:
+    """ SQLite-backed store of the `final` output of each record in a pipeline.
+
+    Output is written as each Task is finalized, so that a pipeline that stops partway keeps the output of the Tasks
+    that completed, and a re-run adds to the output of earlier runs. Only the output of the records of the latest run is
+    loaded, so records that are not in a run's input are not passed to downstream pipelines. Values are stored pickled,
+    one row per (record id, output key), so that downstream pipelines may read only the keys that they request.
+
+    The store also holds a manifest of the size and modification time of each output path of each completed Task, so
+    that a resumed pipeline can find completed Tasks without checking their files, and the runtime and resource usage of
+    each Task on each record, from which the runtimes and resource requests of later runs are estimated. Tasks that are
+    cached record the cache key of their output, so that output from a run with other input or settings is not reused.
+    Output that Tasks using the `process` backend set in their run() method is stored so that it is available when the
+    Task is resumed.
+    """
+    def __init__(self, path: Union[Path, str]):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS records (record_id TEXT PRIMARY KEY)")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS output (record_id TEXT, key TEXT, value BLOB, "
+                                     "PRIMARY KEY (record_id, key))")
+            # Downstream pipelines look up output by key
+            self._connection.execute("CREATE INDEX IF NOT EXISTS output_key ON output (key)")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS manifest (path TEXT PRIMARY KEY, record_id TEXT, "
+                                     "task TEXT, size INTEGER, mtime REAL)")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS runtimes (record_id TEXT, task TEXT, seconds REAL, "
+                                     "input_size INTEGER, cpu_seconds REAL, peak_memory INTEGER, threads INTEGER, "
+                                     "PRIMARY KEY (record_id, task))")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS task_output (record_id TEXT, task TEXT, key TEXT, "
+                                     "value BLOB, PRIMARY KEY (record_id, task, key))")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS cache_keys (record_id TEXT, task TEXT, key TEXT, "
+                                     "PRIMARY KEY (record_id, task))")
+
+    def start_run(self):
+        """Stop tracking the records of earlier runs. Their output is kept, and is loaded again once a run adds them"""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM records")
+
+    def add_records(self, record_ids: Iterable[str]):
+        """ Track records, which are stored even if they have no output
+
+        :param record_ids: Ids of records
+        """
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR IGNORE INTO records VALUES (?)",
+                                         ((str(record_id),) for record_id in record_ids))
+
+    def put(self, record_id: str, output: Dict[str, object]):
+        """ Store output of record, replacing any values stored for the same keys
+
+        :param record_id: Id of record
+        :param output: Mapping of output key to value
+        """
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR IGNORE INTO records VALUES (?)", (str(record_id),))
+            self._connection.executemany("INSERT OR REPLACE INTO output VALUES (?, ?, ?)",
+                                         ((str(record_id), key, pickle.dumps(value))
+                                          for key, value in output.items()))
+
+    def load(self, keys: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """ Load stored output
+
+        :param keys: Output keys to load. All output and all records are loaded if not provided
+        :return: Mappings of {record_id: {key: value}} of the records of the latest run
+        """
+        data: Dict[str, Dict] = {}
+        with self._lock:
+            if keys is None:
+                for (record_id,) in self._connection.execute("SELECT record_id FROM records"):
+                    data[record_id] = {}
+                rows = self._connection.execute(
+                    "SELECT record_id, key, value FROM output WHERE record_id IN (SELECT record_id FROM records)")
+            else:
+                keys = list(keys)
+                rows = self._connection.execute(
+                    f"SELECT record_id, key, value FROM output WHERE key IN ({', '.join('?' * len(keys))}) "
+                    "AND record_id IN (SELECT record_id FROM records)", keys)
+            for record_id, key, value in rows:
+                data.setdefault(record_id, {})[key] = pickle.loads(value)
+        return data
+
+    def load_key(self, key: str) -> Dict[str, object]:
+        """ Load the value of one output key for each record that has it
+
+        :param key: Output key
+        :return: Mapping of {record_id: value}
+        """
+        with self._lock:
+            return {record_id: pickle.loads(value) for record_id, value in self._connection.execute(
+                "SELECT record_id, value FROM output WHERE key = ? AND record_id IN (SELECT record_id FROM records)",
+                (key,))}
+
+    def record_outputs(self, record_id: str, task: str, outputs: Dict[str, Tuple[int, float]]):
+        """ Add output paths of a completed Task to manifest
+
+        :param record_id: Id of record
+        :param task: Name of Task's working directory
+        :param outputs: Mapping of absolute path to (size, modification time)
+        """
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO manifest VALUES (?, ?, ?, ?, ?)",
+                                         ((path, str(record_id), task, size, mtime)
+                                          for path, (size, mtime) in outputs.items()))
+
+    def recorded_outputs(self, paths: Iterable[str]) -> Dict[str, Tuple[int, float]]:
+        """ Find output paths in manifest
+
+        :param paths: Absolute paths
+        :return: Mapping of recorded path to (size, modification time)
+        """
+        paths = list(paths)
+        with self._lock:
+            return {path: (size, mtime) for path, size, mtime in self._connection.execute(
+                f"SELECT path, size, mtime FROM manifest WHERE path IN ({', '.join('?' * len(paths))})", paths)}
+
+    def record_task_output(self, record_id: str, task: str, output: Dict[str, object]):
+        """ Store output that a Task set while it ran, replacing the output stored by an earlier run
+
+        :param record_id: Id of record
+        :param task: Name of Task's working directory
+        :param output: Mapping of output key to value
+        """
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM task_output WHERE record_id = ? AND task = ?", (str(record_id), task))
+            self._connection.executemany("INSERT INTO task_output VALUES (?, ?, ?, ?)",
+                                         ((str(record_id), task, key, pickle.dumps(value))
+                                          for key, value in output.items()))
+
+    def task_output(self, record_id: str, task: str) -> Dict[str, object]:
+        """ Output that a Task set while it last ran on a record
+
+        :param record_id: Id of record
+        :param task: Name of Task's working directory
+        :return: Mapping of output key to value
+        """
+        with self._lock:
+            return {key: pickle.loads(value) for key, value in self._connection.execute(
+                "SELECT key, value FROM task_output WHERE record_id = ? AND task = ?", (str(record_id), task))}
+
+    def record_cache_key(self, record_id: str, task: str, key: str):
+        """ Store the cache key of a Task's output on a record, replacing the key stored by an earlier run
+
+        :param record_id: Id of record
+        :param task: Name of Task's working directory
+        :param key: Cache key of Task's output
+        """
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO cache_keys VALUES (?, ?, ?)", (str(record_id), task, key))
+
+    def cache_key(self, record_id: str, task: str) -> Optional[str]:
+        """ Cache key of a Task's output on a record
+
+        :param record_id: Id of record
+        :param task: Name of Task's working directory
+        :return: Stored key, or None if Task has not stored a key on record
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT key FROM cache_keys WHERE record_id = ? AND task = ?",
+                                           (str(record_id), task)).fetchone()
+        return None if row is None else row[0]
+
+    def record_runtime(self, record_id: str, task: str, seconds: float, input_size: int,
+                       usage: Optional[Tuple[float, int]] = None, threads: Optional[int] = None):
+        """ Store the runtime of a Task on a record, replacing the runtime stored by an earlier run
+
+        :param record_id: Id of record
+        :param task: Name of Task's working directory
+        :param seconds: Time that Task took to run
+        :param input_size: Total size (in bytes) of record's input files
+        :param usage: CPU seconds and peak memory (in bytes) used by Task, if measured
+        :param threads: Threads that Task requested
+        """
+        cpu_seconds, peak_memory = (None, None) if usage is None else usage
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO runtimes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                     (str(record_id), task, seconds, input_size, cpu_seconds, peak_memory, threads))
+
+    def runtimes(self) -> Dict[str, Tuple[int, float, int]]:
+        """ Summarize stored runtimes of each Task
+
+        :return: Mapping of Task working directory name to (number of runs, total seconds, total input size)
+        """
+        with self._lock:
+            return {task: (count, seconds, input_size) for task, count, seconds, input_size in self._connection.execute(
+                "SELECT task, COUNT(*), SUM(seconds), SUM(input_size) FROM runtimes GROUP BY task")}
+
+    def usage_history(self) -> List[UsageRecord]:
+        """ Load the stored runtime and resource usage of each Task on each record
+
+        :return: Stored usage, ordered by Task and record
+        """
+        with self._lock:
+            return [UsageRecord(*row) for row in self._connection.execute(
+                "SELECT record_id, task, seconds, input_size, cpu_seconds, peak_memory, threads FROM runtimes "
+                "ORDER BY task, record_id")]
+
+    def forget_outputs(self, task_prefix: Optional[str] = None, record_id: Optional[str] = None):
+        """ Remove output paths of cleaned Tasks or removed records from manifest
+
+        :param task_prefix: Remove paths of Tasks whose working directory name starts with prefix
+        :param record_id: Remove paths of record
+        """
+        with self._lock, self._connection:
+            if task_prefix is not None:
+                self._connection.execute("DELETE FROM manifest WHERE substr(task, 1, ?) = ?",
+                                         (len(task_prefix), task_prefix))
+            if record_id is not None:
+                self._connection.execute("DELETE FROM manifest WHERE record_id = ?", (str(record_id),))
+
+    def close(self):
+        """Close connection to store"""
+        with self._lock:
+            self._connection.close()